@@ -4,9 +4,18 @@ from __future__ import division
 import socket
 import sys
 import time
-import cpokereval
+from pokereval.backends import Backends
+from pokereval.board_index import BoardIndex
 from pokereval.card import Card
-from pokereval.hand_evaluator import HandEvaluator
+from pokereval.equity_store import EquityStore
+from pokereval.exact_equity import ExactEquity
+from pokereval.flop_table import FlopTable
+from pokereval.headsup_matrix import HeadsUpMatrix
+from pokereval.isomorphism import Isomorphism
+from pokereval.lru_cache import LRUCache
+from pokereval.preflop_table import PreflopTable
+from pokereval.range_equity import RangeEquity
+from pokereval.state_table import StateTable
 
 
 class Player:
@@ -31,6 +40,15 @@ class Player:
          [0.55, 0.51, 0.47, 0.44, 0.42, 0.39, 0.37, 0.35, 0.34, 0.34, 0.33, 0.32, 0.50]]
     card_array_map = {'A': 0, 'K': 1, 'Q': 2, 'J': 3, '10': 4, '9': 5, '8': 6, '7': 7, '6': 8, '5': 9, '4': 10, '3': 11, '2': 12}
 
+    # Monte Carlo equity: at most this many iterations, cut down to fit
+    # the time budget (seconds) on slower backends
+    equity_iterations = 1000000
+    equity_budget = 0.5
+    # Smallest share of holes an opponent range keeps
+    min_range = 0.02
+    # Entries of the percentile and equity caches, kept across hands
+    cache_size = 100000
+
     card_eval_map = {"2": "2", "3": "3", "4": "4", "5": "5", "6": "6", "7": "7", "8": "8", "9": "9", "10": "T", "J": "J", "Q": "Q", "K": "K", "A": "A"}
 
     def __init__(self, server_host, server_port, host, port, pid):
@@ -46,6 +64,23 @@ class Player:
         self.pot = 0
         self.cards = []
         self.flops = []
+        # BoardIndex of the current street, see evaluate
+        self.board_index = None
+        # Heads-up runout enumeration, memoized within a hand
+        self.exact_equity = ExactEquity(StateTable.load())
+        self.range_equity = RangeEquity(self.exact_equity)
+        # Simulated preflop equity by starting hand class, None if not built
+        self.preflop_table = PreflopTable.load()
+        # Exact heads-up equity between hand classes, None if not built
+        self.preflop_matrix = HeadsUpMatrix.load()
+        # Exact heads-up flop equity by isomorphic situation, None if not built
+        self.flop_table = FlopTable.load()
+        # Results by suit isomorphic situation, see evaluate and action_other
+        self.percentile_cache = LRUCache(self.cache_size)
+        self.equity_cache = LRUCache(self.cache_size)
+        # The same results on disk, shared across games, None if it can't
+        # be opened; written between hands, see clear
+        self.equity_store = EquityStore.open()
         self.seats = []
         self.pos = dict()
         self.actions = dict()
@@ -57,6 +92,9 @@ class Player:
         self.fold_actions = [dict()] * 4
 
         self.tight_enemy_is_raised = False
+        # pids that raised preflop this hand while rarely raising, see
+        # opponent_range
+        self.tight_raisers = set()
         self.pre_flop_steal_raised = False
         self.base_ratio_to_raise = 2
         self.pre_flop_total_call = 0
@@ -132,6 +170,8 @@ class Player:
                 else:
                     single_msg.append(line)
             cache_msg = ''
+        if self.equity_store is not None:
+            self.equity_store.close()
         self.s.shutdown(socket.SHUT_RDWR)
         self.s.close()
 
@@ -198,6 +238,7 @@ class Player:
                 if self.pre_flop_actions[pid]['total'] != 0:
                     if self.pre_flop_actions[pid]['raise'] / self.pre_flop_actions[pid]['total'] < 0.05:
                         self.tight_enemy_is_raised = True
+                        self.tight_raisers.add(pid)
 
             if action == 'fold' and pid in self.alive:
                 self.alive.remove(pid)
@@ -213,16 +254,19 @@ class Player:
     def handle_flop(self, msg):
         for line in msg:
             self.flops.append(tuple(line.split()))
+        self.board_index = None
         self.phase += 1
         # print('flop: ', self.flops)
 
     def handle_turn(self, msg):
         self.flops.append(tuple(msg[0].split()))
+        self.board_index = None
         self.phase += 1
         # print('turn: ', self.flops)
 
     def handle_river(self, msg):
         self.flops.append(tuple(msg[0].split()))
+        self.board_index = None
         self.phase += 1
         # print('river: ', self.flops)
 
@@ -257,12 +301,17 @@ class Player:
     def clear(self):
         self.cards = []
         self.flops = []
+        self.board_index = None
+        self.exact_equity.clear()
+        if self.equity_store is not None:
+            self.equity_store.flush()
         self.seats = []
         self.pos.clear()
         self.pot = 0
         self.outer_bet = 0
 
         self.tight_enemy_is_raised = False
+        self.tight_raisers = set()
         self.pre_flop_steal_raised = False
         self.base_ratio_to_raise = 2
         self.pre_flop_total_call = 0
@@ -272,13 +321,74 @@ class Player:
         self.phase = 0
 
     def evaluate(self):
-        hole = [Card(self.points[p], self.colors[c]) for c, p in self.cards]
-        board = [Card(self.points[p], self.colors[c]) for c, p in self.flops]
-        score = HandEvaluator.evaluate_hand(hole, board)
+        hole = [Card(self.points[p], self.colors[c]).to_index() for c, p in self.cards]
+        board = [Card(self.points[p], self.colors[c]).to_index() for c, p in self.flops]
+        if not board:
+            compute = lambda: (Backends.get('percentile').percentile(hole, board), True)
+        else:
+            compute = lambda: (self.street_index(board).percentile(hole), True)
+        score = self.lookup(self.percentile_cache, EquityStore.PERCENTILE, hole, board, 0, compute)
         # print(score)
         return score
 
+    def lookup(self, cache, kind, hole, board, opponents, compute):
+        """
+        Result of a situation from the cache, then the equity store, then
+        compute(), which returns (value, exact). Only exact values are
+        kept in both: an estimate, cut short by the budget or sampled, is
+        computed again the next time.
+        """
+        key = Isomorphism.situation(hole, board, opponents)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if self.equity_store is not None:
+            value = self.equity_store.get(kind, hole, board, opponents)
+        if value is None:
+            value, exact = compute()
+            if not exact:
+                return value
+            if self.equity_store is not None:
+                self.equity_store.put(kind, hole, board, opponents, value)
+        cache.put(key, value)
+        return value
+
+    def street_index(self, board):
+        """
+        BoardIndex of the current street: the opponent holes are ranked
+        once per street, then every inquiry on it is a lookup
+        """
+        if self.board_index is None:
+            self.board_index = BoardIndex(board)
+        return self.board_index
+
+    def opponent_range(self, pid):
+        """
+        Range of an opponent from its preflop actions so far: the best
+        holes in the share it raises if it raised tight this hand, else in
+        the share it does not fold
+        """
+        stats = self.pre_flop_actions[pid]
+        if not stats['total']:
+            return RangeEquity.uniform()
+        if pid in self.tight_raisers:
+            fraction = (stats['raise'] + stats['all_in']) / stats['total']
+        else:
+            fraction = 1 - stats['fold'] / stats['total']
+        return RangeEquity.top(max(fraction, self.min_range))
+
     def evaluate_two(self):
+        hole = [Card(self.points[p], self.colors[c]).to_index() for c, p in self.cards]
+        raisers = self.tight_raisers & self.alive
+        if self.preflop_matrix is not None and raisers:
+            # Against the range of the toughest tight raiser still in, on
+            # the heads-up scale of the lines in action_two
+            return min(self.preflop_matrix.headsup_scale(hole, HeadsUpMatrix.class_weights(self.opponent_range(pid)))
+                       for pid in raisers)
+        if self.preflop_table is not None:
+            # Against everyone still in, on the heads-up scale of the lines
+            # in action_two
+            return self.preflop_table.headsup_scale(hole, len(self.alive) - 1)
         cx = self.card_array_map[self.cards[0][1]]
         cy = self.card_array_map[self.cards[1][1]]
         # print(cx, cy)
@@ -597,24 +707,18 @@ class Player:
         # jetton = self.seats[self.pos[self.pid]]['jetton']
         # call_bet = self.outer_bet - self.seats[self.pos[self.pid]]['bet']
 
-        hand_cards = [[self.card_eval_map[self.cards[i][1]] + self.cards[i][0][0] for i in range(2)]]
-        hand_cards.extend([["__", "__"]] * (len(self.alive) - 1))
-        board_cards = []
-        for c, p in self.flops:
-            now = self.card_eval_map[p]+c[0]
-            board_cards.append(now)
-
-        pe = cpokereval.PokerEval()
-
-        result = pe.poker_eval(
-            game="holdem",
-            pockets=hand_cards,
-            dead=[],
-            board=board_cards,
-            iterations=1000000
-        )
-
-        ev = (int(result['eval'][0]['ev'])) / 1000.0
+        hand_cards = [Card(self.points[p], self.colors[c]).to_index() for c, p in self.cards]
+        board_cards = [Card(self.points[p], self.colors[c]).to_index() for c, p in self.flops]
+
+        if self.tight_raisers & self.alive:
+            # A tight raiser doesn't hold a random hand, so play every
+            # opponent's range instead
+            ranges = [self.opponent_range(pid) for pid in self.alive if pid != self.pid]
+            ev = self.range_equity.equity(RangeEquity.hole_range(hand_cards), ranges, board_cards,
+                                          self.equity_budget)
+        else:
+            ev = self.lookup(self.equity_cache, EquityStore.EQUITY, hand_cards, board_cards,
+                             len(self.alive) - 1, lambda: self.random_equity(hand_cards, board_cards))
         # raise_value = min(2/3*self.pot, 0.3*jetton)+1
         # # raise_value = 100
 
@@ -657,6 +761,28 @@ class Player:
         else:
             self.send('fold \n')
 
+    def random_equity(self, hand_cards, board_cards):
+        """
+        (equity, exact) against the opponents still in holding random
+        holes, exact False for an estimate
+        """
+        if len(board_cards) == 5:
+            # No cards to come, so strength against every opponent at
+            # once is the equity, without Monte Carlo. Past two opponents
+            # it is an approximation, see BoardIndex.multiway.
+            opponents = len(self.alive) - 1
+            return self.street_index(board_cards).multiway(hand_cards, opponents), opponents <= 2
+        if len(self.alive) == 2 and len(board_cards) == 3 and self.flop_table is not None:
+            # Heads-up on the flop, the same enumeration done offline
+            return self.flop_table.equity(hand_cards, board_cards), True
+        if len(self.alive) == 2:
+            # Heads-up, enumerate every runout and opponent hole, exact
+            # unless the budget ran out first
+            equity = self.exact_equity.equity(hand_cards, board_cards, self.equity_budget)
+            return equity, self.exact_equity.complete()
+        iterations = int(min(self.equity_iterations, self.equity_budget / Backends.cost('equity')))
+        return Backends.get('equity').equity(hand_cards, board_cards, len(self.alive) - 1, iterations), False
+
     def action(self):
 
         if len(self.flops) == 0:
@@ -666,6 +792,8 @@ class Player:
 
 def main():
     player = Player(*sys.argv[1:6])
+    # Pick the fastest evaluator backends before the first hand
+    Backends.select()
     player.run()
 
 if __name__ == '__main__':
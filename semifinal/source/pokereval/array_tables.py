@@ -0,0 +1,112 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lookup_tables import LookupTables
+from rank_multiset import RankMultiset
+
+class ArrayTables:
+    """
+    NumPy versions of LookupTables for the batched evaluators.
+    Cards are indexed by their integer code (see Card.to_index).
+    Dicts keyed by 13-bit rank masks become dense 8192-entry arrays,
+    the xor pairs become sorted key/value arrays for numpy.searchsorted.
+    Nothing is built until first use, so NumPy stays optional.
+    """
+    built = False
+
+    class Five:
+        pass
+
+    class Six:
+        pass
+
+    class Seven:
+        pass
+
+    def available():
+        """
+        Return True if NumPy is installed and the batched evaluators work
+        """
+        return numpy is not None
+
+    def build():
+        """
+        Fill in the nested classes from LookupTables, once
+        """
+        if ArrayTables.built:
+            return
+        if numpy is None:
+            raise ImportError("NumPy is required for the batched evaluators")
+
+        ArrayTables.popcount = numpy.array(
+            [bin(bits).count("1") for bits in xrange(8192)], dtype=numpy.int64)
+
+        five = LookupTables.Five
+        ArrayTables.Five.card_to_binary = ArrayTables.card_to_binary(five.card_to_binary)
+        ArrayTables.Five.flushes = numpy.array(five.flushes, dtype=numpy.int32)
+        ArrayTables.Five.unique5 = numpy.array(five.unique5, dtype=numpy.int32)
+        ArrayTables.Five.pairs = numpy.array(five.pairs, dtype=numpy.int32)
+        ArrayTables.multiset_offsets = numpy.array(RankMultiset.OFFSETS, dtype=numpy.int64)
+
+        for tables, lookup in ((ArrayTables.Six, LookupTables.Six),
+                               (ArrayTables.Seven, LookupTables.Seven)):
+            tables.card_to_binary = ArrayTables.card_to_binary(lookup.card_to_binary)
+            tables.flush_rank_bits_to_rank = ArrayTables.dense(lookup.flush_rank_bits_to_rank)
+            tables.odd_xors_to_rank = ArrayTables.dense(lookup.odd_xors_to_rank)
+            tables.rank_multisets_to_rank = numpy.array(lookup.rank_multisets_to_rank, dtype=numpy.int32)
+            # Flatten the nested dict with key even_xor << 13 | odd_xor
+            tables.xor_keys, tables.xor_ranks = ArrayTables.sorted_items(dict(
+                ((even_xor << 13) | odd_xor, rank)
+                for even_xor, odd_xors in lookup.even_xors_to_odd_xors_to_rank.iteritems()
+                for odd_xor, rank in odd_xors.iteritems()))
+        ArrayTables.Six.even_xors_to_rank = ArrayTables.dense(LookupTables.Six.even_xors_to_rank)
+
+        ArrayTables.built = True
+
+    def card_to_binary(table):
+        """
+        Flatten a card_to_binary[rank][suit] table into one indexed by card code
+        """
+        return numpy.array([table[rank][suit] for rank in xrange(2, 15) for suit in xrange(1, 5)],
+                           dtype=numpy.int64)
+
+    def dense(mapping):
+        """
+        Turn a dict keyed by 13-bit rank masks into an 8192-entry array
+        """
+        array = numpy.zeros(8192, dtype=numpy.int32)
+        for key, rank in mapping.iteritems():
+            array[key] = rank
+        return array
+
+    def sorted_items(mapping):
+        """
+        Return (keys, values) arrays sorted by key
+        """
+        keys = sorted(mapping)
+        return (numpy.array(keys, dtype=numpy.int64),
+                numpy.array([mapping[key] for key in keys], dtype=numpy.int32))
+
+    def multiset_index(bh):
+        """
+        Vectorized RankMultiset index of each row of binary cards
+        """
+        ranks = numpy.sort((bh >> 8) & 0xF, axis=1)
+        positions = numpy.arange(ranks.shape[1])
+        return ArrayTables.multiset_offsets[positions, ranks].sum(axis=1)
+
+    def search(keys, values, query):
+        """
+        Vectorized dict lookup on the output of sorted_items
+        """
+        return values[numpy.searchsorted(keys, query)]
+
+    available = staticmethod(available)
+    build = staticmethod(build)
+    card_to_binary = staticmethod(card_to_binary)
+    dense = staticmethod(dense)
+    sorted_items = staticmethod(sorted_items)
+    multiset_index = staticmethod(multiset_index)
+    search = staticmethod(search)
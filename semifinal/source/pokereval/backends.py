@@ -0,0 +1,395 @@
+import random
+import time
+
+from array_tables import ArrayTables, numpy
+from bitmask_evaluator import BitmaskEvaluator
+from board_state import BoardState
+from card import Card
+from hand_evaluator import HandEvaluator, HandLengthException
+from hole_index import HoleIndex
+
+class BackendException(Exception):
+    pass
+
+class Backend:
+    """
+    Interface shared by the evaluator backends. Cards are card codes
+    (see Card.to_index) and ranks are on the HandEvaluator scale, lower
+    is better, whichever library does the work.
+
+    rank(codes)                  rank of a 5 to 7-card hand
+    rank_batch(hands)            ranks of N hands of the same length
+    percentile(hole, board)      HandEvaluator.evaluate_hand
+    equity(hole, board, opponents, iterations)
+                                 Monte Carlo pot share against random hands,
+                                 0-1 like poker_eval's ev / 1000
+    """
+    name = None
+
+    def available(self):
+        return True
+
+    def rank(self, codes):
+        raise NotImplementedError
+
+    def rank_batch(self, hands):
+        raise NotImplementedError
+
+    def percentile(self, hole, board):
+        raise NotImplementedError
+
+    def equity(self, hole, board, opponents, iterations):
+        raise NotImplementedError
+
+    def deal(self, hole, board, opponents, rng):
+        """
+        Complete the board and deal opponent holes from the live cards.
+        Return (board, [hole, ...]) as lists of codes.
+        """
+        dead = set(hole) | set(board)
+        live = [code for code in xrange(52) if code not in dead]
+        cards = rng.sample(live, 5 - len(board) + 2 * opponents)
+        full_board = list(board) + cards[2 * opponents:]
+        return full_board, [cards[2 * i:2 * i + 2] for i in xrange(opponents)]
+
+class PurePythonBackend(Backend):
+    """
+    HandEvaluator, BoardState and BitmaskEvaluator, no dependencies
+    """
+    name = "python"
+
+    def rank(self, codes):
+        return BitmaskEvaluator.evaluate_codes(codes)
+
+    def rank_batch(self, hands):
+        evaluate_codes = BitmaskEvaluator.evaluate_codes
+        return [evaluate_codes(codes) for codes in hands]
+
+    def percentile(self, hole, board):
+        if len(board) == 0:
+            return HandEvaluator.Two.evaluate_percentile(map(Card.from_index, hole))
+        board_state = BoardState(map(Card.from_index, board))
+        rank = board_state.evaluate_codes(hole[0], hole[1])
+        holes = HoleIndex.live(HoleIndex.dead_mask(list(hole) + list(board)))
+        hands_beaten = 0
+        for a, b in holes:
+            possible_opponent_rank = board_state.evaluate_codes(a, b)
+            if rank < possible_opponent_rank:
+                hands_beaten += 1
+            elif rank == possible_opponent_rank:
+                hands_beaten += 0.5
+        return float(hands_beaten) / len(holes)
+
+    def equity(self, hole, board, opponents, iterations, seed=None):
+        if opponents == 0:
+            return 1.0
+        rng = random.Random(seed)
+        card_masks = BitmaskEvaluator.CARD_MASKS
+        evaluate_mask = BitmaskEvaluator.evaluate_mask
+        hole_mask = card_masks[hole[0]] | card_masks[hole[1]]
+        share = 0.0
+        for i in xrange(iterations):
+            full_board, holes = self.deal(hole, board, opponents, rng)
+            board_mask = BitmaskEvaluator.mask_codes(full_board)
+            rank = evaluate_mask(board_mask | hole_mask)
+            ties = 1
+            for a, b in holes:
+                opponent_rank = evaluate_mask(board_mask | card_masks[a] | card_masks[b])
+                if opponent_rank < rank:
+                    break
+                elif opponent_rank == rank:
+                    ties += 1
+            else:
+                share += 1.0 / ties
+        return share / iterations
+
+class NumpyBackend(Backend):
+    """
+    The evaluate_rank_batch evaluators
+    """
+    name = "numpy"
+    evaluators = {5: HandEvaluator.Five, 6: HandEvaluator.Six, 7: HandEvaluator.Seven}
+
+    def available(self):
+        return ArrayTables.available()
+
+    def rank(self, codes):
+        return int(self.rank_batch([codes])[0])
+
+    def rank_batch(self, hands):
+        hands = numpy.asarray(hands, dtype=numpy.intp)
+        if hands.ndim != 2 or hands.shape[1] not in self.evaluators:
+            raise HandLengthException("Only 5, 6 or 7-card hands are supported by rank_batch")
+        return self.evaluators[hands.shape[1]].evaluate_rank_batch(hands)
+
+    def percentile(self, hole, board):
+        if len(board) == 0:
+            return HandEvaluator.Two.evaluate_percentile(map(Card.from_index, hole))
+        rank = self.rank(list(hole) + list(board))
+        holes = HoleIndex.live_array(HoleIndex.dead_mask(list(hole) + list(board)))
+        opponent_ranks = self.rank_batch(numpy.hstack((holes, numpy.tile(board, (len(holes), 1)))))
+        hands_beaten = (rank < opponent_ranks).sum() + 0.5 * (rank == opponent_ranks).sum()
+        return float(hands_beaten) / len(holes)
+
+    def equity(self, hole, board, opponents, iterations, seed=None):
+        if opponents == 0:
+            return 1.0
+        rng = numpy.random.RandomState(seed)
+        dead = set(hole) | set(board)
+        live = numpy.array([code for code in xrange(52) if code not in dead], dtype=numpy.intp)
+        # Shuffle the live cards of every iteration at once and deal from the top
+        needed = 5 - len(board) + 2 * opponents
+        dealt = live[numpy.argsort(rng.random_sample((iterations, len(live))), axis=1)[:, :needed]]
+        full_board = numpy.hstack((numpy.tile(numpy.array(board, dtype=numpy.intp), (iterations, 1)),
+                                   dealt[:, 2 * opponents:]))
+        seven = HandEvaluator.Seven.evaluate_rank_batch
+        rank = seven(numpy.hstack((numpy.tile(hole, (iterations, 1)), full_board)))
+        best_opponent = None
+        ties = numpy.ones(iterations)
+        for i in xrange(opponents):
+            opponent_rank = seven(numpy.hstack((dealt[:, 2 * i:2 * i + 2], full_board)))
+            ties += opponent_rank == rank
+            if best_opponent is None:
+                best_opponent = opponent_rank
+            else:
+                best_opponent = numpy.minimum(best_opponent, opponent_rank)
+        share = numpy.where(best_opponent >= rank, 1.0 / ties, 0.0)
+        return float(share.mean())
+
+class PokerEvalBackend(Backend):
+    """
+    libpoker-eval through cpokereval.PokerEval
+    """
+    name = "poker-eval"
+
+    # poker-eval numbers cards 2h-Ah, 2d-Ad, 2c-Ac, 2s-As
+    SUIT_OFFSETS = {"h": 0, "d": 13, "c": 26, "s": 39}
+    CARDS = [SUIT_OFFSETS[Card.SUIT_TO_STRING[code % 4 + 1]] + code // 4 for code in xrange(52)]
+    # StdRules hand types and the HandVal layout, see poker-eval's handval.h
+    NOPAIR, ONEPAIR, TWOPAIR, TRIPS, STRAIGHT, FLUSH, FULLHOUSE, QUADS, STFLUSH = range(9)
+    # Which of the five card fields a hand type repeats, as positions
+    FIELDS = {
+        NOPAIR: (0, 1, 2, 3, 4),
+        ONEPAIR: (0, 0, 1, 2, 3),
+        TWOPAIR: (0, 0, 1, 1, 2),
+        TRIPS: (0, 0, 0, 1, 2),
+        FLUSH: (0, 1, 2, 3, 4),
+        FULLHOUSE: (0, 0, 0, 1, 1),
+        QUADS: (0, 0, 0, 0, 1)
+    }
+
+    def __init__(self):
+        self.pokereval = None
+        try:
+            import cpokereval
+            self.pokereval = cpokereval.PokerEval()
+        except (ImportError, OSError):
+            pass
+
+    def available(self):
+        return self.pokereval is not None
+
+    def handval_to_rank(self, handval):
+        """
+        Convert a poker-eval HandVal (higher is better) to a HandEvaluator rank
+        """
+        hand_type = handval >> 24
+        fields = [(handval >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
+        if hand_type in (self.STRAIGHT, self.STFLUSH):
+            # Only the top card is set, the wheel's is the five
+            ranks = [(fields[0] - i) % 13 for i in xrange(5)]
+        else:
+            ranks = [fields[i] for i in self.FIELDS[hand_type]]
+        if hand_type in (self.FLUSH, self.STFLUSH):
+            codes = [rank * 4 for rank in ranks]
+        else:
+            # Rotate suits by position: repeated ranks get distinct suits
+            # and five cards over several suits can't be a flush
+            codes = [rank * 4 + i % 4 for i, rank in enumerate(ranks)]
+        return BitmaskEvaluator.evaluate_codes(codes)
+
+    def rank(self, codes):
+        return self.handval_to_rank(self.pokereval.evaln([self.CARDS[code] for code in codes]))
+
+    def rank_batch(self, hands):
+        return [self.rank(codes) for codes in hands]
+
+    def percentile(self, hole, board):
+        if len(board) == 0:
+            return HandEvaluator.Two.evaluate_percentile(map(Card.from_index, hole))
+        cards = self.CARDS
+        evaln = self.pokereval.evaln
+        pokereval_board = [cards[code] for code in board]
+        # Compare HandVals directly, higher is better
+        value = evaln([cards[code] for code in hole] + pokereval_board)
+        holes = HoleIndex.live(HoleIndex.dead_mask(list(hole) + list(board)))
+        hands_beaten = 0
+        for a, b in holes:
+            opponent_value = evaln([cards[a], cards[b]] + pokereval_board)
+            if value > opponent_value:
+                hands_beaten += 1
+            elif value == opponent_value:
+                hands_beaten += 0.5
+        return float(hands_beaten) / len(holes)
+
+    def equity(self, hole, board, opponents, iterations, seed=None):
+        # libpoker-eval draws from its own generator, seed is ignored
+        if opponents == 0:
+            return 1.0
+        pockets = [[self.CARDS[code] for code in hole]] + [[255, 255]] * opponents
+        # Only placeholders get dealt, so the board must have one per card
+        # to come or poker_eval scores the board as it stands
+        result = self.pokereval.poker_eval(
+            game="holdem",
+            pockets=pockets,
+            dead=[],
+            board=[self.CARDS[code] for code in board] + [255] * (5 - len(board)),
+            iterations=iterations
+        )
+        return result['eval'][0]['ev'] / 1000.0
+
+class Backends:
+    """
+    Registry of evaluator backends. select() runs a short benchmark of
+    every available backend and keeps the fastest one for each operation,
+    so a host without NumPy or libpoker-eval just picks among the rest.
+
+    A backend is only selected for an operation if its results agree
+    with PurePythonBackend's on fixed hands: ranks and percentiles
+    exactly, equity within EQUITY_TOLERANCE, several standard deviations
+    of the Monte Carlo noise of EQUITY_CHECK_ITERATIONS iterations each.
+    The others are listed in rejected.
+    """
+    OPERATIONS = ("rank", "rank_batch", "percentile", "equity")
+    EQUITY_CHECK_ITERATIONS = 4000
+    EQUITY_TOLERANCE = 0.05
+    registered = [PurePythonBackend, NumpyBackend, PokerEvalBackend]
+    selected = None
+    costs = None
+    # Names of the backends disagreeing with the reference, by operation
+    rejected = None
+
+    def register(backend_class):
+        """
+        Add a Backend subclass, the next select() will consider it
+        """
+        Backends.registered.append(backend_class)
+        Backends.selected = None
+
+    def available():
+        """
+        Instances of every registered backend usable on this host
+        """
+        backends = []
+        for backend_class in Backends.registered:
+            backend = backend_class()
+            if backend.available():
+                backends.append(backend)
+        return backends
+
+    def benchmark(backend, operation, repeat=3):
+        """
+        Best-of-repeat seconds per unit of work (hand, call or iteration)
+        """
+        rng = random.Random(1)
+        hands = [rng.sample(xrange(52), 7) for i in xrange(200)]
+        river = hands[0]
+        if operation == "rank":
+            work = lambda: [backend.rank(codes) for codes in hands]
+            units = len(hands)
+        elif operation == "rank_batch":
+            hands = hands * 10
+            work = lambda: backend.rank_batch(hands)
+            units = len(hands)
+        elif operation == "percentile":
+            work = lambda: backend.percentile(river[:2], river[2:])
+            units = 1
+        else:
+            units = 500
+            work = lambda: backend.equity(river[:2], river[2:5], 2, units)
+        # Warm up lazily built tables before timing
+        work()
+        best = None
+        for i in xrange(repeat):
+            start = time.time()
+            work()
+            elapsed = time.time() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        return best / units
+
+    def results(backend, operation):
+        """
+        Results of backend for operation on fixed hands, see agree
+        """
+        rng = random.Random(2)
+        hands = [rng.sample(xrange(52), 7) for i in xrange(50)]
+        if operation == "rank":
+            return [backend.rank(codes) for codes in hands]
+        elif operation == "rank_batch":
+            return list(backend.rank_batch(hands))
+        elif operation == "percentile":
+            return [backend.percentile(codes[:2], codes[2:]) for codes in hands[:3]]
+        # AsAh on 2s 5h 8d against two random holes, 0.73, with the turn
+        # and river still to deal
+        return [backend.equity([48, 49], [0, 13, 26], 2, Backends.EQUITY_CHECK_ITERATIONS, seed=0)]
+
+    def agree(operation, results, expected):
+        """
+        Whether results of operation match the expected ones
+        """
+        tolerance = Backends.EQUITY_TOLERANCE if operation == "equity" else 1e-9
+        return len(results) == len(expected) and all(
+            abs(result - value) <= tolerance for result, value in zip(results, expected))
+
+    def select(operations=OPERATIONS):
+        """
+        Benchmark the available backends and pick the fastest per operation
+        among those agreeing with PurePythonBackend
+        """
+        backends = Backends.available()
+        reference = PurePythonBackend()
+        Backends.selected = {}
+        Backends.costs = {}
+        Backends.rejected = {}
+        for operation in operations:
+            expected = Backends.results(reference, operation)
+            for backend in backends:
+                try:
+                    cost = Backends.benchmark(backend, operation)
+                    if backend.name != reference.name and not Backends.agree(
+                            operation, Backends.results(backend, operation), expected):
+                        Backends.rejected.setdefault(operation, []).append(backend.name)
+                        continue
+                except NotImplementedError:
+                    continue
+                if operation not in Backends.costs or cost < Backends.costs[operation]:
+                    Backends.selected[operation] = backend
+                    Backends.costs[operation] = cost
+        return Backends.selected
+
+    def get(operation):
+        """
+        Backend selected for operation, benchmarking on first use
+        """
+        if Backends.selected is None or operation not in Backends.selected:
+            if operation not in Backends.OPERATIONS:
+                raise BackendException("Unknown operation %s" % operation)
+            Backends.select()
+        return Backends.selected[operation]
+
+    def cost(operation):
+        """
+        Measured seconds per unit of work of the selected backend
+        """
+        Backends.get(operation)
+        return Backends.costs[operation]
+
+    register = staticmethod(register)
+    available = staticmethod(available)
+    benchmark = staticmethod(benchmark)
+    results = staticmethod(results)
+    agree = staticmethod(agree)
+    select = staticmethod(select)
+    get = staticmethod(get)
+    cost = staticmethod(cost)
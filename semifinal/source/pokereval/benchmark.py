@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from array_tables import ArrayTables
+from backends import PokerEvalBackend
+from bitmask_evaluator import BitmaskEvaluator
+from card import Card
+from hand_decoder import HandDecoder
+from hand_evaluator import HandEvaluator
+
+class Benchmark:
+    """
+    Throughput of the evaluator hot paths, in operations per second:
+
+        rank.<5|6|7>.<category>     evaluate_rank, by hand category
+        evaluate_hand.<street>      HandEvaluator.evaluate_hand on a
+                                    flop, turn or river
+        two.evaluate_percentile     HandEvaluator.Two.evaluate_percentile
+        poker_eval.<iterations>     PokerEvalBackend.equity, 3-way on the
+                                    flop, when libpoker-eval is available
+
+    Inputs are drawn from a seed so runs are comparable. Results are
+    saved as a JSON baseline, tracked next to this module rather than in
+    the ignored data directory, and compare() lists the benchmarks that
+    got slower than the baseline by more than a threshold.
+    """
+    DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "benchmark_baseline.json")
+    EVALUATORS = {5: HandEvaluator.Five, 6: HandEvaluator.Six, 7: HandEvaluator.Seven}
+    STREETS = (("flop", 3), ("turn", 4), ("river", 5))
+    POKER_EVAL_ITERATIONS = (1000, 10000, 100000)
+
+    def __init__(self, seed=0, hands=500, repeat=3, min_time=0.2):
+        self.rng = random.Random(seed)
+        self.hands = hands
+        self.repeat = repeat
+        self.min_time = min_time
+
+    def category_hands(self, size, category):
+        """
+        hands random size-card hands whose best five are of category
+        """
+        low = HandDecoder.CATEGORY_BOUNDS[category]
+        high = HandDecoder.CATEGORY_BOUNDS[category + 1] if category < 8 else 7463
+        hands = []
+        while len(hands) < self.hands:
+            ranks = HandDecoder.kickers(self.rng.randrange(low, high))
+            if category in (HandDecoder.STRAIGHT_FLUSH, HandDecoder.FLUSH):
+                suit = self.rng.randrange(4)
+                codes = [(r - 2) * 4 + suit for r in ranks]
+            else:
+                suits = self.rng.sample(xrange(4), 4)
+                codes = [(r - 2) * 4 + suits[i % 4] for i, r in enumerate(ranks)]
+            # Pad with other cards as long as the category holds
+            live = [code for code in xrange(52) if code not in codes]
+            codes += self.rng.sample(live, size - 5)
+            if HandDecoder.category(BitmaskEvaluator.evaluate_codes(codes)) == category:
+                hands.append(map(Card.from_index, codes))
+        return hands
+
+    def deals(self, board_size):
+        """
+        hands random (hole, board) deals as Card lists
+        """
+        deals = []
+        for i in xrange(self.hands):
+            cards = map(Card.from_index, self.rng.sample(xrange(52), 2 + board_size))
+            deals.append((cards[:2], cards[2:]))
+        return deals
+
+    def cases(self):
+        """
+        (name, function doing some operations, number of operations)
+        """
+        cases = []
+        for size in (5, 6, 7):
+            evaluate_rank = Benchmark.EVALUATORS[size].evaluate_rank
+            for category, name in enumerate(HandDecoder.CATEGORY_NAMES):
+                hands = self.category_hands(size, category)
+                cases.append(("rank.%d.%s" % (size, name),
+                              lambda hands=hands, evaluate_rank=evaluate_rank:
+                                  [evaluate_rank(hand) for hand in hands],
+                              len(hands)))
+        for street, board_size in Benchmark.STREETS:
+            deals = self.deals(board_size)[:20]
+            cases.append(("evaluate_hand.%s" % street,
+                          lambda deals=deals: [HandEvaluator.evaluate_hand(hole, board)
+                                               for hole, board in deals],
+                          len(deals)))
+        holes = [hole for hole, board in self.deals(0)]
+        cases.append(("two.evaluate_percentile",
+                      lambda: [HandEvaluator.Two.evaluate_percentile(hole) for hole in holes],
+                      len(holes)))
+        backend = PokerEvalBackend()
+        if backend.available():
+            # Through the backend, which deals the turn and river like the
+            # other equity backends
+            hole, board = self.deals(3)[0]
+            hole = [card.to_index() for card in hole]
+            board = [card.to_index() for card in board]
+            for iterations in Benchmark.POKER_EVAL_ITERATIONS:
+                cases.append(("poker_eval.%d" % iterations,
+                              lambda iterations=iterations: backend.equity(hole, board, 2, iterations),
+                              1))
+        return cases
+
+    def measure(self, function, operations):
+        """
+        Best operations per second over repeat runs of at least min_time
+        """
+        # Warm up, which also builds any lazy tables
+        function()
+        best = 0.0
+        for i in xrange(self.repeat):
+            done = 0
+            start = time.time()
+            while True:
+                function()
+                done += operations
+                elapsed = time.time() - start
+                if elapsed >= self.min_time:
+                    break
+            best = max(best, done / elapsed)
+        return best
+
+    def run(self, match=None, verbose=False):
+        """
+        Dict of benchmark name to operations per second, for the names
+        containing match
+        """
+        results = {}
+        for name, function, operations in self.cases():
+            if match and match not in name:
+                continue
+            results[name] = self.measure(function, operations)
+            if verbose:
+                print("%-32s %12.1f/s" % (name, results[name]))
+        return results
+
+    def environment():
+        """
+        What a baseline was measured on
+        """
+        return {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": ArrayTables.available(),
+            "poker-eval": PokerEvalBackend().available()
+        }
+
+    def save(path, results):
+        """
+        Write results as a JSON baseline
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, "w") as f:
+            json.dump({"environment": Benchmark.environment(), "results": results}, f,
+                      indent=2, sort_keys=True)
+
+    def compare(results, baseline, threshold):
+        """
+        (name, baseline, result) of the benchmarks slower than baseline by
+        more than threshold, a fraction
+        """
+        regressions = []
+        for name, expected in sorted(baseline["results"].iteritems()):
+            if name in results and results[name] < expected * (1 - threshold):
+                regressions.append((name, expected, results[name]))
+        return regressions
+
+    environment = staticmethod(environment)
+    save = staticmethod(save)
+    compare = staticmethod(compare)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluators against a JSON baseline")
+    parser.add_argument("--baseline", default=Benchmark.DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, a fraction")
+    parser.add_argument("--match", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = Benchmark(args.seed, repeat=args.repeat).run(args.match, verbose=True)
+    if args.save:
+        Benchmark.save(args.baseline, results)
+        print("Saved %s" % args.baseline)
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s, run with --save" % args.baseline)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["environment"] != Benchmark.environment():
+        print("Baseline was measured on %s" % baseline["environment"])
+    regressions = Benchmark.compare(results, baseline, args.threshold)
+    for name, expected, result in regressions:
+        print("REGRESSION %s: %.1f/s, baseline %.1f/s (%.0f%%)" % (
+            name, result, expected, 100.0 * (result / expected - 1)))
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from lookup_tables import LookupTables
+from rank_multiset import RankMultiset
+
+class HandLengthException(Exception):
+    pass
+
+class BinaryCards:
+    """
+    The binary cards of the Five, Six and Seven evaluators in the forms
+    looked up per hand, shared by HandEvaluator and BoardState:
+
+        BinaryCards.Seven.binary_by_code[code]    # see Card.to_index
+        BinaryCards.Seven.multiset_offsets        # see RankMultiset
+
+    Built from the LookupTables installed at import.
+    """
+    class Five:
+        # RankMultiset offsets keyed by this evaluator's binary cards
+        multiset_offsets = RankMultiset.binary_offsets(LookupTables.Five.card_to_binary)
+        # card_to_binary indexed by card code, see Card.to_index
+        binary_by_code = [LookupTables.Five.card_to_binary[code // 4 + 2][code % 4 + 1]
+                          for code in xrange(52)]
+
+    class Six:
+        multiset_offsets = RankMultiset.binary_offsets(LookupTables.Six.card_to_binary)
+        binary_by_code = [LookupTables.Six.card_to_binary[code // 4 + 2][code % 4 + 1]
+                          for code in xrange(52)]
+
+    class Seven:
+        multiset_offsets = RankMultiset.binary_offsets(LookupTables.Seven.card_to_binary)
+        binary_by_code = [LookupTables.Seven.card_to_binary[code // 4 + 2][code % 4 + 1]
+                          for code in xrange(52)]
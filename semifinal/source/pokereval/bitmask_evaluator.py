@@ -0,0 +1,210 @@
+class BitmaskEvaluator:
+    """
+    One evaluator for 5, 6 and 7-card hands, on the same rank scale as
+    HandEvaluator (1 is a royal flush, 7462 is 7-5-4-3-2 offsuit).
+
+    A hand is a card mask with one bit per card and 16 bits per suit
+    (see CARD_MASKS), so each suit is a 13-bit rank mask. Every table
+    below has 8192 entries, one per rank mask, or is 13x13, and all of
+    them are computed here from the hand categories instead of read from
+    LookupTables, so importing this module does not load lookup_tables.
+    Building them takes about 50 ms and 2.3 MB at import. The 7.8 MB of
+    LookupTables stay loaded alongside wherever HandEvaluator is imported,
+    since BoardState, the batched evaluators and StateTable.build still
+    run on them.
+
+    Within a category, ranks follow the descending order of the deciding
+    ranks, so a group of kickers is ranked by its colex index: colex order
+    of k-subsets is the numeric order of their bit masks.
+    """
+    # Category boundaries of the 5-card rank scale
+    STRAIGHT_FLUSH = 1
+    FOUR_OF_A_KIND = 11
+    FULL_HOUSE = 167
+    FLUSH = 323
+    STRAIGHT = 1600
+    THREE_OF_A_KIND = 1610
+    TWO_PAIR = 2468
+    ONE_PAIR = 3326
+    HIGH_CARD = 6186
+
+    # Card code (see Card.to_index) to its bit in a hand mask
+    CARD_MASKS = [1 << ((code & 3) * 16 + (code >> 2)) for code in xrange(52)]
+
+    def mask(hand):
+        """
+        Hand mask of a list of Card objects
+        """
+        mask = 0
+        for card in hand:
+            mask |= 1 << ((card.suit - 1) * 16 + card.rank - 2)
+        return mask
+
+    def mask_codes(codes):
+        """
+        Hand mask of a sequence of card codes
+        """
+        card_masks = BitmaskEvaluator.CARD_MASKS
+        mask = 0
+        for code in codes:
+            mask |= card_masks[code]
+        return mask
+
+    def evaluate_rank(hand):
+        """
+        Return the rank of the best 5-card hand in this 5 to 7-card hand
+        """
+        return BitmaskEvaluator.evaluate_mask(BitmaskEvaluator.mask(hand))
+
+    def evaluate_codes(codes):
+        """
+        evaluate_rank for a sequence of card codes
+        """
+        return BitmaskEvaluator.evaluate_mask(BitmaskEvaluator.mask_codes(codes))
+
+    def evaluate_mask(mask):
+        """
+        Return the rank of a hand mask holding 5 to 7 cards
+        """
+        t = BitmaskEvaluator
+        popcount = t.POPCOUNT
+        s = mask & 0x1FFF
+        h = (mask >> 16) & 0x1FFF
+        d = (mask >> 32) & 0x1FFF
+        c = (mask >> 48) & 0x1FFF
+
+        # At most 7 cards, so a flush rules out quads and full houses
+        cards = popcount[s] + popcount[h] + popcount[d] + popcount[c]
+        for suit in (s, h, d, c):
+            if popcount[suit] >= 5:
+                return t.FLUSHES[suit]
+
+        ranks = s | h | d | c
+        if popcount[ranks] == cards:
+            # No two cards of a rank, straight or high card
+            return t.UNIQUE[ranks]
+
+        high = t.HIGH_INDEX
+        # Ranks held in at least 2, 3 and 4 suits
+        twos = (s & h) | (d & c) | ((s | h) & (d | c))
+        threes = (s & h & (d | c)) | (d & c & (s | h))
+        fours = s & h & d & c
+        if fours:
+            q = high[fours]
+            return t.QUADS[q][high[ranks ^ (1 << q)]]
+        if threes:
+            trips = high[threes]
+            pair = twos ^ (1 << trips)
+            if pair:
+                return t.FULL_HOUSES[trips][high[pair]]
+        straight = t.STRAIGHTS[ranks]
+        if straight:
+            return straight
+        if threes:
+            # Two kickers from the other 12 ranks
+            kickers = t.TOP_BITS[2][ranks ^ (1 << trips)]
+            return t.THREE_OF_A_KIND + (12 - trips) * 66 + \
+                65 - t.COLEX[t.remove_bit(kickers, trips)]
+        pairs = t.TOP_BITS[2][twos]
+        if popcount[twos] >= 2:
+            # Two pair, one kicker from the other 11 ranks
+            low = t.LOW_INDEX[pairs]
+            top = high[pairs]
+            kicker = high[ranks ^ pairs]
+            kicker -= (kicker > low) + (kicker > top)
+            return t.TWO_PAIR + (77 - t.COLEX[pairs]) * 11 + 10 - kicker
+        # One pair, three kickers from the other 12 ranks
+        pair = high[twos]
+        kickers = t.TOP_BITS[3][ranks ^ twos]
+        return t.ONE_PAIR + (12 - pair) * 220 + \
+            219 - t.COLEX[t.remove_bit(kickers, pair)]
+
+    def remove_bit(mask, index):
+        """
+        Drop bit index from mask, shifting the higher bits down
+        """
+        return (mask & ((1 << index) - 1)) | ((mask >> (index + 1)) << index)
+
+    mask = staticmethod(mask)
+    mask_codes = staticmethod(mask_codes)
+    evaluate_rank = staticmethod(evaluate_rank)
+    evaluate_codes = staticmethod(evaluate_codes)
+    evaluate_mask = staticmethod(evaluate_mask)
+    remove_bit = staticmethod(remove_bit)
+
+def _build_tables():
+    """
+    Fill in the 8192-entry and 13x13 tables of BitmaskEvaluator
+    """
+    t = BitmaskEvaluator
+    size = 1 << 13
+
+    binomial = [[0] * 14 for n in xrange(14)]
+    for n in xrange(14):
+        binomial[n][0] = 1
+        for k in xrange(1, n + 1):
+            binomial[n][k] = binomial[n - 1][k - 1] + binomial[n - 1][k]
+
+    t.POPCOUNT = [0] * size
+    t.HIGH_INDEX = [-1] * size
+    t.LOW_INDEX = [-1] * size
+    t.COLEX = [0] * size
+    for mask in xrange(1, size):
+        t.POPCOUNT[mask] = t.POPCOUNT[mask >> 1] + (mask & 1)
+        t.HIGH_INDEX[mask] = t.HIGH_INDEX[mask >> 1] + 1
+        t.LOW_INDEX[mask] = 0 if mask & 1 else t.LOW_INDEX[mask >> 1] + 1
+        # Colex rank among masks with the same number of bits
+        position = 0
+        for bit in xrange(13):
+            if mask & (1 << bit):
+                position += 1
+                t.COLEX[mask] += binomial[bit][position]
+
+    # TOP_BITS[n][mask] keeps the n highest bits of mask
+    t.TOP_BITS = [[0] * size for n in xrange(6)]
+    for mask in xrange(size):
+        kept = 0
+        remaining = mask
+        for n in xrange(1, 6):
+            if remaining:
+                top = 1 << t.HIGH_INDEX[remaining]
+                kept |= top
+                remaining ^= top
+            t.TOP_BITS[n][mask] = kept
+
+    # Straights from ace-high (index 0) down to the wheel (index 9)
+    straights = [0x1F << (8 - i) for i in xrange(9)] + [0x100F]
+    # Non-straight sets of 5 ranks in descending order, shared by
+    # flushes and high cards
+    distinct = sorted((mask for mask in xrange(size)
+                       if t.POPCOUNT[mask] == 5 and mask not in straights), reverse=True)
+    distinct_index = dict((mask, i) for i, mask in enumerate(distinct))
+
+    t.STRAIGHTS = [0] * size
+    t.FLUSHES = [0] * size
+    t.UNIQUE = [0] * size
+    for mask in xrange(size):
+        if t.POPCOUNT[mask] < 5:
+            continue
+        for i, straight in enumerate(straights):
+            if mask & straight == straight:
+                t.STRAIGHTS[mask] = t.STRAIGHT + i
+                t.FLUSHES[mask] = t.STRAIGHT_FLUSH + i
+                t.UNIQUE[mask] = t.STRAIGHT + i
+                break
+        else:
+            top = distinct_index[t.TOP_BITS[5][mask]]
+            t.FLUSHES[mask] = t.FLUSH + top
+            t.UNIQUE[mask] = t.HIGH_CARD + top
+
+    # QUADS[quads][kicker] and FULL_HOUSES[trips][pair], by rank index
+    t.QUADS = [[0] * 13 for i in xrange(13)]
+    t.FULL_HOUSES = [[0] * 13 for i in xrange(13)]
+    for major in xrange(13):
+        for minor in xrange(13):
+            if major != minor:
+                group = (12 - major) * 12 + 11 - (minor - (minor > major))
+                t.QUADS[major][minor] = t.FOUR_OF_A_KIND + group
+                t.FULL_HOUSES[major][minor] = t.FULL_HOUSE + group
+
+_build_tables()
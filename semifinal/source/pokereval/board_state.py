@@ -0,0 +1,142 @@
+from lookup_tables import LookupTables
+from binary_cards import BinaryCards, HandLengthException
+from popcount import PopCount
+from itertools import imap
+from operator import getitem, mul, __or__, __and__, __xor__
+
+class BoardState:
+    """
+    A 3, 4 or 5-card board digested once for the Five, Six or Seven
+    evaluator, so that scoring a 2-card hole against it only folds in
+    the two hole cards:
+
+        state = BoardState(board)
+        ranks = [state.evaluate_rank(hole) for hole in holes]
+
+    Ranks are the same as the evaluator's evaluate_rank on hole + board.
+    """
+    def __init__(self, board):
+        self.board = list(board)
+        if len(self.board) == 3:
+            self.cards = BinaryCards.Five
+            bh = [self.cards.binary_by_code[card.to_index()] for card in self.board]
+            self.and_fold = reduce(__and__, bh, 0xF000)
+            self.or_fold = reduce(__or__, bh)
+            self.complete = self.complete_five
+        elif len(self.board) in (4, 5):
+            if len(self.board) == 4:
+                self.cards = BinaryCards.Six
+                self.tables = LookupTables.Six
+                self.complete = self.complete_six
+            else:
+                self.cards = BinaryCards.Seven
+                self.tables = LookupTables.Seven
+                self.complete = self.complete_seven
+            bh = [self.cards.binary_by_code[card.to_index()] for card in self.board]
+            self.suit_product = reduce(mul, map(lambda card: (card >> 12) & 0xF, bh))
+            self.odd_xor = reduce(__xor__, bh) >> 16
+            self.or_fold = reduce(__or__, bh) >> 16
+            # Rank bits of the board cards in each suit, keyed by suit prime
+            self.suit_bits = {2: 0, 3: 0, 5: 0, 7: 0}
+            for card in bh:
+                self.suit_bits[(card >> 12) & 0xF] |= card >> 16
+        else:
+            raise HandLengthException("Only 3, 4 or 5-card boards are supported by BoardState")
+        self.bh = bh
+        self.multiset_offsets = self.cards.multiset_offsets
+        self.binary = self.cards.binary_by_code
+
+    def evaluate_rank(self, hole):
+        """
+        Return the rank of the 2-card hole with this board
+        """
+        if len(hole) != 2:
+            raise HandLengthException("Only 2 hole cards are supported by BoardState")
+        return self.complete(self.binary[hole[0].to_index()], self.binary[hole[1].to_index()])
+
+    def evaluate_codes(self, a, b):
+        """
+        Return the rank of the hole given as two card codes (see Card.to_index)
+        """
+        return self.complete(self.binary[a], self.binary[b])
+
+    def complete_five(self, a, b):
+        """
+        Finish HandEvaluator.Five.evaluate_rank from two binary hole cards
+        """
+        q = (self.or_fold | a | b) >> 16
+        if self.and_fold & a & b:
+            return LookupTables.Five.flushes[q]
+        possible_rank = LookupTables.Five.unique5[q]
+        if possible_rank != 0:
+            return possible_rank
+        return LookupTables.Five.pairs[self.multiset(a, b)]
+
+    def complete_six(self, a, b):
+        """
+        Finish HandEvaluator.Six.evaluate_rank from two binary hole cards
+        """
+        tables = self.tables
+        odd_xor = self.odd_xor ^ (a >> 16) ^ (b >> 16)
+        even_xor = (self.or_fold | (a >> 16) | (b >> 16)) ^ odd_xor
+
+        flush_suit = tables.prime_products_to_flush.get(
+            self.suit_product * ((a >> 12) & 0xF) * ((b >> 12) & 0xF))
+        if flush_suit:
+            return tables.flush_rank_bits_to_rank[self.flush_bits(flush_suit, a, b)]
+
+        # See HandEvaluator.Six.evaluate_rank for the odd-even cases
+        if even_xor == 0:
+            if PopCount.popcount(odd_xor) == 4: # 4-0
+                return tables.rank_multisets_to_rank[self.multiset(a, b)]
+            return tables.odd_xors_to_rank[odd_xor] # 6-0, 2-0
+        elif odd_xor == 0:
+            if PopCount.popcount(even_xor) == 2: # 0-2
+                return tables.rank_multisets_to_rank[self.multiset(a, b)]
+            return tables.even_xors_to_rank[even_xor] # 0-3
+        elif PopCount.popcount(odd_xor) == 4 or PopCount.popcount(even_xor) == 2: # 4-1, 2-2
+            return tables.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
+        else: # 2-1
+            return tables.rank_multisets_to_rank[self.multiset(a, b)]
+
+    def complete_seven(self, a, b):
+        """
+        Finish HandEvaluator.Seven.evaluate_rank from two binary hole cards
+        """
+        tables = self.tables
+        odd_xor = self.odd_xor ^ (a >> 16) ^ (b >> 16)
+        even_xor = (self.or_fold | (a >> 16) | (b >> 16)) ^ odd_xor
+
+        flush_suit = tables.prime_products_to_flush.get(
+            self.suit_product * ((a >> 12) & 0xF) * ((b >> 12) & 0xF))
+        if flush_suit:
+            return tables.flush_rank_bits_to_rank[self.flush_bits(flush_suit, a, b)]
+
+        # See HandEvaluator.Seven.evaluate_rank for the odd-even cases
+        odd_popcount = PopCount.popcount(odd_xor)
+        if even_xor == 0:
+            if odd_popcount == 7: # 7-0
+                return tables.odd_xors_to_rank[odd_xor]
+            return tables.rank_multisets_to_rank[self.multiset(a, b)] # 5-0, 3-0
+        even_popcount = PopCount.popcount(even_xor)
+        if odd_popcount == 5 or (odd_popcount == 3 and even_popcount == 2) or \
+                (odd_popcount == 1 and even_popcount != 2): # 5-1, 3-2, 1-3, 1-1
+            return tables.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
+        return tables.rank_multisets_to_rank[self.multiset(a, b)] # 3-1, 1-2
+
+    def multiset(self, a, b):
+        """
+        RankMultiset index of the board plus two binary hole cards
+        """
+        return sum(imap(getitem, self.multiset_offsets, sorted(self.bh + [a, b])))
+
+    def flush_bits(self, flush_suit, a, b):
+        """
+        Rank bits of the flush suit, board cards plus whichever hole cards match
+        """
+        bits = self.suit_bits[flush_suit]
+        if (a >> 12) & 0xF == flush_suit:
+            bits |= a >> 16
+        if (b >> 12) & 0xF == flush_suit:
+            bits |= b >> 16
+        return bits
@@ -44,6 +44,17 @@ class Card:
     def __hash__(self):
         return hash((self.rank, self.suit))
     
+    def to_index(self):
+        """Return the integer code of this card, 0-51.
+        Codes run 2s, 2h, 2d, 2c, 3s, ... so rank is code / 4 + 2
+        and suit is code % 4 + 1. Used by the batched evaluators."""
+        return (self.rank - 2) * 4 + (self.suit - 1)
+    
+    @classmethod
+    def from_index(cls, index):
+        """Return a card instance from its integer code, see to_index"""
+        return Card(index // 4 + 2, index % 4 + 1)
+    
     @classmethod
     def from_repr(cls, repr):
         """Return a card instance from repr.
@@ -0,0 +1,83 @@
+import json
+import os
+import time
+from multiprocessing import Pool
+
+class Checkpoint:
+    """
+    Progress of a resumable table build, a JSON state saved next to the
+    table, and the process pool running its units:
+
+        checkpoint = Checkpoint(path + ".progress")
+        state = checkpoint.load({"done": []})
+        jobs = [job for job in all_jobs if job not in state["done"]]
+        checkpoint.run(_unit, jobs, finish, processes)    # finish updates state
+        write the table from state
+        checkpoint.remove()
+
+    run() saves the state every interval seconds, and when it stops for
+    any reason, so an interrupted build loses no finished unit. Saves
+    replace the file atomically, and a file that can't be read anyway
+    starts the build over. A build keeping its own progress file never
+    loads a state and uses run() alone.
+    """
+    # Seconds between saves of a running build
+    INTERVAL = 60
+
+    def __init__(self, path, interval=INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.state = None
+
+    def load(self, default):
+        """
+        The saved state, or default if there is none
+        """
+        self.state = default
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.state = json.load(f)
+            except (IOError, ValueError):
+                pass
+        return self.state
+
+    def save(self):
+        """
+        Atomically replace the saved state
+        """
+        if self.state is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.rename(tmp_path, self.path)
+
+    def remove(self):
+        """
+        Drop the saved state of a finished build
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def run(self, unit, jobs, finish, processes=None, verbose=False):
+        """
+        Map unit over jobs in a process pool, in any order, passing each
+        result to finish as it arrives. unit must be a module level
+        function so the workers can unpickle it.
+        """
+        pool = Pool(processes)
+        try:
+            start = last_save = time.time()
+            for i, result in enumerate(pool.imap_unordered(unit, jobs)):
+                finish(result)
+                if time.time() - last_save > self.interval:
+                    self.save()
+                    last_save = time.time()
+                    if verbose:
+                        print("%d/%d units, %.0fs" % (i + 1, len(jobs), last_save - start))
+        finally:
+            # Keep what the finished units did, even when interrupted
+            self.save()
+            pool.terminate()
+            pool.join()
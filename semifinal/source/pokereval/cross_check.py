@@ -0,0 +1,191 @@
+import argparse
+import random
+import sys
+import time
+from itertools import combinations
+from multiprocessing import Pool
+
+from backends import PokerEvalBackend
+from bitmask_evaluator import BitmaskEvaluator
+from card import Card
+from hand_evaluator import HandEvaluator
+
+class CrossCheckException(Exception):
+    pass
+
+_EVALUATORS_BY_SIZE = {5: HandEvaluator.Five, 6: HandEvaluator.Six, 7: HandEvaluator.Seven}
+
+def _hand_evaluator(codes):
+    return _EVALUATORS_BY_SIZE[len(codes)].evaluate_rank(map(Card.from_index, codes))
+
+def _hand_evaluator_codes(codes):
+    return _EVALUATORS_BY_SIZE[len(codes)].evaluate_codes(*codes)
+
+def _poker_eval():
+    """
+    Hand value of libpoker-eval, higher is better, for card codes
+    """
+    backend = PokerEvalBackend()
+    if not backend.available():
+        raise CrossCheckException("libpoker-eval is not available, run with LD_LIBRARY_PATH=. "
+                                  "or pick another reference")
+    cards = backend.CARDS
+    evaln = backend.pokereval.evaln
+    return lambda codes: evaln([cards[code] for code in codes])
+
+class CrossCheck:
+    """
+    Check that an evaluator orders hands exactly like a reference one,
+    over random or all 5, 6 and 7-card hands, in a process pool.
+
+    Two evaluators agree on every pair of hands when each rank of the
+    evaluator maps to one reference value, each value to one rank, and
+    the values strictly fall as the ranks rise (ranks are better when
+    lower, reference values when higher). So workers only collect the
+    distinct (rank, value) pairs they see, with an example hand each,
+    and check() looks for pairs of hands that break this.
+
+    Work is split in units, runs of samples seeded from the seed and the
+    unit, or all hands with a given lowest pair of cards, so the report
+    only depends on the seed.
+
+    libpoker-eval ships next to game.py and loads with LD_LIBRARY_PATH=.
+    as semifinal/target/game sets it. Run from semifinal/source that way,
+    HandEvaluator and BitmaskEvaluator agree with it on 200000 random
+    hands of each size at seed 0 and on every 5-card hand:
+
+        LD_LIBRARY_PATH=. python -m pokereval.cross_check --samples 200000
+        LD_LIBRARY_PATH=. python -m pokereval.cross_check --exhaustive --sizes 5
+    """
+    # Evaluators under test, card codes to rank, lower is better
+    EVALUATORS = {
+        "hand_evaluator": _hand_evaluator,
+        "hand_evaluator_codes": _hand_evaluator_codes,
+        "bitmask": BitmaskEvaluator.evaluate_codes
+    }
+    # References, functions of no arguments returning card codes to a
+    # value, higher is better
+    REFERENCES = {
+        "poker-eval": _poker_eval,
+        "bitmask": lambda: lambda codes: -BitmaskEvaluator.evaluate_codes(codes)
+    }
+    SAMPLES_PER_UNIT = 100000
+
+    def jobs(sizes, samples, seed, evaluator, reference):
+        """
+        Work units: samples random hands of each size, or every hand of
+        each size if samples is None
+        """
+        jobs = []
+        for size in sizes:
+            if samples is None:
+                for first, second in combinations(xrange(54 - size), 2):
+                    jobs.append((evaluator, reference, size, (first, second), None))
+            else:
+                for unit, start in enumerate(xrange(0, samples, CrossCheck.SAMPLES_PER_UNIT)):
+                    count = min(CrossCheck.SAMPLES_PER_UNIT, samples - start)
+                    jobs.append((evaluator, reference, size, count, (seed, size, unit)))
+        return jobs
+
+    def run(sizes=(5, 6, 7), samples=1000000, seed=0, evaluator="hand_evaluator",
+            reference="poker-eval", processes=None, verbose=False):
+        """
+        Cross-check sizes-card hands, samples random ones per size or all of
+        them if samples is None. Return (hands checked, mismatched pairs).
+        """
+        jobs = CrossCheck.jobs(sizes, samples, seed, evaluator, reference)
+        pool = Pool(processes)
+        pairs = {}
+        hands = 0
+        start = time.time()
+        try:
+            for i, (count, seen) in enumerate(pool.imap_unordered(_check_unit, jobs)):
+                hands += count
+                for key, hand in seen.iteritems():
+                    if key not in pairs or hand < pairs[key]:
+                        pairs[key] = hand
+                if verbose and (i + 1) % 100 == 0:
+                    print("%d/%d units, %d hands, %.0fs" % (i + 1, len(jobs), hands, time.time() - start))
+        finally:
+            pool.terminate()
+            pool.join()
+        return hands, CrossCheck.check(pairs)
+
+    def check(pairs):
+        """
+        Mismatched pairs of hands, as (hand, rank, value, hand, rank, value),
+        given the example hand of each (rank, value) seen
+        """
+        mismatches = []
+        by_rank = {}
+        by_value = {}
+        for (rank, value), hand in sorted(pairs.iteritems()):
+            by_rank.setdefault(rank, []).append((value, hand))
+            by_value.setdefault(value, []).append((rank, hand))
+        # Hands the evaluator ties but the reference does not, and the reverse
+        for rank, values in sorted(by_rank.iteritems()):
+            for (value, hand), (other_value, other) in zip(values, values[1:]):
+                mismatches.append((hand, rank, value, other, rank, other_value))
+        for value, ranks in sorted(by_value.iteritems()):
+            for (rank, hand), (other_rank, other) in zip(ranks, ranks[1:]):
+                mismatches.append((hand, rank, value, other, other_rank, value))
+        # Neighbouring ranks whose reference values do not fall
+        ordered = sorted(by_rank.iteritems())
+        for (rank, values), (next_rank, next_values) in zip(ordered, ordered[1:]):
+            value, hand = min(values)
+            next_value, other = max(next_values)
+            if next_value >= value and (hand, rank, value, other, next_rank, next_value) not in mismatches:
+                mismatches.append((hand, rank, value, other, next_rank, next_value))
+        return mismatches
+
+    jobs = staticmethod(jobs)
+    run = staticmethod(run)
+    check = staticmethod(check)
+
+def _check_unit(job):
+    """
+    Distinct (rank, value) pairs of one unit with the smallest hand giving
+    each. Module level so the pool workers can unpickle it.
+    """
+    evaluator_name, reference_name, size, unit, seed = job
+    evaluator = CrossCheck.EVALUATORS[evaluator_name]
+    reference = CrossCheck.REFERENCES[reference_name]()
+    if seed is None:
+        prefix = unit
+        hands = (prefix + rest for rest in combinations(xrange(prefix[1] + 1, 52), size - 2))
+    else:
+        rng = random.Random(repr(seed))
+        deck = range(52)
+        hands = (tuple(sorted(rng.sample(deck, size))) for i in xrange(unit))
+    seen = {}
+    count = 0
+    for hand in hands:
+        key = (evaluator(hand), reference(hand))
+        if key not in seen or hand < seen[key]:
+            seen[key] = hand
+        count += 1
+    return count, seen
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-check evaluator ordering against a reference")
+    parser.add_argument("--sizes", default="5,6,7", help="hand sizes, comma separated")
+    parser.add_argument("--samples", type=int, default=1000000, help="random hands per size")
+    parser.add_argument("--exhaustive", action="store_true", help="check every hand instead of sampling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--evaluator", default="hand_evaluator", choices=sorted(CrossCheck.EVALUATORS))
+    parser.add_argument("--reference", default="poker-eval", choices=sorted(CrossCheck.REFERENCES))
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    samples = None if args.exhaustive else args.samples
+    hands, mismatches = CrossCheck.run(sizes, samples, args.seed, args.evaluator, args.reference,
+                                       args.processes, verbose=True)
+    for hand, rank, value, other, other_rank, other_value in mismatches:
+        print("%s rank %d value %d vs %s rank %d value %d" % (
+            list(hand), rank, value, list(other), other_rank, other_value))
+    print("%d hands, %d mismatched pairs" % (hands, len(mismatches)))
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+
+from hand_indexer import HandIndexer
+
+class EquityStore:
+    """
+    Percentiles and equities by suit isomorphic situation in an SQLite
+    file, so they outlive the process and are shared by every game on
+    the host:
+
+        store = EquityStore.open()
+        value = store.get(EquityStore.EQUITY, hole, board, opponents)
+        if value is None:
+            value = compute()
+            store.put(EquityStore.EQUITY, hole, board, opponents, value)
+        ...
+        store.flush()    # between hands
+
+    A situation is its street and HandIndexer index. put() only keeps the
+    value in memory, where get() finds it too, and flush() writes all of
+    them and the use of every hit in one transaction, so the hot path
+    costs a select and never a write. The file is in WAL mode: a crash
+    loses the values not flushed yet, never the file. Past size rows,
+    flush() drops the least recently used.
+
+    Store only exact values. The file's user_version is VERSION, and a
+    store of any other version is emptied when opened, so bump VERSION
+    whenever a change to the code computing the values changes them.
+    """
+    PERCENTILE, EQUITY = 0, 1
+    VERSION = 2
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "equity_store.sqlite")
+    DEFAULT_SIZE = 1000000
+    # Values kept in memory until the next flush, past which put() drops
+    # them
+    MAX_PENDING = 4096
+
+    def __init__(self, path=DEFAULT_PATH, size=DEFAULT_SIZE):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.size = size
+        self.connection = sqlite3.connect(path, timeout=10)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != EquityStore.VERSION:
+                # Values of another version of the code
+                self.connection.execute("DROP TABLE IF EXISTS equities")
+                self.connection.execute("PRAGMA user_version = %d" % EquityStore.VERSION)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS equities ("
+                "kind INTEGER, street INTEGER, situation INTEGER, opponents INTEGER, "
+                "value REAL, used INTEGER, "
+                "PRIMARY KEY (kind, street, situation, opponents))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS equities_used ON equities (used)")
+        # Use counter, higher is more recent
+        self.clock = self.connection.execute("SELECT MAX(used) FROM equities").fetchone()[0] or 0
+        # Rows in the file, counted once then kept up to date by flush, so
+        # it trims the file only when it may be over size
+        self.rows = self.connection.execute("SELECT COUNT(*) FROM equities").fetchone()[0]
+        # Values put and keys found since the last flush
+        self.pending = {}
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def open(path=DEFAULT_PATH, size=DEFAULT_SIZE):
+        """
+        Return the store at path, or None if it can't be opened
+        """
+        try:
+            return EquityStore(path, size)
+        except (sqlite3.Error, OSError):
+            return None
+
+    def key(kind, hole, board, opponents):
+        """
+        Primary key of a situation
+        """
+        return kind, len(board), HandIndexer.street(len(board)).index(hole, board), opponents or 0
+
+    def get(self, kind, hole, board, opponents=0):
+        """
+        Stored value of a situation, or None
+        """
+        key = EquityStore.key(kind, hole, board, opponents)
+        value = self.pending.get(key)
+        if value is None:
+            row = self.connection.execute(
+                "SELECT value FROM equities WHERE kind = ? AND street = ? AND situation = ? AND opponents = ?",
+                key).fetchone()
+            if row is not None:
+                value = row[0]
+                self.used.add(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, kind, hole, board, opponents, value):
+        """
+        Store the value of a situation at the next flush
+        """
+        if len(self.pending) < EquityStore.MAX_PENDING:
+            self.pending[EquityStore.key(kind, hole, board, opponents)] = value
+
+    def flush(self):
+        """
+        Write the values put and uses seen since the last flush, then trim
+        the store to its size
+        """
+        if not self.pending and not self.used:
+            return
+        self.clock += 1
+        with self.connection:
+            # A situation already there, put by another process, has the
+            # same exact value
+            self.rows += self.connection.executemany(
+                "INSERT OR IGNORE INTO equities VALUES (?, ?, ?, ?, ?, ?)",
+                [key + (value, self.clock) for key, value in self.pending.iteritems()]).rowcount
+            self.connection.executemany(
+                "UPDATE equities SET used = ? WHERE kind = ? AND street = ? AND situation = ? AND opponents = ?",
+                [(self.clock,) + key for key in self.used])
+            if self.rows > self.size:
+                # Count again, other processes share the file
+                self.rows = self.connection.execute("SELECT COUNT(*) FROM equities").fetchone()[0]
+                excess = self.rows - self.size
+                if excess > 0:
+                    self.connection.execute(
+                        "DELETE FROM equities WHERE rowid IN "
+                        "(SELECT rowid FROM equities ORDER BY used LIMIT ?)", (excess,))
+                    self.rows = self.size
+        self.pending.clear()
+        self.used.clear()
+
+    def close(self):
+        """
+        Flush and close the file
+        """
+        self.flush()
+        self.connection.close()
+
+    open = staticmethod(open)
+    key = staticmethod(key)
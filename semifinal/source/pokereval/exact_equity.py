@@ -0,0 +1,142 @@
+import random
+import time
+from itertools import combinations, izip
+
+from array_tables import numpy
+from board_state import BoardState
+from card import Card
+from hand_evaluator import HandEvaluator, HandLengthException
+from hole_index import HoleIndex
+
+class ExactEquity:
+    """
+    Heads-up equity on the flop or turn by enumerating every runout and
+    every opponent hole, C(47, 2) x C(45, 2) showdowns on the flop:
+
+        equity = ExactEquity(StateTable.load())
+        equity.equity(hole, board)    # ties count half
+
+    The ranks of all holes on each full board are memoized, so the turn
+    after a flop, another hole on the same board or a repeated inquiry
+    costs no evaluations. Cards are card codes (see Card.to_index).
+
+    With NumPy a board ranks all its holes in one batch, or with two
+    array lookups given a StateTable, and without it through BoardState.
+    Given a time budget, runouts are taken memoized first then in random
+    order, and the result is exact over the runouts done, see complete.
+    """
+    def __init__(self, state_table=None, seed=0):
+        self.state_table = state_table
+        self.rng = random.Random(seed)
+        # Sorted 5-card board to the rank of each hole of HoleIndex.HOLES
+        # with it, 0 for holes sharing a card with the board
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+        # Runouts counted and possible in the last equity call
+        self.runouts = 0
+        self.total_runouts = 0
+
+    def clear(self):
+        """
+        Drop the memoized boards, for a new hand
+        """
+        self.memo.clear()
+
+    def complete(self):
+        """
+        True if the last equity call enumerated every runout
+        """
+        return self.runouts == self.total_runouts
+
+    def board_ranks(self, board):
+        """
+        Ranks of every hole with this 5-card board, memoized
+        """
+        key = tuple(sorted(board))
+        ranks = self.memo.get(key)
+        if ranks is not None:
+            self.hits += 1
+            return ranks
+        self.misses += 1
+        dead = HoleIndex.dead_mask(key)
+        if numpy is not None:
+            live = HoleIndex.live_flags(dead)
+            holes = HoleIndex.hole_array[live]
+            ranks = numpy.zeros(len(HoleIndex.HOLES), dtype=numpy.int32)
+            if self.state_table is not None:
+                table = self.state_table.table
+                p = 0
+                for code in key:
+                    p = table[p + code]
+                ranks[live] = table[table[p + holes[:, 0]] + holes[:, 1]]
+            else:
+                ranks[live] = HandEvaluator.Seven.evaluate_rank_batch(
+                    numpy.hstack((holes, numpy.tile(numpy.array(key, dtype=numpy.intp), (len(holes), 1)))))
+        else:
+            board_state = BoardState(map(Card.from_index, key))
+            ranks = [0] * len(HoleIndex.HOLES)
+            for i, ((a, b), mask) in enumerate(izip(HoleIndex.HOLES, HoleIndex.MASKS)):
+                if not mask & dead:
+                    ranks[i] = board_state.evaluate_codes(a, b)
+        self.memo[key] = ranks
+        return ranks
+
+    def runouts_for(self, hole, board):
+        """
+        Every runout completing board to 5 cards, those already memoized
+        first and the others in random order
+        """
+        dead = HoleIndex.dead_mask(hole) | HoleIndex.dead_mask(board)
+        live = [code for code in xrange(52) if not (dead >> code) & 1]
+        memoized = []
+        fresh = []
+        for runout in combinations(live, 5 - len(board)):
+            if tuple(sorted(tuple(board) + runout)) in self.memo:
+                memoized.append(runout)
+            else:
+                fresh.append(runout)
+        self.rng.shuffle(fresh)
+        return memoized + fresh
+
+    def equity(self, hole, board, budget=None):
+        """
+        Share of the pot hole wins against one random opponent hole over
+        every runout of a 3 or 4-card board, or the 5-card board itself.
+        Stop taking new runouts after budget seconds if one is given.
+        """
+        if len(board) not in (3, 4, 5):
+            raise HandLengthException("Only 3, 4 or 5-card boards are supported by ExactEquity")
+        start = time.time()
+        hole_mask = HoleIndex.dead_mask(hole)
+        runouts = self.runouts_for(hole, board)
+
+        position = HoleIndex.index(hole[0], hole[1])
+        if numpy is not None:
+            opponents = HoleIndex.live_flags(hole_mask)
+        else:
+            opponents = [not mask & hole_mask for mask in HoleIndex.MASKS]
+        share = 0.0
+        showdowns = 0
+        self.runouts = 0
+        self.total_runouts = len(runouts)
+        for runout in runouts:
+            if budget is not None and self.runouts and time.time() - start > budget:
+                break
+            ranks = self.board_ranks(tuple(board) + runout)
+            rank = ranks[position]
+            if numpy is not None:
+                others = ranks[opponents]
+                others = others[others > 0]
+                share += (others > rank).sum() + 0.5 * (others == rank).sum()
+                showdowns += len(others)
+            else:
+                for other, opponent in zip(ranks, opponents):
+                    if other and opponent:
+                        if rank < other:
+                            share += 1
+                        elif rank == other:
+                            share += 0.5
+                        showdowns += 1
+            self.runouts += 1
+        return float(share) / showdowns
@@ -0,0 +1,221 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import combinations
+
+from array_tables import numpy
+from checkpoint import Checkpoint
+from exact_equity import ExactEquity
+from hand_indexer import HandIndexer
+from hole_index import HoleIndex
+from isomorphism import Isomorphism
+from range_equity import RangeEquity
+from state_table import StateTable
+
+class FlopTableException(Exception):
+    pass
+
+class FlopTable:
+    """
+    Exact heads-up equity of every suit isomorphic (hole, flop) situation
+    against one random hole, over every turn and river, memory-mapped:
+
+        table = FlopTable.load()
+        table.equity(hole, flop)    # same as ExactEquity.equity
+
+    There are 1286792 situations, numbered by HandIndexer.street(3). The
+    file is a header (magic, version, count, CRC-32 of the rest) followed
+    by the float32 equity of each situation by index, so a lookup is an
+    index and one read of the mapped file.
+
+    build() takes the 1755 isomorphic flops as units over a process pool.
+    A unit ranks every hole on each runout once and gets the equity of
+    all its holes from RangeEquity.board_counts against a uniform range.
+    Finished units are appended to a progress file, so an interrupted run
+    picks up where it stopped, dropping a unit cut short by the crash.
+    """
+    MAGIC = "PJFT"
+    VERSION = 2
+    HEADER = struct.Struct("<4sIII")
+    UNIT = struct.Struct("<II")
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "flop_equity.bin")
+
+    def __init__(self, path=DEFAULT_PATH, verify=True):
+        """
+        Memory-map a table written by FlopTable.build, checking its CRC-32
+        unless verify is False
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, count, checksum = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION:
+                raise FlopTableException("%s is not a version %d flop table" % (path, self.VERSION))
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.indexer = HandIndexer.street(3)
+        if count != self.indexer.size or len(self.mm) != self.HEADER.size + 4 * count:
+            raise FlopTableException("%s is truncated" % path)
+        if verify and zlib.crc32(self.mm[self.HEADER.size:]) & 0xffffffff != checksum:
+            raise FlopTableException("%s fails its checksum" % path)
+        self.count = count
+        self.value = struct.Struct("<f").unpack_from
+
+    def equity(self, hole, flop):
+        """
+        Equity of the hole against one random hole on this flop
+        """
+        return self.value(self.mm, self.HEADER.size + 4 * self.indexer.index(hole, flop))[0]
+
+    def load(path=DEFAULT_PATH):
+        """
+        Return the table at path, or None if it has not been built
+        """
+        if not os.path.exists(path):
+            return None
+        return FlopTable(path)
+
+    def flops():
+        """
+        The isomorphic flops, in a fixed order
+        """
+        return sorted(set(Isomorphism.canonical((), flop)[1] for flop in combinations(xrange(52), 3)))
+
+    def build(path=DEFAULT_PATH, state_table_path=StateTable.DEFAULT_PATH, processes=None, verbose=False):
+        """
+        Compute every situation, resuming from path's progress file if
+        there is one, and write the table to path. Needs NumPy.
+        """
+        if numpy is None:
+            raise FlopTableException("NumPy is required to build the flop table")
+        # The progress file is the checkpoint, written unit by unit, so
+        # the Checkpoint only runs the pool
+        checkpoint = Checkpoint(path + ".progress")
+        progress_path = checkpoint.path
+        equities = {}
+        done = set()
+        if os.path.exists(progress_path):
+            with open(progress_path, "rb") as f:
+                end = FlopTable.read_progress(f, equities, done)
+            with open(progress_path, "r+b") as f:
+                f.truncate(end)
+        flops = FlopTable.flops()
+        jobs = [(index, flop, state_table_path) for index, flop in enumerate(flops) if index not in done]
+
+        with open(progress_path, "ab") as progress:
+            def finish(result):
+                index, situations, values = result
+                progress.write(FlopTable.UNIT.pack(index, len(situations)))
+                situations = array("I", situations)
+                values = array("f", values)
+                if sys.byteorder != "little":
+                    situations.byteswap()
+                    values.byteswap()
+                situations.tofile(progress)
+                values.tofile(progress)
+                progress.flush()
+                os.fsync(progress.fileno())
+            checkpoint.run(_flop_unit, jobs, finish, processes, verbose)
+
+        with open(progress_path, "rb") as f:
+            FlopTable.read_progress(f, equities, done)
+        if len(done) != len(flops):
+            raise FlopTableException("%d of %d flops done" % (len(done), len(flops)))
+        if len(equities) != HandIndexer.street(3).size:
+            raise FlopTableException("%d of %d situations done" % (len(equities), HandIndexer.street(3).size))
+        FlopTable.write(path, equities)
+        checkpoint.remove()
+        return path
+
+    def read_progress(f, equities, done):
+        """
+        Add the units of a progress file to equities and done, and return
+        the offset after the last complete unit
+        """
+        end = 0
+        while True:
+            header = f.read(FlopTable.UNIT.size)
+            if len(header) < FlopTable.UNIT.size:
+                return end
+            index, count = FlopTable.UNIT.unpack(header)
+            situations = array("I")
+            values = array("f")
+            try:
+                situations.fromfile(f, count)
+                values.fromfile(f, count)
+            except EOFError:
+                return end
+            if sys.byteorder != "little":
+                situations.byteswap()
+                values.byteswap()
+            equities.update(zip(situations, values))
+            done.add(index)
+            end = f.tell()
+
+    def write(path, equities):
+        """
+        Write a dict of every index to its equity, with the checksum
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        values = array("f", [equities[index] for index in xrange(len(equities))])
+        if sys.byteorder != "little":
+            values.byteswap()
+        payload = values.tostring()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(FlopTable.HEADER.pack(FlopTable.MAGIC, FlopTable.VERSION, len(values),
+                                          zlib.crc32(payload) & 0xffffffff))
+            f.write(payload)
+        os.rename(tmp_path, path)
+
+    load = staticmethod(load)
+    flops = staticmethod(flops)
+    build = staticmethod(build)
+    read_progress = staticmethod(read_progress)
+    write = staticmethod(write)
+
+# Per worker state table, loaded by the first unit a worker runs
+_state_table = None
+
+def _flop_unit(job):
+    """
+    (index, situation indices, equities) of every hole on one flop. Module
+    level so the pool workers can unpickle it.
+    """
+    global _state_table
+    index, flop, state_table_path = job
+    if _state_table is None:
+        _state_table = StateTable.load(state_table_path)
+    exact_equity = ExactEquity(_state_table)
+    dead = HoleIndex.dead_mask(flop)
+    positions = numpy.flatnonzero(HoleIndex.live_flags(dead))
+    uniform = numpy.ones(len(HoleIndex.HOLES))
+    shares = numpy.zeros(len(HoleIndex.HOLES))
+    dealt = numpy.zeros(len(HoleIndex.HOLES))
+    live = [code for code in xrange(52) if not (dead >> code) & 1]
+    for runout in combinations(live, 2):
+        ranks = exact_equity.board_ranks(flop + runout)
+        holes = positions[ranks[positions] > 0]
+        (beaten, tied, opponents), = RangeEquity.board_counts(holes, [uniform], ranks)
+        shares[holes] += beaten + 0.5 * tied
+        dealt[holes] += opponents
+    indexer = HandIndexer.street(3)
+    equities = {}
+    for position in positions:
+        equities[indexer.index(HoleIndex.HOLES[position], flop)] = shares[position] / dealt[position]
+    situations = sorted(equities)
+    return index, situations, [equities[situation] for situation in situations]
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else FlopTable.DEFAULT_PATH
+    state_table_path = sys.argv[2] if len(sys.argv) > 2 else StateTable.DEFAULT_PATH
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    FlopTable.build(path, state_table_path, processes, verbose=True)
+    print("%d situations, %s" % (FlopTable(path).count, path))
+
+if __name__ == '__main__':
+    main()
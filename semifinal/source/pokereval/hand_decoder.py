@@ -0,0 +1,108 @@
+from itertools import combinations_with_replacement
+
+from bitmask_evaluator import BitmaskEvaluator
+
+class HandDecoder:
+    """
+    Decode a rank of the HandEvaluator scale back into its hand: the
+    category and the five card ranks (2-14) in order of significance,
+    e.g. a full house of kings over sevens is (13, 13, 13, 7, 7) and
+    the wheel is (5, 4, 3, 2, 14). Both are table lookups by rank.
+
+    best_hand finds which hole and board cards make that hand, without
+    the C library and in constant time for up to 7 cards.
+    """
+    # Categories best first, named as in cpokereval's best()
+    STRAIGHT_FLUSH, FOUR_OF_A_KIND, FULL_HOUSE, FLUSH, STRAIGHT, \
+        THREE_OF_A_KIND, TWO_PAIR, ONE_PAIR, HIGH_CARD = range(9)
+    CATEGORY_NAMES = ("StFlush", "Quads", "FlHouse", "Flush", "Straight",
+                      "Trips", "TwoPair", "OnePair", "NoPair")
+    # Best rank of each category
+    CATEGORY_BOUNDS = (BitmaskEvaluator.STRAIGHT_FLUSH, BitmaskEvaluator.FOUR_OF_A_KIND,
+                       BitmaskEvaluator.FULL_HOUSE, BitmaskEvaluator.FLUSH,
+                       BitmaskEvaluator.STRAIGHT, BitmaskEvaluator.THREE_OF_A_KIND,
+                       BitmaskEvaluator.TWO_PAIR, BitmaskEvaluator.ONE_PAIR,
+                       BitmaskEvaluator.HIGH_CARD)
+
+    def category(rank):
+        """
+        Category of a rank, one of STRAIGHT_FLUSH ... HIGH_CARD
+        """
+        return HandDecoder.RANK_TO_CATEGORY[rank]
+
+    def category_name(rank):
+        """
+        cpokereval name of the category of a rank
+        """
+        return HandDecoder.CATEGORY_NAMES[HandDecoder.RANK_TO_CATEGORY[rank]]
+
+    def kickers(rank):
+        """
+        The five card ranks of a rank, in order of significance
+        """
+        return HandDecoder.RANK_TO_RANKS[rank]
+
+    def best_hand(hole, board, rank=None):
+        """
+        Return (rank, hole cards used, board cards used) for the best five
+        cards of hole + board, which hold 5 to 7 Card objects together.
+        Pass rank if it is already known to skip evaluating the hand.
+
+        Where cards of the same rank are interchangeable, board cards are
+        used first, so a hole card is only listed when the hand needs it.
+        """
+        cards = list(board) + list(hole)
+        if rank is None:
+            rank = BitmaskEvaluator.evaluate_rank(cards)
+        category = HandDecoder.RANK_TO_CATEGORY[rank]
+        ranks = HandDecoder.RANK_TO_RANKS[rank]
+        if category in (HandDecoder.STRAIGHT_FLUSH, HandDecoder.FLUSH):
+            # At most 7 cards, so only one suit can hold 5
+            suits = [card.suit for card in cards]
+            flush_suit = max(suits, key=suits.count)
+            cards = [card for card in cards if card.suit == flush_suit]
+
+        by_rank = {}
+        for card in cards:
+            by_rank.setdefault(card.rank, []).append(card)
+        used = [by_rank[r].pop(0) for r in ranks]
+        hole_used = [card for card in used if card in hole]
+        board_used = [card for card in used if card not in hole_used]
+        return rank, hole_used, board_used
+
+    category = staticmethod(category)
+    category_name = staticmethod(category_name)
+    kickers = staticmethod(kickers)
+    best_hand = staticmethod(best_hand)
+
+def _build_tables():
+    """
+    Fill in RANK_TO_CATEGORY and RANK_TO_RANKS by evaluating one hand of
+    each of the 7462 distinct 5-card hands
+    """
+    t = HandDecoder
+    # Indexed by rank, 1 to 7462
+    t.RANK_TO_CATEGORY = [None] * 7463
+    t.RANK_TO_RANKS = [None] * 7463
+    for ranks in combinations_with_replacement(xrange(13), 5):
+        if any(ranks.count(r) > 4 for r in ranks):
+            continue
+        # Rotate suits by position: equal ranks get distinct suits and the
+        # hand spans several suits, then the same ranks all in one suit
+        hands = [[r * 4 + i % 4 for i, r in enumerate(ranks)]]
+        if len(set(ranks)) == 5:
+            hands.append([r * 4 for r in ranks])
+        for codes in hands:
+            rank = BitmaskEvaluator.evaluate_codes(codes)
+            category = 0
+            while category < 8 and rank >= t.CATEGORY_BOUNDS[category + 1]:
+                category += 1
+            # Most repeated ranks first, then highest
+            significance = sorted((r + 2 for r in ranks), key=lambda r: (-ranks.count(r - 2), -r))
+            if category in (t.STRAIGHT_FLUSH, t.STRAIGHT) and significance[0] == 14 \
+                    and significance[1] == 5:
+                significance = significance[1:] + [14]
+            t.RANK_TO_CATEGORY[rank] = category
+            t.RANK_TO_RANKS[rank] = tuple(significance)
+
+_build_tables()
@@ -1,10 +1,11 @@
 from lookup_tables import LookupTables
+from array_tables import ArrayTables, numpy
+from binary_cards import BinaryCards, HandLengthException
+from board_state import BoardState
+from hole_index import HoleIndex
 from popcount import PopCount
-from itertools import combinations
-from operator import mul, __or__, __and__, __xor__
-
-class HandLengthException(Exception):
-    pass
+from itertools import imap
+from operator import getitem, mul, __or__, __and__, __xor__
 
 class HandEvaluator:
     
@@ -26,6 +27,11 @@ class HandEvaluator:
         evaluate_percentile = staticmethod(evaluate_percentile)
             
     class Five:
+        # RankMultiset offsets keyed by this evaluator's binary cards
+        multiset_offsets = BinaryCards.Five.multiset_offsets
+        # card_to_binary indexed by card code, see Card.to_index
+        binary_by_code = BinaryCards.Five.binary_by_code
+
         def card_to_binary(card):
             """
             Convert the lookup_tables.Card representation to a binary
@@ -85,19 +91,65 @@ class HandEvaluator:
                     return possible_rank
                 else:
                     # We need a different lookup table with different keys
-                    # Compute the unique product of primes, because we have a pair
-                    # or trips, etc. Use the product to look up the rank.
-                    q = reduce(mul, map(lambda card: card & 0xFF, bh))
-                    # Here, use dict instead of sparse array (basically hashing)
-                    # I didn't bother using "perfect hash", the python hashing
-                    # shouldn't be terrible
-                    return LookupTables.Five.pairs.get(q)
+                    # Index the multiset of ranks, because we have a pair
+                    # or trips, etc. Use the index to look up the rank.
+                    # See RankMultiset, it is a dense array instead of a dict
+                    q = sum(imap(getitem, HandEvaluator.Five.multiset_offsets, sorted(bh)))
+                    return LookupTables.Five.pairs[q]
+
+        def evaluate_codes(a, b, c, d, e):
+            """
+            evaluate_rank for five card codes (see Card.to_index)
+            """
+            binary = HandEvaluator.Five.binary_by_code
+            return HandEvaluator.Five.evaluate_binary(binary[a], binary[b], binary[c], binary[d], binary[e])
+
+        def evaluate_binary(a, b, c, d, e):
+            """
+            evaluate_rank for five cards already in binary representation,
+            with the folds unrolled and no intermediate lists
+            """
+            q = (a | b | c | d | e) >> 16
+            if a & b & c & d & e & 0xF000:
+                return LookupTables.Five.flushes[q]
+            possible_rank = LookupTables.Five.unique5[q]
+            if possible_rank != 0:
+                return possible_rank
+            o = HandEvaluator.Five.multiset_offsets
+            s = sorted((a, b, c, d, e))
+            return LookupTables.Five.pairs[o[0][s[0]] + o[1][s[1]] + o[2][s[2]] + o[3][s[3]] + o[4][s[4]]]
+
+        def evaluate_rank_batch(hands):
+            """
+            Vectorized evaluate_rank. Takes an N x 5 array of card codes
+            (see Card.to_index) and returns an N-length array of ranks.
+            Requires NumPy.
+            """
+            hands = HandEvaluator.hand_array(hands, 5, "Five")
+            tables = ArrayTables.Five
+            bh = tables.card_to_binary[hands]
+            has_flush = numpy.bitwise_and.reduce(bh, axis=1) & 0xF000
+            q = numpy.bitwise_or.reduce(bh, axis=1) >> 16
+            ranks = numpy.where(has_flush, tables.flushes[q], tables.unique5[q])
+            # Zero means a pair or better, fall back to the rank multisets
+            paired = ranks == 0
+            if paired.any():
+                ranks[paired] = tables.pairs[ArrayTables.multiset_index(bh[paired])]
+            return ranks
 
         card_to_binary = staticmethod(card_to_binary)
         card_to_binary_lookup = staticmethod(card_to_binary_lookup)
         evaluate_rank = staticmethod(evaluate_rank)
+        evaluate_codes = staticmethod(evaluate_codes)
+        evaluate_binary = staticmethod(evaluate_binary)
+        evaluate_rank_batch = staticmethod(evaluate_rank_batch)
     
     class Six:
+        # RankMultiset offsets keyed by this evaluator's binary cards
+        multiset_offsets = BinaryCards.Six.multiset_offsets
+        # card_to_binary indexed by card code, see Card.to_index
+        binary_by_code = BinaryCards.Six.binary_by_code
+
         def card_to_binary(card):
             """
             Convert the lookup_tables.Card representation to a binary
@@ -178,34 +230,34 @@ class HandEvaluator:
             # 4-1 => Pair (1,1,1,1,2)
             #   Look up by even_xor (which pair) then odd_xor (which set of kickers)
             # 4-0 => Trips (1,1,1,3)
-            #   Don't know which one is the triple, use prime product of ranks
+            #   Don't know which one is the triple, use the multiset of ranks
             # 2-2 => Two pair (1,1,2,2)
             #   Look up by odd_xor then even_xor (or vice-versa)
             # 2-1 => Four of a kind (1,1,4) or full house (1,3,2)
-            #   Look up by prime product
+            #   Look up by rank multiset
             # 2-0 => Full house using 2 trips (3,3)
             #   Look up by odd_xor
             # 0-3 => Three pairs (2,2,2)
             #   Look up by even_xor
             # 0-2 => Four of a kind with pair (2,4)
-            #   Look up by prime product
+            #   Look up by rank multiset
         
-            # Any time you can't disambiguate 2/4 or 1/3, use primes.
+            # Any time you can't disambiguate 2/4 or 1/3, use the rank multiset.
             # We also assume you can count bits or determine a power of two.
             # (see PopCount class.)
             
             if even_xor == 0: # x-0
                 odd_popcount = PopCount.popcount(odd_xor)
                 if odd_popcount == 4: # 4-0
-                    prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                    return LookupTables.Six.prime_products_to_rank[prime_product]
+                    multiset = sum(imap(getitem, HandEvaluator.Six.multiset_offsets, sorted(bh)))
+                    return LookupTables.Six.rank_multisets_to_rank[multiset]
                 else: # 6-0, 2-0
                     return LookupTables.Six.odd_xors_to_rank[odd_xor]
             elif odd_xor == 0: # 0-x
                 even_popcount = PopCount.popcount(even_xor)
                 if even_popcount == 2: # 0-2
-                    prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                    return LookupTables.Six.prime_products_to_rank[prime_product]
+                    multiset = sum(imap(getitem, HandEvaluator.Six.multiset_offsets, sorted(bh)))
+                    return LookupTables.Six.rank_multisets_to_rank[multiset]
                 else: # 0-3
                     return LookupTables.Six.even_xors_to_rank[even_xor]
             else: # odd_popcount is 4 or 2
@@ -217,14 +269,101 @@ class HandEvaluator:
                     if even_popcount == 2: # 2-2
                         return LookupTables.Six.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
                     else: # 2-1
-                        prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                        return LookupTables.Six.prime_products_to_rank[prime_product]
+                        multiset = sum(imap(getitem, HandEvaluator.Six.multiset_offsets, sorted(bh)))
+                        return LookupTables.Six.rank_multisets_to_rank[multiset]
+
+        def evaluate_codes(a, b, c, d, e, f):
+            """
+            evaluate_rank for six card codes (see Card.to_index)
+            """
+            binary = HandEvaluator.Six.binary_by_code
+            return HandEvaluator.Six.evaluate_binary(binary[a], binary[b], binary[c], binary[d], binary[e], binary[f])
+
+        def evaluate_binary(a, b, c, d, e, f):
+            """
+            evaluate_rank for six cards already in binary representation,
+            with the folds unrolled and no intermediate lists
+            """
+            tables = LookupTables.Six
+            flush_suit = tables.prime_products_to_flush.get(
+                ((a >> 12) & 0xF) * ((b >> 12) & 0xF) * ((c >> 12) & 0xF) *
+                ((d >> 12) & 0xF) * ((e >> 12) & 0xF) * ((f >> 12) & 0xF))
+            if flush_suit:
+                # OR together the cards of the flush suit, unrolled
+                bits = 0
+                if (a >> 12) & 0xF == flush_suit: bits |= a
+                if (b >> 12) & 0xF == flush_suit: bits |= b
+                if (c >> 12) & 0xF == flush_suit: bits |= c
+                if (d >> 12) & 0xF == flush_suit: bits |= d
+                if (e >> 12) & 0xF == flush_suit: bits |= e
+                if (f >> 12) & 0xF == flush_suit: bits |= f
+                return tables.flush_rank_bits_to_rank[bits >> 16]
+
+            odd_xor = (a ^ b ^ c ^ d ^ e ^ f) >> 16
+            even_xor = ((a | b | c | d | e | f) >> 16) ^ odd_xor
+            popcount = PopCount.POPCOUNT_TABLE16
+            # Same odd-even cases as evaluate_rank
+            if even_xor == 0:
+                if popcount[odd_xor] != 4: # 6-0, 2-0
+                    return tables.odd_xors_to_rank[odd_xor]
+            elif odd_xor == 0:
+                if popcount[even_xor] != 2: # 0-3
+                    return tables.even_xors_to_rank[even_xor]
+            elif popcount[odd_xor] == 4 or popcount[even_xor] == 2: # 4-1, 2-2
+                return tables.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
+            # 4-0, 0-2, 2-1
+            o = HandEvaluator.Six.multiset_offsets
+            s = sorted((a, b, c, d, e, f))
+            return tables.rank_multisets_to_rank[
+                o[0][s[0]] + o[1][s[1]] + o[2][s[2]] + o[3][s[3]] + o[4][s[4]] + o[5][s[5]]]
+
+        def evaluate_rank_batch(hands):
+            """
+            Vectorized evaluate_rank. Takes an N x 6 array of card codes
+            (see Card.to_index) and returns an N-length array of ranks.
+            Requires NumPy.
+            """
+            hands = HandEvaluator.hand_array(hands, 6, "Six")
+            tables = ArrayTables.Six
+            bh = tables.card_to_binary[hands]
+            rank_bits = bh >> 16
+            ranks = numpy.zeros(len(hands), dtype=numpy.int32)
+            rest = ~HandEvaluator.batch_flush_ranks(hands, rank_bits, tables, ranks)
+
+            # Same odd-even cases as evaluate_rank, one mask per table
+            odd_xor = numpy.bitwise_xor.reduce(rank_bits, axis=1)
+            even_xor = numpy.bitwise_or.reduce(rank_bits, axis=1) ^ odd_xor
+            odd_popcount = ArrayTables.popcount[odd_xor]
+            even_popcount = ArrayTables.popcount[even_xor]
+            by_odd = rest & (even_xor == 0) & (odd_popcount != 4) # 6-0, 2-0
+            by_even = rest & (odd_xor == 0) & (even_popcount == 3) # 0-3
+            by_xors = rest & (odd_xor != 0) & (even_xor != 0) & \
+                ((odd_popcount == 4) | (even_popcount == 2)) # 4-1, 2-2
+            by_multiset = rest & ~(by_odd | by_even | by_xors) # 4-0, 0-2, 2-1
+
+            ranks[by_odd] = tables.odd_xors_to_rank[odd_xor[by_odd]]
+            ranks[by_even] = tables.even_xors_to_rank[even_xor[by_even]]
+            if by_xors.any():
+                ranks[by_xors] = ArrayTables.search(tables.xor_keys, tables.xor_ranks,
+                    (even_xor[by_xors] << 13) | odd_xor[by_xors])
+            if by_multiset.any():
+                ranks[by_multiset] = tables.rank_multisets_to_rank[
+                    ArrayTables.multiset_index(bh[by_multiset])]
+            return ranks
 
         card_to_binary = staticmethod(card_to_binary)
         card_to_binary_lookup = staticmethod(card_to_binary_lookup)
         evaluate_rank = staticmethod(evaluate_rank)
+        evaluate_codes = staticmethod(evaluate_codes)
+        evaluate_binary = staticmethod(evaluate_binary)
+        evaluate_rank_batch = staticmethod(evaluate_rank_batch)
     
     class Seven:
+        # RankMultiset offsets keyed by this evaluator's binary cards
+        multiset_offsets = BinaryCards.Seven.multiset_offsets
+        # card_to_binary indexed by card code, see Card.to_index
+        binary_by_code = BinaryCards.Seven.binary_by_code
+
         def card_to_binary(card):
             """
             Convert the lookup_tables.Card representation to a binary
@@ -299,8 +438,8 @@ class HandEvaluator:
                 if odd_popcount == 7: # 7-0
                     return LookupTables.Seven.odd_xors_to_rank[odd_xor]
                 else: # 5-0, 3-0
-                    prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                    return LookupTables.Seven.prime_products_to_rank[prime_product]
+                    multiset = sum(imap(getitem, HandEvaluator.Seven.multiset_offsets, sorted(bh)))
+                    return LookupTables.Seven.rank_multisets_to_rank[multiset]
             else:
                 odd_popcount = PopCount.popcount(odd_xor)
                 if odd_popcount == 5: # 5-1
@@ -310,20 +449,106 @@ class HandEvaluator:
                     if even_popcount == 2: # 3-2
                         return LookupTables.Seven.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
                     else: # 3-1
-                        prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                        return LookupTables.Seven.prime_products_to_rank[prime_product]
+                        multiset = sum(imap(getitem, HandEvaluator.Seven.multiset_offsets, sorted(bh)))
+                        return LookupTables.Seven.rank_multisets_to_rank[multiset]
                 else:
                     even_popcount = PopCount.popcount(even_xor)
                     if even_popcount == 3: # 1-3
                         return LookupTables.Seven.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
                     elif even_popcount == 2: # 1-2
-                        prime_product = reduce(mul, map(lambda card: card & 0xFF, bh))
-                        return LookupTables.Seven.prime_products_to_rank[prime_product]
+                        multiset = sum(imap(getitem, HandEvaluator.Seven.multiset_offsets, sorted(bh)))
+                        return LookupTables.Seven.rank_multisets_to_rank[multiset]
                     else: # 1-1
                         return LookupTables.Seven.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
+
+        def evaluate_codes(a, b, c, d, e, f, g):
+            """
+            evaluate_rank for seven card codes (see Card.to_index)
+            """
+            binary = HandEvaluator.Seven.binary_by_code
+            return HandEvaluator.Seven.evaluate_binary(
+                binary[a], binary[b], binary[c], binary[d], binary[e], binary[f], binary[g])
+
+        def evaluate_binary(a, b, c, d, e, f, g):
+            """
+            evaluate_rank for seven cards already in binary representation,
+            with the folds unrolled and no intermediate lists
+            """
+            tables = LookupTables.Seven
+            flush_suit = tables.prime_products_to_flush.get(
+                ((a >> 12) & 0xF) * ((b >> 12) & 0xF) * ((c >> 12) & 0xF) * ((d >> 12) & 0xF) *
+                ((e >> 12) & 0xF) * ((f >> 12) & 0xF) * ((g >> 12) & 0xF))
+            if flush_suit:
+                # OR together the cards of the flush suit, unrolled
+                bits = 0
+                if (a >> 12) & 0xF == flush_suit: bits |= a
+                if (b >> 12) & 0xF == flush_suit: bits |= b
+                if (c >> 12) & 0xF == flush_suit: bits |= c
+                if (d >> 12) & 0xF == flush_suit: bits |= d
+                if (e >> 12) & 0xF == flush_suit: bits |= e
+                if (f >> 12) & 0xF == flush_suit: bits |= f
+                if (g >> 12) & 0xF == flush_suit: bits |= g
+                return tables.flush_rank_bits_to_rank[bits >> 16]
+
+            odd_xor = (a ^ b ^ c ^ d ^ e ^ f ^ g) >> 16
+            even_xor = ((a | b | c | d | e | f | g) >> 16) ^ odd_xor
+            popcount = PopCount.POPCOUNT_TABLE16
+            # Same odd-even cases as evaluate_rank
+            odd_popcount = popcount[odd_xor]
+            if even_xor == 0:
+                if odd_popcount == 7: # 7-0
+                    return tables.odd_xors_to_rank[odd_xor]
+            else:
+                even_popcount = popcount[even_xor]
+                if odd_popcount == 5 or (odd_popcount == 3 and even_popcount == 2) or \
+                        (odd_popcount == 1 and even_popcount != 2): # 5-1, 3-2, 1-3, 1-1
+                    return tables.even_xors_to_odd_xors_to_rank[even_xor][odd_xor]
+            # 5-0, 3-0, 3-1, 1-2
+            o = HandEvaluator.Seven.multiset_offsets
+            s = sorted((a, b, c, d, e, f, g))
+            return tables.rank_multisets_to_rank[
+                o[0][s[0]] + o[1][s[1]] + o[2][s[2]] + o[3][s[3]] + o[4][s[4]] + o[5][s[5]] + o[6][s[6]]]
+
+        def evaluate_rank_batch(hands):
+            """
+            Vectorized evaluate_rank. Takes an N x 7 array of card codes
+            (see Card.to_index) and returns an N-length array of ranks.
+            Requires NumPy.
+            """
+            hands = HandEvaluator.hand_array(hands, 7, "Seven")
+            tables = ArrayTables.Seven
+            bh = tables.card_to_binary[hands]
+            rank_bits = bh >> 16
+            ranks = numpy.zeros(len(hands), dtype=numpy.int32)
+            rest = ~HandEvaluator.batch_flush_ranks(hands, rank_bits, tables, ranks)
+
+            # Same odd-even cases as evaluate_rank, one mask per table
+            odd_xor = numpy.bitwise_xor.reduce(rank_bits, axis=1)
+            even_xor = numpy.bitwise_or.reduce(rank_bits, axis=1) ^ odd_xor
+            odd_popcount = ArrayTables.popcount[odd_xor]
+            even_popcount = ArrayTables.popcount[even_xor]
+            by_odd = rest & (odd_popcount == 7) # 7-0
+            by_xors = rest & (even_xor != 0) & (
+                (odd_popcount == 5) | # 5-1
+                ((odd_popcount == 3) & (even_popcount == 2)) | # 3-2
+                ((odd_popcount == 1) & (even_popcount != 2))) # 1-3, 1-1
+            by_multiset = rest & ~(by_odd | by_xors) # 5-0, 3-0, 3-1, 1-2
+
+            ranks[by_odd] = tables.odd_xors_to_rank[odd_xor[by_odd]]
+            if by_xors.any():
+                ranks[by_xors] = ArrayTables.search(tables.xor_keys, tables.xor_ranks,
+                    (even_xor[by_xors] << 13) | odd_xor[by_xors])
+            if by_multiset.any():
+                ranks[by_multiset] = tables.rank_multisets_to_rank[
+                    ArrayTables.multiset_index(bh[by_multiset])]
+            return ranks
+
         card_to_binary = staticmethod(card_to_binary)
         card_to_binary_lookup = staticmethod(card_to_binary_lookup)
         evaluate_rank = staticmethod(evaluate_rank)
+        evaluate_codes = staticmethod(evaluate_codes)
+        evaluate_binary = staticmethod(evaluate_binary)
+        evaluate_rank_batch = staticmethod(evaluate_rank_batch)
 
     # These are the main functions
     def evaluate_hand(hand, board=[]):
@@ -355,15 +580,59 @@ class HandEvaluator:
         
         rank = evaluator.evaluate_rank(cards)
         
-        possible_opponent_hands = list(combinations(LookupTables.deck - set(cards), len(hand)))
+        if ArrayTables.available():
+            # Score every opponent hole in one batched call
+            codes = [card.to_index() for card in cards]
+            holes = HoleIndex.live_array(HoleIndex.dead_mask(codes))
+            board_codes = numpy.array(codes[len(hand):], dtype=numpy.intp)
+            opponent_ranks = evaluator.evaluate_rank_batch(numpy.hstack(
+                (holes, numpy.tile(board_codes, (len(holes), 1)))))
+            hands_beaten = (rank < opponent_ranks).sum() + 0.5 * (rank == opponent_ranks).sum()
+            return float(hands_beaten) / len(holes)
+        
+        # Digest the board once, then only fold in each opponent hole
+        board_state = BoardState(board)
+        holes = HoleIndex.live(HoleIndex.dead_mask([card.to_index() for card in cards]))
         hands_beaten = 0
-        for h in possible_opponent_hands:
-            possible_opponent_rank = evaluator.evaluate_rank(list(h) + board)
+        for a, b in holes:
+            possible_opponent_rank = board_state.evaluate_codes(a, b)
             if rank < possible_opponent_rank:
                 # you beat this hand
                 hands_beaten += 1
             elif rank == possible_opponent_rank:
                 hands_beaten += 0.5
-        return float(hands_beaten) / len(list(possible_opponent_hands))
+        return float(hands_beaten) / len(holes)
+
+    def hand_array(hands, length, name):
+        """
+        Convert an N x length array-like of card codes for the batched evaluators
+        """
+        ArrayTables.build()
+        hands = numpy.asarray(hands, dtype=numpy.intp)
+        if hands.ndim == 1 and hands.size == 0:
+            hands = hands.reshape(0, length)
+        if hands.ndim != 2 or hands.shape[1] != length:
+            raise HandLengthException("Only %d-card hands are supported by the %s evaluator" % (length, name))
+        return hands
+
+    def batch_flush_ranks(hands, rank_bits, tables, ranks):
+        """
+        Shared flush pass of the 6 and 7 card batched evaluators.
+        Fill in ranks for hands with 5+ cards of one suit, return that mask.
+        """
+        suits = hands & 3
+        is_flush = numpy.zeros(len(hands), dtype=bool)
+        for suit in xrange(4):
+            in_suit = suits == suit
+            suit_flush = in_suit.sum(axis=1) >= 5
+            if suit_flush.any():
+                # OR together the rank bits of the flush suit only
+                bits = numpy.bitwise_or.reduce(
+                    numpy.where(in_suit[suit_flush], rank_bits[suit_flush], 0), axis=1)
+                ranks[suit_flush] = tables.flush_rank_bits_to_rank[bits]
+                is_flush |= suit_flush
+        return is_flush
 
-    evaluate_hand = staticmethod(evaluate_hand)
\ No newline at end of file
+    evaluate_hand = staticmethod(evaluate_hand)
+    hand_array = staticmethod(hand_array)
+    batch_flush_ranks = staticmethod(batch_flush_ranks)
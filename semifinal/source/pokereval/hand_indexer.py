@@ -0,0 +1,198 @@
+from bisect import bisect_right
+from itertools import product
+
+class HandIndexer:
+    """
+    Dense index of the suit isomorphic (hole, board) situations of one
+    street, in [0, size), and back, after Waugh, "A fast and optimal hand
+    isomorphism algorithm":
+
+        indexer = HandIndexer.street(3)
+        i = indexer.index(hole, flop)           # 0 <= i < 1286792
+        hole, flop = indexer.unindex(i)         # a representative
+
+    Streets have 169, 1286792, 13960050 and 123156254 situations for 0, 3,
+    4 and 5 board cards. Situations are classes of Isomorphism.canonical,
+    so a table of any street can be a flat array by index.
+
+    Each suit holds some ranks of the hole and some others of the board,
+    numbered by the colex rank of the hole ranks, then of the board ranks
+    among the 13 - h others. Suits are sorted by their (hole, board)
+    sizes, the configuration, and the suits of equal sizes hold a multiset
+    of numbers, ranked as a combination with repetition. The index is the
+    offset of the configuration plus the multiset ranks in mixed radix.
+    """
+    # Built indexers by board size, see street
+    indexers = {}
+    # binomial[n][k] for n, k <= 13
+    binomial = [[0] * 14 for i in xrange(14)]
+    for n in xrange(14):
+        binomial[n][0] = 1
+        for k in xrange(1, n + 1):
+            binomial[n][k] = binomial[n - 1][k - 1] + binomial[n - 1][k]
+    # Colex rank of each 13-bit rank mask among masks of its popcount,
+    # and the masks of each popcount by rank
+    colex = [0] * 8192
+    masks_by_count = [[] for i in xrange(14)]
+    for mask in xrange(8192):
+        count = bin(mask).count("1")
+        rank = 0
+        bit = 0
+        for position in xrange(13):
+            if (mask >> position) & 1:
+                bit += 1
+                rank += binomial[position][bit]
+        colex[mask] = rank
+    for mask in sorted(xrange(8192), key=colex.__getitem__):
+        masks_by_count[bin(mask).count("1")].append(mask)
+    del i, n, k, mask, count, rank, bit, position
+
+    def __init__(self, board_size):
+        self.board_size = board_size
+        # Configurations: per suit (hole ranks, board ranks) counts, sorted
+        # in decreasing order, each with its offset and group sizes
+        self.configurations = sorted(set(
+            tuple(sorted(zip(holes, boards), reverse=True))
+            for holes in product(xrange(3), repeat=4) if sum(holes) == 2
+            for boards in product(xrange(board_size + 1), repeat=4) if sum(boards) == board_size))
+        self.offsets = []
+        self.groups = []
+        size = 0
+        for configuration in self.configurations:
+            self.offsets.append(size)
+            # (first suit, suits, numbers a suit can hold, multisets) of
+            # the suits of equal counts
+            groups = []
+            for position, (holes, boards) in enumerate(configuration):
+                numbers = HandIndexer.binomial[13][holes] * HandIndexer.binomial[13 - holes][boards]
+                if groups and configuration[groups[-1][0]] == (holes, boards):
+                    first, suits = groups[-1][:2]
+                    groups[-1] = (first, suits + 1, numbers, HandIndexer.multisets(numbers, suits + 1))
+                else:
+                    groups.append((position, 1, numbers, numbers))
+            self.groups.append(groups)
+            configuration_size = 1
+            for first, suits, numbers, multisets in groups:
+                configuration_size *= multisets
+            size += configuration_size
+        self.size = size
+        self.configuration_ids = dict((configuration, i) for i, configuration in enumerate(self.configurations))
+
+    def street(board_size):
+        """
+        The indexer of a 0, 3, 4 or 5-card board, built once
+        """
+        indexer = HandIndexer.indexers.get(board_size)
+        if indexer is None:
+            indexer = HandIndexer.indexers[board_size] = HandIndexer(board_size)
+        return indexer
+
+    def multisets(numbers, count):
+        """
+        Multisets of count numbers below numbers
+        """
+        total = 1
+        for i in xrange(count):
+            total = total * (numbers + i) // (i + 1)
+        return total
+
+    def index(self, hole, board):
+        """
+        Index of the situation of hole and board, card codes
+        """
+        holes = [0, 0, 0, 0]
+        boards = [0, 0, 0, 0]
+        for code in hole:
+            holes[code & 3] |= 1 << (code >> 2)
+        for code in board:
+            boards[code & 3] |= 1 << (code >> 2)
+        # Drop the hole ranks out of the board masks, highest first
+        for code in sorted(hole, reverse=True):
+            rank = code >> 2
+            board_mask = boards[code & 3]
+            boards[code & 3] = (board_mask & ((1 << rank) - 1)) | ((board_mask >> (rank + 1)) << rank)
+        colex = HandIndexer.colex
+        binomial = HandIndexer.binomial
+        suits = []
+        for hole_mask, board_mask in zip(holes, boards):
+            hole_count = bin(hole_mask).count("1")
+            board_count = bin(board_mask).count("1")
+            suits.append((hole_count, board_count,
+                          colex[hole_mask] * binomial[13 - hole_count][board_count] + colex[board_mask]))
+        suits.sort(reverse=True)
+        configuration = self.configuration_ids[tuple((h, b) for h, b, number in suits)]
+        index = 0
+        for first, count, numbers, multisets in self.groups[configuration]:
+            if count == 1:
+                index = index * multisets + suits[first][2]
+                continue
+            # Numbers of the group in increasing order made strictly
+            # increasing, then ranked as a combination
+            rank = 0
+            for j, (h, b, number) in enumerate(reversed(suits[first:first + count])):
+                rank += HandIndexer.choose(number + j, j + 1)
+            index = index * multisets + rank
+        return self.offsets[configuration] + index
+
+    def unindex(self, index):
+        """
+        (hole, board) of a representative of the situation at index, each
+        sorted, with suits numbered by decreasing configuration
+        """
+        if not 0 <= index < self.size:
+            raise ValueError("%d is not an index of a %d-card board" % (index, self.board_size))
+        configuration = bisect_right(self.offsets, index) - 1
+        index -= self.offsets[configuration]
+        groups = self.groups[configuration]
+        ranks = []
+        for first, count, numbers, multisets in reversed(groups):
+            index, rank = divmod(index, multisets)
+            ranks.append(rank)
+        ranks.reverse()
+        hole = []
+        board = []
+        for (first, count, numbers, multisets), rank in zip(groups, ranks):
+            # Unrank the combination, largest element first: the largest
+            # value with choose(value, j) <= rank, by bisection
+            values = []
+            for j in xrange(count, 0, -1):
+                low, high = j - 1, numbers + j - 1
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if HandIndexer.choose(middle, j) <= rank:
+                        low = middle
+                    else:
+                        high = middle - 1
+                rank -= HandIndexer.choose(low, j)
+                values.append(low - (j - 1))
+            for suit, number in zip(xrange(first, first + count), values):
+                hole_count, board_count = self.configurations[configuration][suit]
+                hole_rank, board_rank = divmod(number, HandIndexer.binomial[13 - hole_count][board_count])
+                hole_mask = HandIndexer.masks_by_count[hole_count][hole_rank]
+                board_mask = HandIndexer.masks_by_count[board_count][board_rank]
+                # Spread the board mask back around the hole ranks
+                for rank_of_hole in xrange(13):
+                    if (hole_mask >> rank_of_hole) & 1:
+                        low = board_mask & ((1 << rank_of_hole) - 1)
+                        board_mask = low | ((board_mask >> rank_of_hole) << (rank_of_hole + 1))
+                for rank_of_card in xrange(13):
+                    if (hole_mask >> rank_of_card) & 1:
+                        hole.append(rank_of_card << 2 | suit)
+                    if (board_mask >> rank_of_card) & 1:
+                        board.append(rank_of_card << 2 | suit)
+        return tuple(sorted(hole)), tuple(sorted(board))
+
+    def choose(n, k):
+        """
+        Binomial coefficient for any n
+        """
+        if k < 0 or k > n:
+            return 0
+        total = 1
+        for i in xrange(k):
+            total = total * (n - i) // (i + 1)
+        return total
+
+    street = staticmethod(street)
+    multisets = staticmethod(multisets)
+    choose = staticmethod(choose)
@@ -0,0 +1,148 @@
+import time
+
+from array_tables import numpy
+from board_index import BoardIndex
+from exact_equity import ExactEquity
+from hand_evaluator import HandLengthException
+from hole_index import HoleIndex
+
+class HandPotential:
+    """
+    Hand strength and potential against one random opponent hole, as in
+    Billings et al., "The challenge of poker":
+
+        potential = HandPotential(ExactEquity(StateTable.load()))
+        potential.potential(hole, board)
+        # {"hs": ..., "ppot": ..., "npot": ..., "ehs": ..., "ehs2": ...}
+
+    hs is the share of opponent holes beaten now, ties counting half.
+    Each (opponent, runout) is then counted by whether we are ahead, tied
+    or behind now and at the river: ppot is the chance of ending ahead
+    when behind now, npot of ending behind when ahead now, ties counting
+    half both times. ehs = hs * (1 - npot) + (1 - hs) * ppot, and ehs2
+    is the mean over runouts of the squared river hand strength. Runouts
+    go all the way to the river, two cards on the flop.
+
+    The river ranks of every hole come from the ExactEquity memo, shared
+    with the equity calls on the same hand, and the current ranks from a
+    BoardIndex per board, so a query is mostly array lookups. Given a
+    time budget, runouts are taken as in ExactEquity.equity and the
+    result is over the runouts done.
+    """
+    AHEAD, TIED, BEHIND = 0, 1, 2
+
+    def __init__(self, exact_equity=None):
+        self.exact_equity = exact_equity or ExactEquity()
+        # Sorted 3 or 4-card board to the ranks of HoleIndex.HOLES with it
+        self.current = {}
+        # Runouts counted and possible in the last potential call
+        self.runouts = 0
+        self.total_runouts = 0
+
+    def clear(self):
+        """
+        Drop the memoized boards, for a new hand
+        """
+        self.current.clear()
+        self.exact_equity.clear()
+
+    def complete(self):
+        """
+        True if the last potential call enumerated every runout
+        """
+        return self.runouts == self.total_runouts
+
+    def board_ranks(self, board):
+        """
+        Ranks of every hole with this board, memoized
+        """
+        if len(board) == 5:
+            return self.exact_equity.board_ranks(board)
+        key = tuple(sorted(board))
+        ranks = self.current.get(key)
+        if ranks is None:
+            ranks = BoardIndex(key).ranks
+            if numpy is not None:
+                ranks = numpy.array(ranks, dtype=numpy.int32)
+            self.current[key] = ranks
+        return ranks
+
+    def classes(rank, ranks):
+        """
+        AHEAD, TIED or BEHIND of a hand of this rank against each of ranks
+        """
+        if numpy is not None:
+            return 1 + numpy.sign(rank - ranks)
+        return [HandPotential.AHEAD if rank < other else
+                HandPotential.TIED if rank == other else
+                HandPotential.BEHIND for other in ranks]
+
+    def potential(self, hole, board, budget=None):
+        """
+        Dict of hs, ppot, npot, ehs and ehs2 of hole on a 3, 4 or 5-card
+        board. Stop taking new runouts after budget seconds if one is given.
+        """
+        if len(board) not in (3, 4, 5):
+            raise HandLengthException("Only 3, 4 or 5-card boards are supported by HandPotential")
+        start = time.time()
+        position = HoleIndex.index(hole[0], hole[1])
+        hole_mask = HoleIndex.dead_mask(hole)
+        current = self.board_ranks(board)
+        now = HandPotential.classes(current[position], current)
+        if numpy is not None:
+            opponents = HoleIndex.live_flags(hole_mask) & (current > 0)
+        else:
+            opponents = [not mask & hole_mask and other > 0
+                         for mask, other in zip(HoleIndex.MASKS, current)]
+
+        # counts[now * 3 + river] over (opponent, runout), and the squared
+        # river strength summed over runouts
+        counts = [0] * 9
+        squares = 0.0
+        runouts = self.exact_equity.runouts_for(hole, board) if len(board) < 5 else [()]
+        self.runouts = 0
+        self.total_runouts = len(runouts)
+        for runout in runouts:
+            if budget is not None and self.runouts and time.time() - start > budget:
+                break
+            ranks = self.exact_equity.board_ranks(tuple(board) + runout)
+            river = HandPotential.classes(ranks[position], ranks)
+            if numpy is not None:
+                live = opponents & (ranks > 0)
+                seen = numpy.bincount(now[live] * 3 + river[live], minlength=9)
+            else:
+                seen = [0] * 9
+                for i, opponent in enumerate(opponents):
+                    if opponent and ranks[i]:
+                        seen[now[i] * 3 + river[i]] += 1
+            for i in xrange(9):
+                counts[i] += int(seen[i])
+            ahead = seen[0] + seen[3] + seen[6]
+            tied = seen[1] + seen[4] + seen[7]
+            squares += (float(ahead + 0.5 * tied) / sum(seen)) ** 2
+            self.runouts += 1
+        return HandPotential.summarize(counts, squares / self.runouts)
+
+    def summarize(counts, ehs2):
+        """
+        The potential dict of ahead/tied/behind counts now by the river
+        """
+        ahead, tied, behind = [sum(counts[i * 3:i * 3 + 3]) for i in (0, 1, 2)]
+        total = ahead + tied + behind
+        hs = (ahead + 0.5 * tied) / total
+        ppot = npot = 0.0
+        # Ending ahead from behind or tied, behind from ahead or tied
+        if behind + tied:
+            ppot = (counts[6] + 0.5 * counts[7] + 0.5 * counts[3]) / (behind + 0.5 * tied)
+        if ahead + tied:
+            npot = (counts[2] + 0.5 * counts[1] + 0.5 * counts[5]) / (ahead + 0.5 * tied)
+        return {
+            "hs": hs,
+            "ppot": ppot,
+            "npot": npot,
+            "ehs": hs * (1 - npot) + (1 - hs) * ppot,
+            "ehs2": ehs2
+        }
+
+    classes = staticmethod(classes)
+    summarize = staticmethod(summarize)
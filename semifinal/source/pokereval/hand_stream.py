@@ -0,0 +1,96 @@
+import time
+from itertools import islice
+
+from backends import Backends
+
+class HandStream:
+    """
+    Rank an iterable of hands of any size, such as an exhaustive
+    enumeration or parsed hand histories, in fixed-size chunks through
+    the batched rank backend. Ranks come out in input order and at most
+    one chunk of hands is held in memory:
+
+        stream = HandStream(combinations(xrange(52), 7), chunk_size=65536)
+        for rank in stream:
+            ...
+        print stream.report()
+
+    Hands are sequences of 5 to 7 card codes (see Card.to_index). Bigger
+    chunks amortize the per-call overhead, smaller ones yield sooner.
+    """
+    DEFAULT_CHUNK_SIZE = 16384
+
+    def __init__(self, hands, chunk_size=DEFAULT_CHUNK_SIZE, backend=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.hands = iter(hands)
+        self.chunk_size = chunk_size
+        self.backend = backend
+        # Hands and chunks ranked so far, and the seconds spent ranking them
+        self.count = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        for ranks in self.iter_chunks():
+            for rank in ranks:
+                yield rank
+
+    def iter_chunks(self):
+        """
+        Yield the ranks of each chunk as one list, for consumers that
+        work in batches too
+        """
+        backend = self.backend or Backends.get('rank_batch')
+        while True:
+            chunk = list(islice(self.hands, self.chunk_size))
+            if not chunk:
+                return
+            start = time.time()
+            ranks = HandStream.evaluate_chunk(backend, chunk)
+            self.elapsed += time.time() - start
+            self.count += len(chunk)
+            self.chunks += 1
+            yield ranks
+
+    def throughput(self):
+        """
+        Hands ranked per second of ranking so far
+        """
+        if self.elapsed == 0:
+            return 0.0
+        return self.count / self.elapsed
+
+    def report(self):
+        """
+        One line summary of the work done so far
+        """
+        return "%d hands in %d chunks of %d, %.2fs, %.0f hands/s" % (
+            self.count, self.chunks, self.chunk_size, self.elapsed, self.throughput())
+
+    def evaluate_chunk(backend, chunk):
+        """
+        Rank a list of hands, batching the hands of each length together
+        """
+        by_length = {}
+        for i, hand in enumerate(chunk):
+            by_length.setdefault(len(hand), []).append(i)
+        if len(by_length) == 1:
+            return HandStream.to_list(backend.rank_batch(chunk))
+        ranks = [None] * len(chunk)
+        for indices in by_length.itervalues():
+            batch = HandStream.to_list(backend.rank_batch([chunk[i] for i in indices]))
+            for i, rank in zip(indices, batch):
+                ranks[i] = rank
+        return ranks
+
+    def to_list(ranks):
+        """
+        Plain list of ints from a backend's rank_batch result
+        """
+        if isinstance(ranks, list):
+            return ranks
+        return ranks.tolist()
+
+    evaluate_chunk = staticmethod(evaluate_chunk)
+    to_list = staticmethod(to_list)
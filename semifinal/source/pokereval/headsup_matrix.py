@@ -0,0 +1,283 @@
+import os
+import struct
+import sys
+from array import array
+from itertools import chain, combinations, permutations
+
+from array_tables import numpy
+from checkpoint import Checkpoint
+from hole_index import HoleIndex
+from lru_cache import LRUCache
+from preflop_table import PreflopTable
+from state_table import StateTable
+
+class HeadsUpMatrixException(Exception):
+    pass
+
+class HeadsUpMatrix:
+    """
+    Exact heads-up all-in equity of every starting hand class against
+    every other, classes as in PreflopTable:
+
+        matrix = HeadsUpMatrix.load()
+        matrix.equity(hole, villain_class)
+        matrix.range_equity(hole, HeadsUpMatrix.class_weights(weights))
+        matrix.headsup_scale(hole, HeadsUpMatrix.class_weights(weights))
+
+    Entry (i, j) is the equity of a hole of class i over every hole of
+    class j it can face and every board, ties counting half. Any hole of
+    class i is a suit relabeling of any other, so the row is exact for
+    the hole itself. Against a range of classes, the number of holes of
+    class j left by the hole's cards (AKs leaves 9 AKo of 12, but 3 AKs
+    of 4) weights each class, which is the card removal a class-level
+    product would otherwise miss.
+
+    build() enumerates the C(48, 5) boards of each matchup through the
+    StateTable, with the state of all 5-card boards computed once per
+    worker. Villain holes equal up to the suit relabelings fixing the hero
+    hole are played once. Only i < j is computed, since entry (j, i) is
+    1 - (i, j) and the diagonal is 1/2. Finished class pairs are
+    checkpointed and an interrupted run picks up where it stopped. The
+    file is a header followed by 169 x 169 float32 equities by row.
+    """
+    MAGIC = "PJHU"
+    VERSION = 1
+    HEADER = struct.Struct("<4sII")
+    CLASSES = PreflopTable.CLASSES
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "headsup_equity.bin")
+    # Ranges whose headsup_scale is kept
+    SCALES = 64
+    # Holes of each class, and holes of class j left by a hole of class i;
+    # built on first use
+    class_sizes = None
+    class_counts = None
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Read a matrix written by HeadsUpMatrix.build
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, classes = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION or classes != self.CLASSES:
+                raise HeadsUpMatrixException("%s is not a version %d heads-up matrix" % (path, self.VERSION))
+            self.equities = array("f")
+            try:
+                self.equities.fromfile(f, classes * classes)
+            except EOFError:
+                raise HeadsUpMatrixException("%s is truncated" % path)
+        if sys.byteorder != "little":
+            self.equities.byteswap()
+        HeadsUpMatrix.build_counts()
+        # Equity of each class against a random hole, and the
+        # headsup_scale of recent ranges; built on first use
+        self.headsup = None
+        self.scales = LRUCache(self.SCALES)
+
+    def equity(self, hole, villain_class):
+        """
+        Equity of the hole of card codes against a random hole of a class
+        """
+        return self.equities[PreflopTable.class_index(hole[0], hole[1]) * self.CLASSES + villain_class]
+
+    def range_equity(self, hole, weights):
+        """
+        Equity of the hole of card codes against 169 class weights, each
+        the weight of one hole of the class
+        """
+        row = PreflopTable.class_index(hole[0], hole[1])
+        counts = HeadsUpMatrix.class_counts[row]
+        equities = self.equities[row * self.CLASSES:(row + 1) * self.CLASSES]
+        share = 0.0
+        total = 0.0
+        for weight, count, equity in zip(weights, counts, equities):
+            share += weight * count * equity
+            total += weight * count
+        if total == 0:
+            raise ValueError("No holes of the range can be dealt with %s" % (hole,))
+        return share / total
+
+    def headsup_scale(self, hole, weights):
+        """
+        Strength of the hole against 169 class weights, as the equity
+        against a random hole of the class ranked where the hole ranks
+        among all holes against that range. A tight range pulls every
+        equity down, so lines drawn on equities against random holes
+        would let almost nothing through; on this scale they let the same
+        share of holes through, the ones that play best against the range.
+        """
+        key = tuple(weights)
+        scale = self.scales.get(key)
+        if scale is None:
+            if self.headsup is None:
+                uniform = [1.0] * self.CLASSES
+                self.headsup = [self.range_equity(PreflopTable.class_hole(index), uniform)
+                                for index in xrange(self.CLASSES)]
+            scale = PreflopTable.rescale([self.range_equity(PreflopTable.class_hole(index), weights)
+                                          for index in xrange(self.CLASSES)], self.headsup)
+            self.scales.put(key, scale)
+        return scale[PreflopTable.class_index(hole[0], hole[1])]
+
+    def class_weights(weights):
+        """
+        169 class weights of a range of 1326 hole weights (see
+        RangeEquity), the mean weight of the holes of each class
+        """
+        HeadsUpMatrix.build_counts()
+        sums = [0.0] * HeadsUpMatrix.CLASSES
+        for (a, b), weight in zip(HoleIndex.HOLES, weights):
+            sums[PreflopTable.class_index(a, b)] += weight
+        return [total / size for total, size in zip(sums, HeadsUpMatrix.class_sizes)]
+
+    def build_counts():
+        """
+        Fill in class_sizes and class_counts, once
+        """
+        if HeadsUpMatrix.class_counts is not None:
+            return
+        classes = [PreflopTable.class_index(a, b) for a, b in HoleIndex.HOLES]
+        sizes = [0] * HeadsUpMatrix.CLASSES
+        for index in classes:
+            sizes[index] += 1
+        counts = []
+        for index in xrange(HeadsUpMatrix.CLASSES):
+            mask = HoleIndex.dead_mask(PreflopTable.class_hole(index))
+            row = [0] * HeadsUpMatrix.CLASSES
+            for other, other_mask in zip(classes, HoleIndex.MASKS):
+                if not other_mask & mask:
+                    row[other] += 1
+            counts.append(row)
+        HeadsUpMatrix.class_sizes = sizes
+        HeadsUpMatrix.class_counts = counts
+
+    def matchups(hero, villain_class):
+        """
+        (villain hole, weight) of the holes of villain_class sharing no card
+        with hero, one per class of those equal up to the suit relabelings
+        that leave hero unchanged
+        """
+        hero_cards = sorted(hero)
+        relabelings = [suits for suits in permutations(xrange(4))
+                       if sorted((code & ~3) | suits[code & 3] for code in hero) == hero_cards]
+        weights = {}
+        for (a, b), mask in zip(HoleIndex.HOLES, HoleIndex.MASKS):
+            if PreflopTable.class_index(a, b) != villain_class or mask & HoleIndex.dead_mask(hero):
+                continue
+            key = min(tuple(sorted(((a & ~3) | suits[a & 3], (b & ~3) | suits[b & 3])))
+                      for suits in relabelings)
+            weights[key] = weights.get(key, 0) + 1
+        return sorted(weights.items())
+
+    def load(path=DEFAULT_PATH):
+        """
+        Return the matrix at path, or None if it has not been built
+        """
+        if not os.path.exists(path):
+            return None
+        return HeadsUpMatrix(path)
+
+    def build(path=DEFAULT_PATH, state_table_path=StateTable.DEFAULT_PATH, processes=None, verbose=False):
+        """
+        Enumerate every matchup, resuming from path's checkpoint if there
+        is one, and write the matrix to path. Needs NumPy and a built
+        StateTable.
+        """
+        if numpy is None:
+            raise HeadsUpMatrixException("NumPy is required to build the heads-up matrix")
+        if not os.path.exists(state_table_path):
+            raise HeadsUpMatrixException("No state table at %s, build it with python -m pokereval.state_table"
+                                         % state_table_path)
+        checkpoint = Checkpoint(path + ".progress")
+        state = checkpoint.load({"done": {}})
+        jobs = [(i, j, state_table_path)
+                for i, j in combinations(xrange(HeadsUpMatrix.CLASSES), 2)
+                if "%d,%d" % (i, j) not in state["done"]]
+
+        def finish(result):
+            i, j, equity = result
+            state["done"]["%d,%d" % (i, j)] = equity
+        checkpoint.run(_matchup_unit, jobs, finish, processes, verbose)
+
+        equities = [0.5] * (HeadsUpMatrix.CLASSES * HeadsUpMatrix.CLASSES)
+        for key, equity in state["done"].iteritems():
+            i, j = map(int, key.split(","))
+            equities[i * HeadsUpMatrix.CLASSES + j] = equity
+            equities[j * HeadsUpMatrix.CLASSES + i] = 1 - equity
+        HeadsUpMatrix.write(path, equities)
+        checkpoint.remove()
+        return path
+
+    def write(path, equities):
+        """
+        Write 169 x 169 equities by row
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        equities = array("f", equities)
+        if sys.byteorder != "little":
+            equities.byteswap()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HeadsUpMatrix.HEADER.pack(HeadsUpMatrix.MAGIC, HeadsUpMatrix.VERSION,
+                                              HeadsUpMatrix.CLASSES))
+            equities.tofile(f)
+        os.rename(tmp_path, path)
+
+    class_weights = staticmethod(class_weights)
+    build_counts = staticmethod(build_counts)
+    matchups = staticmethod(matchups)
+    load = staticmethod(load)
+    build = staticmethod(build)
+    write = staticmethod(write)
+
+# Per worker: the state table, and the state and card mask of every 5-card
+# board, built by the first unit a worker runs
+_boards = None
+
+def _matchup_unit(job):
+    """
+    Equity of class i against class j over every board. Module level so
+    the pool workers can unpickle it.
+    """
+    global _boards
+    i, j, state_table_path = job
+    if _boards is None:
+        table = StateTable(state_table_path).table
+        count = 2598960
+        boards = numpy.fromiter(chain.from_iterable(combinations(xrange(52), 5)),
+                                dtype=numpy.int8, count=count * 5).reshape(count, 5)
+        states = numpy.zeros(count, dtype=numpy.intp)
+        masks = numpy.zeros(count, dtype=numpy.uint64)
+        for column in xrange(5):
+            codes = boards[:, column].astype(numpy.intp)
+            states = table[states + codes]
+            masks |= numpy.left_shift(numpy.uint64(1), codes.astype(numpy.uint64))
+        _boards = table, states, masks
+    table, states, masks = _boards
+
+    hero = PreflopTable.class_hole(i)
+    live = (masks & numpy.uint64(HoleIndex.dead_mask(hero))) == 0
+    hero_states = states[live]
+    hero_masks = masks[live]
+    hero_ranks = table[table[hero_states + hero[0]] + hero[1]]
+    share = 0.0
+    total = 0
+    for (c, d), weight in HeadsUpMatrix.matchups(hero, j):
+        dealt = (hero_masks & numpy.uint64(HoleIndex.dead_mask((c, d)))) == 0
+        ranks = hero_ranks[dealt]
+        villain_ranks = table[table[hero_states[dealt] + c] + d]
+        share += weight * ((ranks < villain_ranks).sum() + 0.5 * (ranks == villain_ranks).sum()) / float(len(ranks))
+        total += weight
+    return i, j, share / total
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else HeadsUpMatrix.DEFAULT_PATH
+    state_table_path = sys.argv[2] if len(sys.argv) > 2 else StateTable.DEFAULT_PATH
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    HeadsUpMatrix.build(path, state_table_path, processes, verbose=True)
+    print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+from itertools import izip
+
+from array_tables import numpy
+
+class HoleIndex:
+    """
+    All 1326 two-card holes as pairs of card codes (see Card.to_index), in
+    combinations(xrange(52), 2) order, with a 52-bit card mask each
+    (bit i is card code i). Finding the live opponent holes is then a
+    filter of prebuilt tuples against the mask of the dead cards:
+
+        dead = HoleIndex.dead_mask(hole + board)
+        for a, b in HoleIndex.live(dead):
+            ...
+    """
+    HOLES = [(a, b) for a in xrange(52) for b in xrange(a + 1, 52)]
+    MASKS = [(1 << a) | (1 << b) for a, b in HOLES]
+    # NumPy copies of HOLES and MASKS, built on first use
+    hole_array = None
+    mask_array = None
+
+    def dead_mask(codes):
+        """
+        Card mask of a sequence of card codes
+        """
+        mask = 0
+        for code in codes:
+            mask |= 1 << code
+        return mask
+
+    def live(dead):
+        """
+        The holes sharing no card with the dead mask
+        """
+        return [hole for hole, mask in izip(HoleIndex.HOLES, HoleIndex.MASKS) if not mask & dead]
+
+    def live_array(dead):
+        """
+        live as an N x 2 NumPy array of card codes
+        """
+        flags = HoleIndex.live_flags(dead)
+        return HoleIndex.hole_array[flags]
+
+    def live_flags(dead):
+        """
+        NumPy bool array over HOLES, True for the holes live() keeps
+        """
+        if HoleIndex.hole_array is None:
+            HoleIndex.hole_array = numpy.array(HoleIndex.HOLES, dtype=numpy.intp)
+            HoleIndex.mask_array = numpy.array(HoleIndex.MASKS, dtype=numpy.uint64)
+        return (HoleIndex.mask_array & numpy.uint64(dead)) == 0
+
+    def index(a, b):
+        """
+        Position of the hole of codes a and b in HOLES
+        """
+        if a > b:
+            a, b = b, a
+        # Holes before those starting with a, then the offset of b
+        return a * (103 - a) // 2 + b - a - 1
+
+    dead_mask = staticmethod(dead_mask)
+    live = staticmethod(live)
+    live_array = staticmethod(live_array)
+    live_flags = staticmethod(live_flags)
+    index = staticmethod(index)
@@ -0,0 +1,39 @@
+class Isomorphism:
+    """
+    Suit isomorphism of (hole, board) situations. Relabeling the suits of
+    both changes no equity, so tables can keep one entry per class:
+
+        Isomorphism.canonical(hole, board)    # same for all relabelings
+        Isomorphism.situation(hole, board, opponents)    # as a dict key
+
+    Cards are card codes (see Card.to_index). Each suit gets a signature,
+    the ranks it has in the hole then on the board, and suits are renamed
+    by decreasing signature. Suits with equal signatures hold the same
+    ranks and swapping them changes nothing, so this picks one
+    representative per class without trying all 24 relabelings.
+    """
+    def canonical(hole, board):
+        """
+        (hole, board) of the class representative, each sorted
+        """
+        signatures = [[0, 0], [0, 0], [0, 0], [0, 0]]
+        for code in hole:
+            signatures[code & 3][0] |= 1 << (code >> 2)
+        for code in board:
+            signatures[code & 3][1] |= 1 << (code >> 2)
+        order = sorted(xrange(4), key=signatures.__getitem__, reverse=True)
+        suits = [0] * 4
+        for new, old in enumerate(order):
+            suits[old] = new
+        return (tuple(sorted((code & ~3) | suits[code & 3] for code in hole)),
+                tuple(sorted((code & ~3) | suits[code & 3] for code in board)))
+
+    def situation(hole, board, opponents=None):
+        """
+        Hashable class of a hole, board and opponent count, for caches
+        """
+        hole, board = Isomorphism.canonical(hole, board)
+        return hole, board, opponents
+
+    canonical = staticmethod(canonical)
+    situation = staticmethod(situation)
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Mapping of at most size entries, dropping the least recently used
+    first, that counts its hits and misses:
+
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.put(key, value)
+    """
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Value of key, now the most recently used, or None
+        """
+        value = self.entries.pop(key, None)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store value under key, dropping the least recently used entry if
+        the cache is full
+        """
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        Share of get calls that found their key
+        """
+        calls = self.hits + self.misses
+        return float(self.hits) / calls if calls else 0.0
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
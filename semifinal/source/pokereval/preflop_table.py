@@ -0,0 +1,251 @@
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+from backends import NumpyBackend, PurePythonBackend
+from checkpoint import Checkpoint
+
+class PreflopTableException(Exception):
+    pass
+
+class PreflopTable:
+    """
+    Preflop equity of each of the 169 starting hand classes against 1 to 9
+    random opponents, all the way to the river, ties split:
+
+        table = PreflopTable.load()
+        table.equity(hole, opponents)    # hole as card codes
+        table.headsup_scale(hole, opponents)
+
+    A class is the two ranks and whether they are suited: pairs sit on
+    the diagonal of a 13 x 13 grid, suited hands above it and offsuit ones
+    below, so class_index is arithmetic and a lookup is one array index.
+
+    build() runs Monte Carlo over a process pool, in units of a fixed
+    number of deals seeded from the seed, the class, the opponents and the
+    unit, so a table only depends on its seed and sample count. Finished
+    units are checkpointed and an interrupted run picks up where it
+    stopped. The file is a header followed by 169 x 9 float32 equities,
+    by class then opponents.
+    """
+    MAGIC = "PJPE"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIIII")
+    CLASSES = 169
+    MAX_OPPONENTS = 9
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "preflop_equity.bin")
+    DEFAULT_SAMPLES = 1000000
+    SAMPLES_PER_UNIT = 20000
+    RANK_NAMES = "23456789TJQKA"
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Read a table written by PreflopTable.build
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, classes, opponents, samples = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION or classes != self.CLASSES:
+                raise PreflopTableException("%s is not a version %d preflop table" % (path, self.VERSION))
+            self.opponents = opponents
+            self.samples = samples
+            self.equities = array("f")
+            try:
+                self.equities.fromfile(f, classes * opponents)
+            except EOFError:
+                raise PreflopTableException("%s is truncated" % path)
+        if sys.byteorder != "little":
+            self.equities.byteswap()
+        # Class to headsup_scale value, by opponents, built on first use
+        self.scales = {}
+
+    def equity(self, hole, opponents):
+        """
+        Equity of the hole of card codes against opponents random holes
+        """
+        if not 1 <= opponents <= self.opponents:
+            raise ValueError("%s only covers 1 to %d opponents" % (self.path, self.opponents))
+        return self.equities[PreflopTable.class_index(hole[0], hole[1]) * self.opponents + opponents - 1]
+
+    def headsup_scale(self, hole, opponents):
+        """
+        Strength of the hole against opponents random holes (capped to
+        the table), as the heads-up equity of the class ranked where it
+        ranks among all holes. Lines drawn on heads-up equities then let
+        the same share of holes through at any table size, the holes that
+        play best against that many opponents.
+        """
+        opponents = max(1, min(opponents, self.opponents))
+        scale = self.scales.get(opponents)
+        if scale is None:
+            scale = self.scales[opponents] = self.build_scale(opponents)
+        return scale[PreflopTable.class_index(hole[0], hole[1])]
+
+    def build_scale(self, opponents):
+        """
+        headsup_scale of every class against opponents
+        """
+        return PreflopTable.rescale([self.equities[index * self.opponents + opponents - 1]
+                                     for index in xrange(self.CLASSES)],
+                                    [self.equities[index * self.opponents] for index in xrange(self.CLASSES)])
+
+    def rescale(strengths, headsup):
+        """
+        For each class, the headsup value of the class holding the hole
+        ranked where the middle hole of the class ranks by strengths, both
+        lists of 169 values by class
+        """
+        def ranked(values):
+            return sorted(xrange(PreflopTable.CLASSES), key=values.__getitem__)
+        # Holes per class: 6 for pairs, 4 suited, 12 offsuit
+        sizes = [6 if first == second else 4 if first > second else 12
+                 for first, second in (divmod(index, 13) for index in xrange(PreflopTable.CLASSES))]
+        by_headsup = ranked(headsup)
+        bounds = []
+        holes = 0
+        for index in by_headsup:
+            holes += sizes[index]
+            bounds.append(holes)
+        scale = [0.0] * PreflopTable.CLASSES
+        below = 0
+        for index in ranked(strengths):
+            # The heads-up class holding the middle hole of this class
+            position = min(bisect_right(bounds, below + sizes[index] / 2.0), len(by_headsup) - 1)
+            scale[index] = headsup[by_headsup[position]]
+            below += sizes[index]
+        return scale
+
+    def class_index(a, b):
+        """
+        Class of the hole of card codes a and b: high * 13 + low if suited,
+        low * 13 + high otherwise, ranks 0 (deuce) to 12 (ace)
+        """
+        high, low = a >> 2, b >> 2
+        if high < low:
+            high, low = low, high
+        if a & 3 == b & 3:
+            return high * 13 + low
+        return low * 13 + high
+
+    def class_hole(index):
+        """
+        Card codes of one hole of a class
+        """
+        first, second = divmod(index, 13)
+        if first > second:
+            # Suited, both spades
+            return first * 4, second * 4
+        return first * 4, second * 4 + 1
+
+    def class_name(index):
+        """
+        Name of a class, such as "AKs", "72o" or "TT"
+        """
+        first, second = divmod(index, 13)
+        high, low = max(first, second), min(first, second)
+        name = PreflopTable.RANK_NAMES[high] + PreflopTable.RANK_NAMES[low]
+        if first > second:
+            return name + "s"
+        if first < second:
+            return name + "o"
+        return name
+
+    def load(path=DEFAULT_PATH):
+        """
+        Return the table at path, or None if it has not been built
+        """
+        if not os.path.exists(path):
+            return None
+        return PreflopTable(path)
+
+    def build(path=DEFAULT_PATH, samples=DEFAULT_SAMPLES, seed=0, processes=None,
+              max_opponents=MAX_OPPONENTS, verbose=False):
+        """
+        Simulate samples deals per class and opponent count, resuming from
+        path's checkpoint if there is one, and write the table to path
+        """
+        checkpoint = Checkpoint(path + ".progress")
+        units = (samples + PreflopTable.SAMPLES_PER_UNIT - 1) // PreflopTable.SAMPLES_PER_UNIT
+        cells = PreflopTable.CLASSES * max_opponents
+        fresh = {"samples": samples, "seed": seed, "max_opponents": max_opponents,
+                 "done": [], "shares": [0.0] * cells}
+        state = checkpoint.load(fresh)
+        for key in ("samples", "seed", "max_opponents"):
+            if state[key] != fresh[key]:
+                raise PreflopTableException("%s was started with %s %s" % (checkpoint.path, key, state[key]))
+
+        done = set(tuple(unit) for unit in state["done"])
+        jobs = []
+        for cell in xrange(cells):
+            for unit in xrange(units):
+                if (cell, unit) not in done:
+                    count = min(PreflopTable.SAMPLES_PER_UNIT, samples - unit * PreflopTable.SAMPLES_PER_UNIT)
+                    jobs.append((cell, unit, count, max_opponents, seed))
+
+        def finish(result):
+            cell, unit, share = result
+            state["done"].append([cell, unit])
+            state["shares"][cell] += share
+        checkpoint.run(_simulate_unit, jobs, finish, processes, verbose)
+
+        PreflopTable.write(path, [share / samples for share in state["shares"]], max_opponents, samples)
+        checkpoint.remove()
+        return path
+
+    def write(path, equities, max_opponents, samples):
+        """
+        Write 169 x max_opponents equities, by class then opponents
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        equities = array("f", equities)
+        if sys.byteorder != "little":
+            equities.byteswap()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(PreflopTable.HEADER.pack(PreflopTable.MAGIC, PreflopTable.VERSION,
+                                             PreflopTable.CLASSES, max_opponents, samples))
+            equities.tofile(f)
+        os.rename(tmp_path, path)
+
+    rescale = staticmethod(rescale)
+    class_index = staticmethod(class_index)
+    class_hole = staticmethod(class_hole)
+    class_name = staticmethod(class_name)
+    load = staticmethod(load)
+    build = staticmethod(build)
+    write = staticmethod(write)
+
+def _simulate_unit(job):
+    """
+    Summed pot share of count deals of one class and opponent count. Module
+    level so the pool workers can unpickle it.
+    """
+    cell, unit, count, max_opponents, seed = job
+    index, opponents = divmod(cell, max_opponents)
+    backend = NumpyBackend()
+    if not backend.available():
+        backend = PurePythonBackend()
+    # Distinct seeds for every unit of every build seed, within 32 bits
+    unit_seed = ((seed * PreflopTable.CLASSES * max_opponents + cell) * 1000003 + unit) & 0xffffffff
+    equity = backend.equity(PreflopTable.class_hole(index), [], opponents + 1, count, seed=unit_seed)
+    return cell, unit, equity * count
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else PreflopTable.DEFAULT_PATH
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else PreflopTable.DEFAULT_SAMPLES
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    PreflopTable.build(path, samples, processes=processes, verbose=True)
+    table = PreflopTable(path)
+    for index in xrange(PreflopTable.CLASSES):
+        hole = PreflopTable.class_hole(index)
+        print("%-4s %s" % (PreflopTable.class_name(index), " ".join(
+            "%.3f" % table.equity(hole, opponents) for opponents in xrange(1, table.opponents + 1))))
+    print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import time
+
+from array_tables import numpy
+from card import Card
+from exact_equity import ExactEquity
+from hand_evaluator import HandEvaluator, HandLengthException
+from hole_index import HoleIndex
+
+class RangeEquity:
+    """
+    Equity of a weighted range of holes against weighted opponent ranges,
+    instead of against random holes. A range is a list of 1326 weights by
+    position in HoleIndex.HOLES:
+
+        equity = RangeEquity(ExactEquity(StateTable.load()))
+        equity.equity(RangeEquity.hole_range(hole), [RangeEquity.top(0.05)], board)
+
+    Heads-up the result is exact over every runout of a turn or flop:
+    each (hero hole, opponent hole, runout) sharing no card counts with the
+    product of the two weights. Against several opponents, each is played
+    against the hero hole alone, card removal included, and their chances
+    to be beaten or tied give the pot share as in BoardIndex.multiway.
+
+    The opponent weight a hero hole beats on a board is one sorted
+    cumulative sum, less the weight of the 51 holes holding each of its
+    two cards, so a board costs a few hero holes x 51 array operations
+    instead of a 1326 x 1326 conflict matrix. Board ranks come from the
+    ExactEquity memo, shared with the other equity calls of the hand.
+    Without NumPy the hero holes of nonzero weight are played one by one.
+    """
+    # For each card code, the positions in HoleIndex.HOLES of the 51
+    # holes holding it, by the other card; built on first use
+    card_holes = None
+    # HoleIndex.HOLES positions from best to worst preflop, see top
+    preflop_order = None
+
+    def __init__(self, exact_equity=None):
+        self.exact_equity = exact_equity or ExactEquity()
+        # Runouts counted and possible in the last equity call
+        self.runouts = 0
+        self.total_runouts = 0
+
+    def complete(self):
+        """
+        True if the last equity call enumerated every runout
+        """
+        return self.runouts == self.total_runouts
+
+    def uniform():
+        """
+        The range of a random hole
+        """
+        return [1.0] * len(HoleIndex.HOLES)
+
+    def hole_range(hole):
+        """
+        The range of a known hole, of card codes
+        """
+        weights = [0.0] * len(HoleIndex.HOLES)
+        weights[HoleIndex.index(hole[0], hole[1])] = 1.0
+        return weights
+
+    def top(fraction):
+        """
+        The range of the best fraction of holes by
+        HandEvaluator.Two.evaluate_percentile, at least one hole
+        """
+        if RangeEquity.preflop_order is None:
+            percentiles = [HandEvaluator.Two.evaluate_percentile([Card.from_index(a), Card.from_index(b)])
+                           for a, b in HoleIndex.HOLES]
+            RangeEquity.preflop_order = sorted(xrange(len(HoleIndex.HOLES)),
+                                               key=lambda i: -percentiles[i])
+        weights = [0.0] * len(HoleIndex.HOLES)
+        count = max(1, int(round(fraction * len(HoleIndex.HOLES))))
+        for i in RangeEquity.preflop_order[:count]:
+            weights[i] = 1.0
+        return weights
+
+    def equity(self, hero, opponents, board, budget=None):
+        """
+        Share of the pot the hero range wins against the opponent ranges
+        over every runout of a 3 or 4-card board, or the 5-card board
+        itself. Stop taking new runouts after budget seconds if one is
+        given. Ranges conflicting with the board on every hole raise
+        ValueError.
+        """
+        if len(board) not in (3, 4, 5):
+            raise HandLengthException("Only 3, 4 or 5-card boards are supported by RangeEquity")
+        start = time.time()
+        if numpy is not None:
+            hero = numpy.asarray(hero, dtype=numpy.float64)
+            opponents = [numpy.asarray(weights, dtype=numpy.float64) for weights in opponents]
+        # Cards every hero hole holds, such as those of a known hole, can't
+        # come on the board
+        held = (1 << 52) - 1
+        for weight, mask in zip(hero, HoleIndex.MASKS):
+            if weight:
+                held &= mask
+        held = [code for code in xrange(52) if (held >> code) & 1]
+        runouts = self.exact_equity.runouts_for(held, board) if len(board) < 5 else [()]
+        share = 0.0
+        total = 0.0
+        self.runouts = 0
+        self.total_runouts = len(runouts)
+        for runout in runouts:
+            if budget is not None and self.runouts and time.time() - start > budget:
+                break
+            ranks = self.exact_equity.board_ranks(tuple(board) + runout)
+            if numpy is not None:
+                board_share, board_total = RangeEquity.board_equity(hero, opponents, ranks)
+            else:
+                board_share, board_total = RangeEquity.board_equity_python(hero, opponents, ranks)
+            share += board_share
+            total += board_total
+            self.runouts += 1
+        if total == 0:
+            raise ValueError("No holes of the ranges can be dealt with this board")
+        return share / total
+
+    def board_equity(hero, opponents, ranks):
+        """
+        (pot share, weight) of the hero range on a 5-card board whose hole
+        ranks are ranks, a NumPy array with 0 for dead holes
+        """
+        positions = numpy.flatnonzero(hero * (ranks > 0))
+        weights = hero[positions]
+        # ties[m]: chance of each hero hole tying m of the opponents so
+        # far and beating the rest
+        ties = [numpy.ones(len(positions))]
+        for beaten, tied, dealt in RangeEquity.board_counts(positions, opponents, ranks):
+            weights = weights * dealt
+            dealt[dealt == 0] = 1.0
+            beaten = beaten / dealt
+            tied = tied / dealt
+            ties = [a * beaten + b * tied for a, b in zip(ties + [0.0], [0.0] + ties)]
+        share = sum(chance / (m + 1) for m, chance in enumerate(ties))
+        return (weights * share).sum(), weights.sum()
+
+    def board_counts(positions, opponents, ranks):
+        """
+        (beaten, tied, dealt) for each opponent range: the opponent weight
+        each hero hole of positions (live on the board) beats, ties, and
+        can face on a 5-card board whose hole ranks are ranks
+        """
+        if RangeEquity.card_holes is None:
+            # Builds HoleIndex.hole_array
+            HoleIndex.live_flags(0)
+            RangeEquity.card_holes = numpy.array(
+                [[HoleIndex.index(c, other) for other in xrange(52) if other != c] for c in xrange(52)],
+                dtype=numpy.intp)
+        live = ranks > 0
+        rank = ranks[positions, None]
+        # The holes sharing the first or the second card of each hero hole,
+        # the hero hole itself in both
+        first = RangeEquity.card_holes[HoleIndex.hole_array[positions, 0]]
+        second = RangeEquity.card_holes[HoleIndex.hole_array[positions, 1]]
+        order = numpy.argsort(ranks, kind="mergesort")
+        sorted_ranks = ranks[order]
+        low = numpy.searchsorted(sorted_ranks, rank[:, 0], "left")
+        high = numpy.searchsorted(sorted_ranks, rank[:, 0], "right")
+        counts = []
+        for opponent in opponents:
+            opponent = opponent * live
+            own = opponent[positions]
+            # Weight of opponent holes worse than and tied with each hole,
+            # then without those holding one of its cards. The hole itself
+            # holds both, so it is added back once.
+            cumulative = numpy.concatenate(([0.0], numpy.cumsum(opponent[order])))
+            beaten = cumulative[-1] - cumulative[high]
+            tied = cumulative[high] - cumulative[low]
+            dealt = cumulative[-1] + own
+            for holes in (first, second):
+                held = opponent[holes]
+                held_ranks = ranks[holes]
+                beaten -= (held * (held_ranks > rank)).sum(1)
+                tied -= (held * (held_ranks == rank)).sum(1)
+                dealt -= held.sum(1)
+            tied += own
+            counts.append((beaten, tied, dealt))
+        return counts
+
+    def board_equity_python(hero, opponents, ranks):
+        """
+        board_equity for ranks a list, one hero hole at a time
+        """
+        share = 0.0
+        total = 0.0
+        for i, (weight, mask) in enumerate(zip(hero, HoleIndex.MASKS)):
+            rank = ranks[i]
+            if not weight or not rank:
+                continue
+            ties = [1.0]
+            for opponent in opponents:
+                beaten = tied = dealt = 0.0
+                for other, other_weight, other_mask in zip(ranks, opponent, HoleIndex.MASKS):
+                    if not other or not other_weight or other_mask & mask:
+                        continue
+                    dealt += other_weight
+                    if rank < other:
+                        beaten += other_weight
+                    elif rank == other:
+                        tied += other_weight
+                weight *= dealt
+                if dealt:
+                    ties = [a * beaten / dealt + b * tied / dealt for a, b in zip(ties + [0.0], [0.0] + ties)]
+            share += weight * sum(chance / (m + 1) for m, chance in enumerate(ties))
+            total += weight
+        return share, total
+
+    uniform = staticmethod(uniform)
+    hole_range = staticmethod(hole_range)
+    top = staticmethod(top)
+    board_equity = staticmethod(board_equity)
+    board_counts = staticmethod(board_counts)
+    board_equity_python = staticmethod(board_equity_python)
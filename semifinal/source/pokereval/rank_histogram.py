@@ -0,0 +1,168 @@
+import os
+import struct
+import sys
+from array import array
+from itertools import combinations
+
+from checkpoint import Checkpoint
+from hand_stream import HandStream
+
+class RankHistogramException(Exception):
+    pass
+
+class RankHistogram:
+    """
+    Exact rank frequencies over every 5, 6 and 7-card hand, from which
+    the rank_to_percentile_5/6/7 tables of LookupTables.Five follow:
+
+        rank_to_percentile_k[rank - 1] = 1 - hands ranked <= rank / C(52, k)
+
+    build() enumerates the hands in units of a fixed lowest pair of cards
+    over a process pool and checkpoints finished units, so an interrupted
+    run picks up where it stopped. The file is a header followed, for
+    each hand size, by its size, its hand count and 7462 uint32 counts.
+    """
+    MAGIC = "PJRH"
+    VERSION = 1
+    HEADER = struct.Struct("<4sII")
+    TABLE = struct.Struct("<IQ")
+    RANKS = 7462
+    HAND_SIZES = (5, 6, 7)
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "rank_histograms.bin")
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Read the histograms written by RankHistogram.build
+        """
+        self.histograms = {}
+        with open(path, "rb") as f:
+            magic, version, tables = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION:
+                raise RankHistogramException("%s is not a version %d rank histogram" % (path, self.VERSION))
+            for i in xrange(tables):
+                histogram = array("I")
+                try:
+                    size, hands = self.TABLE.unpack(f.read(self.TABLE.size))
+                    histogram.fromfile(f, self.RANKS)
+                except (struct.error, EOFError):
+                    raise RankHistogramException("%s is truncated" % path)
+                if sys.byteorder != "little":
+                    histogram.byteswap()
+                if sum(histogram) != hands:
+                    raise RankHistogramException("%d-card histogram of %s is truncated" % (size, path))
+                self.histograms[size] = histogram
+
+    def percentiles(self, size):
+        """
+        The rank_to_percentile table of size-card hands
+        """
+        return RankHistogram.to_percentiles(self.histograms[size])
+
+    def to_percentiles(histogram):
+        """
+        rank_to_percentile table of a histogram of 7462 counts, best rank first
+        """
+        total = float(sum(histogram))
+        percentiles = []
+        below = 0
+        for count in histogram:
+            below += count
+            percentiles.append(1 - below / total)
+        return percentiles
+
+    def units(size):
+        """
+        Work units of an enumeration: the two lowest card codes of a hand
+        """
+        return [(first, second) for first, second in combinations(xrange(54 - size), 2)]
+
+    def build(path=DEFAULT_PATH, processes=None, chunk_size=HandStream.DEFAULT_CHUNK_SIZE, verbose=False):
+        """
+        Enumerate every hand, resuming from path's checkpoint if there is
+        one, and write the histograms to path
+        """
+        checkpoint = Checkpoint(path + ".progress")
+        state = checkpoint.load({})
+        for size in RankHistogram.HAND_SIZES:
+            state.setdefault(str(size), {"done": [], "histogram": [0] * RankHistogram.RANKS})
+
+        jobs = []
+        for size in RankHistogram.HAND_SIZES:
+            done = set(tuple(unit) for unit in state[str(size)]["done"])
+            jobs.extend((size, first, second, chunk_size)
+                        for first, second in RankHistogram.units(size) if (first, second) not in done)
+        # Biggest units first so the pool does not end on a long straggler
+        jobs.sort(key=lambda job: (-job[0], job[2]))
+
+        def finish(result):
+            size, first, second, histogram = result
+            table = state[str(size)]
+            table["done"].append([first, second])
+            table["histogram"] = [a + b for a, b in zip(table["histogram"], histogram)]
+        checkpoint.run(_count_unit, jobs, finish, processes, verbose)
+
+        histograms = dict((size, state[str(size)]["histogram"]) for size in RankHistogram.HAND_SIZES)
+        RankHistogram.write(path, histograms)
+        checkpoint.remove()
+        return histograms
+
+    def write(path, histograms):
+        """
+        Write a dict of hand size to 7462 counts
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(RankHistogram.HEADER.pack(RankHistogram.MAGIC, RankHistogram.VERSION, len(histograms)))
+            for size in sorted(histograms):
+                histogram = array("I", histograms[size])
+                f.write(RankHistogram.TABLE.pack(size, sum(histogram)))
+                if sys.byteorder != "little":
+                    histogram.byteswap()
+                histogram.tofile(f)
+        os.rename(tmp_path, path)
+
+    def compare(self):
+        """
+        Largest difference of each regenerated percentile table from the
+        one shipped in lookup_literals.py
+        """
+        from lookup_literals import LookupLiterals
+        differences = {}
+        for size in sorted(self.histograms):
+            shipped = getattr(LookupLiterals.Five, "rank_to_percentile_%d" % size)
+            differences[size] = max(abs(a - b) for a, b in zip(self.percentiles(size), shipped))
+        return differences
+
+    to_percentiles = staticmethod(to_percentiles)
+    units = staticmethod(units)
+    build = staticmethod(build)
+    write = staticmethod(write)
+
+def _count_unit(job):
+    """
+    Histogram of the size-card hands whose two lowest cards are first
+    and second. Module level so the pool workers can unpickle it.
+    """
+    size, first, second, chunk_size = job
+    histogram = [0] * RankHistogram.RANKS
+    prefix = (first, second)
+    hands = (prefix + rest for rest in combinations(xrange(second + 1, 52), size - 2))
+    for ranks in HandStream(hands, chunk_size).iter_chunks():
+        for rank in ranks:
+            histogram[rank - 1] += 1
+    return size, first, second, histogram
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else RankHistogram.DEFAULT_PATH
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    RankHistogram.build(path, processes, verbose=True)
+    for size, difference in sorted(RankHistogram(path).compare().items()):
+        print("%d cards: max difference from lookup_literals.py %.3g" % (size, difference))
+    print(path)
+
+if __name__ == '__main__':
+    main()
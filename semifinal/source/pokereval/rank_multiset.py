@@ -0,0 +1,62 @@
+from itertools import imap
+from operator import getitem
+
+class RankMultiset:
+    """
+    Combinatorial index of multisets of card ranks (0-12, deuce = 0).
+
+    With the ranks sorted r0 <= r1 <= ... the index is the sum of
+    C(ri + i, i + 1), which numbers the C(12 + n, n) multisets of n ranks
+    densely from 0. This is what the evaluators use for paired hands
+    instead of a prime product and a dict probe: the product of rank
+    primes only ever encoded the multiset of ranks.
+    """
+    BINOMIAL = [[0] * 21 for n in xrange(21)]
+    for n in xrange(21):
+        BINOMIAL[n][0] = 1
+        for k in xrange(1, n + 1):
+            BINOMIAL[n][k] = BINOMIAL[n - 1][k - 1] + BINOMIAL[n - 1][k]
+
+    # OFFSETS[i][r] is the share of rank r at sorted position i
+    OFFSETS = [[BINOMIAL[r + i][i + 1] for r in xrange(13)] for i in xrange(7)]
+
+    def size(n):
+        """
+        Number of multisets of n ranks, the length of a table indexed by them
+        """
+        return RankMultiset.BINOMIAL[12 + n][n]
+
+    def index(ranks):
+        """
+        Index of a sorted sequence of ranks
+        """
+        return sum(imap(getitem, RankMultiset.OFFSETS, ranks))
+
+    def binary_offsets(card_to_binary):
+        """
+        OFFSETS keyed by the binary codes of a card_to_binary[rank][suit]
+        table. Sorting binary codes sorts them by rank, so the index of a
+        hand is just sum(imap(getitem, offsets, sorted(bh))).
+        """
+        return [dict((code, offsets[(code >> 8) & 0xF])
+                     for codes in card_to_binary for code in codes if code)
+                for offsets in RankMultiset.OFFSETS]
+
+    def unindex(index, n):
+        """
+        Sorted ranks of the multiset of n ranks with this index
+        """
+        ranks = [0] * n
+        for i in xrange(n - 1, -1, -1):
+            offsets = RankMultiset.OFFSETS[i]
+            r = 12
+            while offsets[r] > index:
+                r -= 1
+            ranks[i] = r
+            index -= offsets[r]
+        return ranks
+
+    size = staticmethod(size)
+    index = staticmethod(index)
+    binary_offsets = staticmethod(binary_offsets)
+    unindex = staticmethod(unindex)
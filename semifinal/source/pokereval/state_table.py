@@ -0,0 +1,225 @@
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lookup_tables import LookupTables
+from hand_evaluator import HandEvaluator
+from card import Card
+
+class StateTableException(Exception):
+    pass
+
+class StateTable:
+    """
+    Card-by-card transition table for 7-card hands, after the "2+2" evaluator.
+
+    Every partial hand of 0-6 cards is a state with one row of 52 int32
+    entries, indexed by card code (see Card.to_index). For 0-5 cards an
+    entry is the offset of the next state's row, for 6 cards it is the
+    final rank, on the same scale as HandEvaluator.Seven.evaluate_rank.
+    The root row is at offset 0, so a hand costs seven lookups:
+
+        p = table[c1]; p = table[p + c2]; ... rank = table[p + c7]
+
+    Partial hands are keyed by their cards with the suit dropped once that
+    suit can no longer make a flush with the cards still to come, which
+    keeps the number of states around 600k instead of C(52, 6).
+
+    The file is a 16-byte header (magic, version, row count, row width)
+    followed by little-endian int32 rows. Build it with
+        python -m pokereval.state_table [path]
+    """
+    MAGIC = "PJ7S"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIII")
+    ROW = 52
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "seven_state_table.bin")
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Memory-map a table written by StateTable.build
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, rows, width = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION or width != self.ROW:
+                raise StateTableException("%s is not a version %d state table" % (path, self.VERSION))
+            self.rows = rows
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if numpy is not None:
+            self.table = numpy.frombuffer(self.mm, dtype="<i4", offset=self.HEADER.size)
+        else:
+            self.table = None
+        self.entry = struct.Struct("<i").unpack_from
+
+    def evaluate_rank(self, hand):
+        """
+        Return the rank of this 7-card hand, like HandEvaluator.Seven.evaluate_rank
+        """
+        if len(hand) != 7:
+            raise StateTableException("Only 7-card hands are supported by the state table")
+        return self.evaluate_codes([card.to_index() for card in hand])
+
+    def evaluate_codes(self, codes):
+        """
+        Return the rank of 7 card codes, one table lookup per card
+        """
+        if len(codes) != 7:
+            raise StateTableException("Only 7-card hands are supported by the state table")
+        c1, c2, c3, c4, c5, c6, c7 = codes
+        entry = self.entry
+        mm = self.mm
+        base = self.HEADER.size
+        # Unrolled, this is the hottest loop we have
+        p = entry(mm, base + 4 * c1)[0]
+        p = entry(mm, base + 4 * (p + c2))[0]
+        p = entry(mm, base + 4 * (p + c3))[0]
+        p = entry(mm, base + 4 * (p + c4))[0]
+        p = entry(mm, base + 4 * (p + c5))[0]
+        p = entry(mm, base + 4 * (p + c6))[0]
+        return entry(mm, base + 4 * (p + c7))[0]
+
+    def evaluate_rank_batch(self, hands):
+        """
+        Vectorized evaluate_codes for an N x 7 array of card codes.
+        Requires NumPy.
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required for the batched evaluators")
+        hands = numpy.asarray(hands, dtype=numpy.intp)
+        if hands.ndim != 2 or hands.shape[1] != 7:
+            raise StateTableException("Only 7-card hands are supported by the state table")
+        p = numpy.zeros(len(hands), dtype=numpy.intp)
+        for column in xrange(7):
+            p = self.table[p + hands[:, column]]
+        return p
+
+    def load(path=DEFAULT_PATH):
+        """
+        Return the table at path, or None if it has not been built
+        """
+        if not os.path.exists(path):
+            return None
+        return StateTable(path)
+
+    def build(path=DEFAULT_PATH, verbose=False):
+        """
+        Generate the transition table and write it to path
+        """
+        # A card in a state key is rank << 3 | suit, with rank 0-12 and
+        # suit 1-4, or 0 once the suit is irrelevant
+        cards = [(code >> 2) << 3 | ((code & 3) + 1) for code in xrange(52)]
+        keys = [()]
+        ids = {(): 0}
+        table = array("i")
+        multiset_ranks = {}
+        start = time.time()
+
+        depth_start = 0
+        for depth in xrange(7):
+            depth_end = len(keys)
+            remaining = 7 - depth - 1
+            for state in xrange(depth_start, depth_end):
+                key = keys[state]
+                row = [0] * StateTable.ROW
+                rank_counts = [0] * 13
+                for card in key:
+                    rank_counts[card >> 3] += 1
+                for code in xrange(52):
+                    card = cards[code]
+                    if card in key or rank_counts[card >> 3] == 4:
+                        # This card is already in any hand reaching this state
+                        continue
+                    new_key = StateTable.next_key(key, card, remaining)
+                    if depth < 6:
+                        next_state = ids.get(new_key)
+                        if next_state is None:
+                            next_state = ids[new_key] = len(keys)
+                            keys.append(new_key)
+                        row[code] = next_state * StateTable.ROW
+                    else:
+                        row[code] = StateTable.final_rank(new_key, multiset_ranks)
+                table.extend(row)
+            if verbose:
+                sys.stderr.write("depth %d: %d states, %.0fs\n" % (
+                    depth, depth_end - depth_start, time.time() - start))
+            if depth < 6:
+                # Parents are done with their keys, free them as we go
+                for state in xrange(depth_start, depth_end):
+                    del ids[keys[state]]
+                    keys[state] = None
+            depth_start = depth_end
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if sys.byteorder != "little":
+            table.byteswap()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(StateTable.HEADER.pack(StateTable.MAGIC, StateTable.VERSION,
+                                           len(table) // StateTable.ROW, StateTable.ROW))
+            table.tofile(f)
+        os.rename(tmp_path, path)
+        return path
+
+    def next_key(key, card, remaining):
+        """
+        Add card to a state key, dropping suits that can't make a flush
+        with the given number of cards still to come
+        """
+        new_key = key + (card,)
+        suit_counts = [0] * 5
+        for c in new_key:
+            suit_counts[c & 7] += 1
+        # Suit 0 is already stripped, keep it that way
+        suit_counts[0] = -8
+        return tuple(sorted([c & ~7 if suit_counts[c & 7] + remaining < 5 else c
+                             for c in new_key]))
+
+    def final_rank(key, multiset_ranks):
+        """
+        Rank of a complete 7-card state key
+        """
+        suit_counts = [0] * 5
+        for card in key:
+            suit_counts[card & 7] += 1
+        for suit in xrange(1, 5):
+            if suit_counts[suit] >= 5:
+                bits = 0
+                for card in key:
+                    if card & 7 == suit:
+                        bits |= 1 << (card >> 3)
+                return LookupTables.Seven.flush_rank_bits_to_rank[bits]
+
+        # No flush, so the rank only depends on the multiset of ranks
+        ranks = tuple(card >> 3 for card in key)
+        rank = multiset_ranks.get(ranks)
+        if rank is None:
+            # Deal the sorted ranks round-robin over the suits: no
+            # duplicate cards and at most 2 cards of a suit
+            hand = [Card(r + 2, i % 4 + 1) for i, r in enumerate(ranks)]
+            rank = multiset_ranks[ranks] = HandEvaluator.Seven.evaluate_rank(hand)
+        return rank
+
+    load = staticmethod(load)
+    build = staticmethod(build)
+    next_key = staticmethod(next_key)
+    final_rank = staticmethod(final_rank)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else StateTable.DEFAULT_PATH
+    StateTable.build(path, verbose=True)
+    print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+import os
+import sys
+from array import array
+from itertools import combinations, combinations_with_replacement
+
+from bitmask_evaluator import BitmaskEvaluator
+from lookup_literals import LookupLiterals
+from rank_multiset import RankMultiset
+from table_file import TableFile, TableFileException
+
+class TableBuilder:
+    """
+    Rebuild the LookupTables.Five, Six and Seven tables from the hand
+    categories, check them against lookup_literals.py and store them in a
+    TableFile, which the evaluators then load in place of the literals.
+
+    Ranks come from BitmaskEvaluator, which computes its own tables from
+    the category definitions, and the rank_to_percentile tables from a
+    RankHistogram enumeration. The 6 and 7-card xor tables hold exactly
+    the rank multisets that HandEvaluator's odd-even dispatch sends to
+    them, see six_table and seven_table.
+
+    main() writes the file only when every table equals the literal one,
+    so the file is a faster copy of lookup_literals.py, never different.
+    """
+    # Suit bits of the 5-card encoding and suit primes of the 6 and 7-card one
+    SUIT_FLAGS = (1, 2, 4, 8)
+    SUIT_PRIMES = (2, 3, 5, 7)
+
+    def primes(count):
+        """
+        The first count primes
+        """
+        primes = []
+        n = 2
+        while len(primes) < count:
+            if all(n % p for p in primes):
+                primes.append(n)
+            n += 1
+        return primes
+
+    def card_to_binary(suit_values):
+        """
+        card_to_binary[rank][suit]: rank bit, suit value, rank and rank prime
+        """
+        primes = TableBuilder.primes(13)
+        return [[], []] + [[0] + [(1 << (16 + r)) | (value << 12) | (r << 8) | primes[r]
+                                  for value in suit_values]
+                           for r in xrange(13)]
+
+    def multisets(size):
+        """
+        (index, ranks) of every RankMultiset of size ranks that fits in a deck
+        """
+        for ranks in combinations_with_replacement(xrange(13), size):
+            if max(ranks.count(r) for r in ranks) <= 4:
+                yield RankMultiset.index(ranks), ranks
+
+    def unsuited_rank(ranks):
+        """
+        Rank of a hand of these ranks without a flush: suits rotate by
+        position, so no suit holds more than 2 of 7 cards
+        """
+        return BitmaskEvaluator.evaluate_codes([r * 4 + i % 4 for i, r in enumerate(ranks)])
+
+    def xors(ranks):
+        """
+        Rank bits of the ranks held an odd and an even number of times
+        """
+        odd_xor = 0
+        even_xor = 0
+        for r in set(ranks):
+            if ranks.count(r) % 2:
+                odd_xor |= 1 << r
+            else:
+                even_xor |= 1 << r
+        return odd_xor, even_xor
+
+    def flush_tables(size):
+        """
+        prime_products_to_flush and flush_rank_bits_to_rank of size cards
+        """
+        prime_products_to_flush = {}
+        for suits in combinations_with_replacement(TableBuilder.SUIT_PRIMES, size):
+            for prime in TableBuilder.SUIT_PRIMES:
+                if suits.count(prime) >= 5:
+                    prime_products_to_flush[reduce(lambda a, b: a * b, suits)] = prime
+        flush_rank_bits_to_rank = {}
+        for n in xrange(5, size + 1):
+            for ranks in combinations(xrange(13), n):
+                bits = sum(1 << r for r in ranks)
+                flush_rank_bits_to_rank[bits] = BitmaskEvaluator.FLUSHES[bits]
+        return prime_products_to_flush, flush_rank_bits_to_rank
+
+    def five_table():
+        """
+        LookupTables.Five, without the percentile tables
+        """
+        flushes = [0] * 7937
+        unique5 = [0] * 7937
+        for ranks in combinations(xrange(13), 5):
+            bits = sum(1 << r for r in ranks)
+            flushes[bits] = BitmaskEvaluator.FLUSHES[bits]
+            unique5[bits] = BitmaskEvaluator.UNIQUE[bits]
+        pairs = array("H", [0] * RankMultiset.size(5))
+        for index, ranks in TableBuilder.multisets(5):
+            if len(set(ranks)) < 5:
+                pairs[index] = TableBuilder.unsuited_rank(ranks)
+        return {
+            "card_to_binary": TableBuilder.card_to_binary(TableBuilder.SUIT_FLAGS),
+            "flushes": flushes,
+            "unique5": unique5,
+            "pairs": pairs
+        }
+
+    def six_table():
+        """
+        LookupTables.Six, routing each rank multiset the way
+        HandEvaluator.Six.evaluate_rank looks it up
+        """
+        popcount = BitmaskEvaluator.POPCOUNT
+        prime_products_to_flush, flush_rank_bits_to_rank = TableBuilder.flush_tables(6)
+        tables = {
+            "card_to_binary": TableBuilder.card_to_binary(TableBuilder.SUIT_PRIMES),
+            "prime_products_to_flush": prime_products_to_flush,
+            "flush_rank_bits_to_rank": flush_rank_bits_to_rank,
+            "rank_multisets_to_rank": array("H", [0] * RankMultiset.size(6)),
+            "odd_xors_to_rank": {},
+            "even_xors_to_rank": {},
+            "even_xors_to_odd_xors_to_rank": {}
+        }
+        for index, ranks in TableBuilder.multisets(6):
+            rank = TableBuilder.unsuited_rank(ranks)
+            odd_xor, even_xor = TableBuilder.xors(ranks)
+            if even_xor == 0:
+                if popcount[odd_xor] == 4: # 4-0
+                    tables["rank_multisets_to_rank"][index] = rank
+                else: # 6-0, 2-0
+                    tables["odd_xors_to_rank"][odd_xor] = rank
+            elif odd_xor == 0:
+                if popcount[even_xor] == 2: # 0-2
+                    tables["rank_multisets_to_rank"][index] = rank
+                else: # 0-3
+                    tables["even_xors_to_rank"][even_xor] = rank
+            elif popcount[odd_xor] == 4 or popcount[even_xor] == 2: # 4-1, 2-2
+                tables["even_xors_to_odd_xors_to_rank"].setdefault(even_xor, {})[odd_xor] = rank
+            else: # 2-1
+                tables["rank_multisets_to_rank"][index] = rank
+        return tables
+
+    def seven_table():
+        """
+        LookupTables.Seven, routing each rank multiset the way
+        HandEvaluator.Seven.evaluate_rank looks it up
+        """
+        popcount = BitmaskEvaluator.POPCOUNT
+        prime_products_to_flush, flush_rank_bits_to_rank = TableBuilder.flush_tables(7)
+        tables = {
+            "card_to_binary": TableBuilder.card_to_binary(TableBuilder.SUIT_PRIMES),
+            "prime_products_to_flush": prime_products_to_flush,
+            "flush_rank_bits_to_rank": flush_rank_bits_to_rank,
+            "rank_multisets_to_rank": array("H", [0] * RankMultiset.size(7)),
+            "odd_xors_to_rank": {},
+            "even_xors_to_odd_xors_to_rank": {}
+        }
+        for index, ranks in TableBuilder.multisets(7):
+            rank = TableBuilder.unsuited_rank(ranks)
+            odd_xor, even_xor = TableBuilder.xors(ranks)
+            odd_popcount = popcount[odd_xor]
+            even_popcount = popcount[even_xor]
+            if even_xor == 0:
+                if odd_popcount == 7: # 7-0
+                    tables["odd_xors_to_rank"][odd_xor] = rank
+                else: # 5-0, 3-0
+                    tables["rank_multisets_to_rank"][index] = rank
+            elif odd_popcount == 5 or (odd_popcount == 3 and even_popcount == 2) or \
+                    (odd_popcount == 1 and even_popcount != 2): # 5-1, 3-2, 1-3, 1-1
+                tables["even_xors_to_odd_xors_to_rank"].setdefault(even_xor, {})[odd_xor] = rank
+            else: # 3-1, 1-2
+                tables["rank_multisets_to_rank"][index] = rank
+        return tables
+
+    def build(histogram=None):
+        """
+        Every table of LookupTables.Five, Six and Seven, as a dict of class
+        name to a dict of attribute name to value. The percentile tables
+        come from histogram, a RankHistogram, and are left out without one.
+        """
+        tables = {
+            "Five": TableBuilder.five_table(),
+            "Six": TableBuilder.six_table(),
+            "Seven": TableBuilder.seven_table()
+        }
+        if histogram is not None:
+            for size in sorted(histogram.histograms):
+                tables["Five"]["rank_to_percentile_%d" % size] = histogram.percentiles(size)
+        return tables
+
+    def verify(tables, tolerance=1e-12):
+        """
+        Names of the tables that differ from lookup_literals.py, or that
+        tables lacks
+        """
+        mismatches = []
+        for class_name in TableFile.CLASSES:
+            shipped = getattr(LookupLiterals, class_name)
+            for name in TableFile.NAMES[class_name]:
+                if name not in tables[class_name]:
+                    mismatches.append("%s.%s" % (class_name, name))
+            for name, value in sorted(tables[class_name].items()):
+                expected = getattr(shipped, name, None)
+                if name.startswith("rank_to_percentile") and expected is not None:
+                    same = len(value) == len(expected) and \
+                        all(abs(a - b) <= tolerance for a, b in zip(value, expected))
+                else:
+                    same = list(value) == list(expected) if isinstance(value, array) else value == expected
+                if not same:
+                    mismatches.append("%s.%s" % (class_name, name))
+        return mismatches
+
+    def write(path, tables):
+        """
+        Write tables to a TableFile at path if they all equal
+        lookup_literals.py, and return the names of those that differ
+        """
+        mismatches = TableBuilder.verify(tables)
+        if mismatches:
+            return mismatches
+        TableFile.write(path, tables)
+        if TableBuilder.verify(TableFile.load(path)):
+            raise TableFileException("%s does not read back as written" % path)
+        return []
+
+    primes = staticmethod(primes)
+    card_to_binary = staticmethod(card_to_binary)
+    multisets = staticmethod(multisets)
+    unsuited_rank = staticmethod(unsuited_rank)
+    xors = staticmethod(xors)
+    flush_tables = staticmethod(flush_tables)
+    five_table = staticmethod(five_table)
+    six_table = staticmethod(six_table)
+    seven_table = staticmethod(seven_table)
+    build = staticmethod(build)
+    verify = staticmethod(verify)
+    write = staticmethod(write)
+
+def main():
+    from rank_histogram import RankHistogram
+    path = sys.argv[1] if len(sys.argv) > 1 else TableFile.DEFAULT_PATH
+    histogram_path = sys.argv[2] if len(sys.argv) > 2 else RankHistogram.DEFAULT_PATH
+    if not os.path.exists(histogram_path):
+        RankHistogram.build(histogram_path, verbose=True)
+    tables = TableBuilder.build(RankHistogram(histogram_path))
+    mismatches = TableBuilder.write(path, tables)
+    if mismatches:
+        sys.stderr.write("Differ from lookup_literals.py, not written: %s\n" % ", ".join(mismatches))
+        sys.exit(1)
+    print(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import izip
+
+class TableFileException(Exception):
+    pass
+
+class TableFile:
+    """
+    Versioned binary file of the LookupTables.Five, Six and Seven tables,
+    written by python -m pokereval.table_builder and read by lookup_tables
+    at import:
+
+        tables = TableFile.load()    # class name to table name to value
+        TableFile.write(path, tables)
+
+    The file is a header, then for each table an entry naming it with its
+    typecode, layout and length, followed by its data in little endian:
+    ARRAY is the values, DICT and NESTED are the sorted keys as uint32
+    then the values (a NESTED key is outer << 13 | inner), CARDS is a
+    card_to_binary table by card code (see Card.to_index). Tables load
+    as the types lookup_literals.py has: uint16 arrays, lists and dicts.
+    """
+    MAGIC = "PJLT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sII")
+    ENTRY = struct.Struct("<40scBI")
+    ARRAY, DICT, NESTED, CARDS = range(4)
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "lookup_tables.bin")
+    CLASSES = ("Five", "Six", "Seven")
+    # Tables a file must hold, by class
+    NAMES = {
+        "Five": ("card_to_binary", "flushes", "pairs", "rank_to_percentile_5", "rank_to_percentile_6",
+                 "rank_to_percentile_7", "unique5"),
+        "Six": ("card_to_binary", "even_xors_to_odd_xors_to_rank", "even_xors_to_rank",
+                "flush_rank_bits_to_rank", "odd_xors_to_rank", "prime_products_to_flush",
+                "rank_multisets_to_rank"),
+        "Seven": ("card_to_binary", "even_xors_to_odd_xors_to_rank", "flush_rank_bits_to_rank",
+                  "odd_xors_to_rank", "prime_products_to_flush", "rank_multisets_to_rank")
+    }
+
+    def write(path, tables):
+        """
+        Write tables, a dict of class name to a dict of table name to value
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        entries = [(class_name, name, tables[class_name][name])
+                   for class_name in TableFile.CLASSES for name in sorted(tables[class_name])]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(TableFile.HEADER.pack(TableFile.MAGIC, TableFile.VERSION, len(entries)))
+            for class_name, name, value in entries:
+                layout, typecode, chunks = TableFile.encode(name, value)
+                f.write(TableFile.ENTRY.pack("%s.%s" % (class_name, name), typecode, layout,
+                                             len(chunks[0])))
+                for chunk in chunks:
+                    if sys.byteorder != "little":
+                        chunk.byteswap()
+                    chunk.tofile(f)
+        os.rename(tmp_path, path)
+
+    def encode(name, value):
+        """
+        (layout, typecode, arrays to write) of one table
+        """
+        if name == "card_to_binary":
+            return TableFile.CARDS, "I", [array("I", [value[rank][suit] for rank in xrange(2, 15)
+                                                      for suit in xrange(1, 5)])]
+        if isinstance(value, dict):
+            typecode = "I"
+            if isinstance(value.values()[0], dict):
+                layout = TableFile.NESTED
+                value = dict(((outer << 13) | inner, rank)
+                             for outer, inner_ranks in value.iteritems()
+                             for inner, rank in inner_ranks.iteritems())
+            else:
+                layout = TableFile.DICT
+            keys = sorted(value)
+            return layout, typecode, [array("I", keys), array(typecode, [value[key] for key in keys])]
+        if isinstance(value, array):
+            return TableFile.ARRAY, value.typecode, [array(value.typecode, value)]
+        typecode = "d" if isinstance(value[0], float) else "I"
+        return TableFile.ARRAY, typecode, [array(typecode, value)]
+
+    def load(path=DEFAULT_PATH):
+        """
+        Read a file written by write, as a dict of class name to a dict of
+        table name to value, checking it holds every table of NAMES
+        """
+        tables = dict((class_name, {}) for class_name in TableFile.CLASSES)
+        with open(path, "rb") as f:
+            try:
+                magic, version, count = TableFile.HEADER.unpack(f.read(TableFile.HEADER.size))
+            except struct.error:
+                raise TableFileException("%s is truncated" % path)
+            if magic != TableFile.MAGIC or version != TableFile.VERSION:
+                raise TableFileException("%s is not a version %d table file" % (path, TableFile.VERSION))
+            for i in xrange(count):
+                try:
+                    full_name, typecode, layout, length = TableFile.ENTRY.unpack(f.read(TableFile.ENTRY.size))
+                    class_name, name = full_name.rstrip("\0").split(".")
+                    chunks = []
+                    for chunk_typecode in (("I", typecode) if layout in (TableFile.DICT, TableFile.NESTED)
+                                           else (typecode,)):
+                        # Every value fits in 31 bits, and Python 2 reads
+                        # uint32 items as longs, slow to index and hash
+                        chunk = array("i" if chunk_typecode == "I" else chunk_typecode)
+                        chunk.fromfile(f, length)
+                        if sys.byteorder != "little":
+                            chunk.byteswap()
+                        chunks.append(chunk)
+                except (struct.error, EOFError):
+                    raise TableFileException("%s is truncated" % path)
+                except ValueError:
+                    raise TableFileException("%s has a bad entry" % path)
+                if class_name not in tables:
+                    raise TableFileException("%s has a table of %s" % (path, class_name))
+                tables[class_name][name] = TableFile.decode(layout, chunks)
+        for class_name in TableFile.CLASSES:
+            missing = set(TableFile.NAMES[class_name]) - set(tables[class_name])
+            if missing:
+                raise TableFileException("%s has no %s.%s" % (path, class_name, min(missing)))
+        return tables
+
+    def decode(layout, chunks):
+        """
+        Inverse of encode
+        """
+        if layout == TableFile.CARDS:
+            codes = chunks[0]
+            return [[], []] + [[0] + list(codes[r * 4:r * 4 + 4]) for r in xrange(13)]
+        keys = chunks[0].tolist()
+        values = chunks[-1].tolist()
+        if layout == TableFile.DICT:
+            return dict(izip(keys, values))
+        if layout == TableFile.NESTED:
+            # Keys are sorted, so each outer key's entries are a slice
+            nested = {}
+            start = 0
+            while start < len(keys):
+                outer = keys[start] >> 13
+                end = bisect_left(keys, (outer + 1) << 13, start)
+                nested[outer] = dict(izip([key & 0x1FFF for key in keys[start:end]], values[start:end]))
+                start = end
+            return nested
+        if chunks[0].typecode == "H":
+            return chunks[0]
+        # Lists index faster than arrays, for the tables looked up per hand
+        return values
+
+    write = staticmethod(write)
+    encode = staticmethod(encode)
+    load = staticmethod(load)
+    decode = staticmethod(decode)
@@ -0,0 +1,70 @@
+import random
+import unittest
+
+from pokereval.backends import Backends, PurePythonBackend
+
+class BackendsTest(unittest.TestCase):
+    """
+    Every backend available here against PurePythonBackend. Run from
+    semifinal/source with LD_LIBRARY_PATH=. to include libpoker-eval:
+
+        python -m unittest discover tests
+    """
+    def setUp(self):
+        self.reference = PurePythonBackend()
+        self.backends = [backend for backend in Backends.available() if backend.name != self.reference.name]
+
+    def test_rank(self):
+        rng = random.Random(3)
+        for size in (5, 6, 7):
+            hands = [rng.sample(xrange(52), size) for i in xrange(200)]
+            expected = self.reference.rank_batch(hands)
+            for backend in self.backends:
+                self.assertEqual([backend.rank(codes) for codes in hands], expected, backend.name)
+                self.assertEqual(list(backend.rank_batch(hands)), expected, backend.name)
+
+    def test_percentile(self):
+        rng = random.Random(4)
+        for board_size in (0, 3, 4, 5):
+            cards = rng.sample(xrange(52), 2 + board_size)
+            expected = self.reference.percentile(cards[:2], cards[2:])
+            for backend in self.backends:
+                self.assertAlmostEqual(backend.percentile(cards[:2], cards[2:]), expected, 9, backend.name)
+
+    def test_equity(self):
+        # Every street, since a backend that doesn't deal the board to
+        # come only goes wrong before the river
+        rng = random.Random(5)
+        iterations = Backends.EQUITY_CHECK_ITERATIONS
+        for board_size in (0, 3, 4, 5):
+            for opponents in (1, 3):
+                cards = rng.sample(xrange(52), 2 + board_size)
+                expected = self.reference.equity(cards[:2], cards[2:], opponents, iterations, seed=0)
+                for backend in self.backends:
+                    equity = backend.equity(cards[:2], cards[2:], opponents, iterations, seed=0)
+                    self.assertTrue(abs(equity - expected) <= Backends.EQUITY_TOLERANCE,
+                                    "%s %s %s: %.3f, expected %.3f" % (backend.name, cards[:2], cards[2:],
+                                                                       equity, expected))
+
+    def test_select(self):
+        Backends.select()
+        self.assertEqual(Backends.rejected, {})
+
+    def test_select_rejects_disagreeing_backend(self):
+        class Unpadded(PurePythonBackend):
+            name = "unpadded"
+            def equity(self, hole, board, opponents, iterations, seed=None):
+                # Scores the board as it stands, like poker_eval without
+                # placeholders
+                return PurePythonBackend.equity(self, hole, board + [51, 47][:5 - len(board)],
+                                                opponents, iterations, seed)
+        Backends.register(Unpadded)
+        try:
+            Backends.select(("equity",))
+            self.assertEqual(Backends.rejected, {"equity": ["unpadded"]})
+        finally:
+            Backends.registered.remove(Unpadded)
+            Backends.selected = None
+
+if __name__ == '__main__':
+    unittest.main()
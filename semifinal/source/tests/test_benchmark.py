@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+from pokereval.benchmark import Benchmark, main
+
+MATCH = "two.evaluate_percentile"
+
+class BenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "baseline.json")
+        self.benchmark = Benchmark(hands=50, repeat=1, min_time=0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_default_baseline_is_tracked(self):
+        with open(Benchmark.DEFAULT_BASELINE) as f:
+            baseline = json.load(f)
+        self.assertEqual(set(baseline), set(["environment", "results"]))
+        self.assertTrue(MATCH in baseline["results"])
+
+    def test_slowdown_is_reported(self):
+        results = self.benchmark.run(MATCH)
+        self.assertEqual(results.keys(), [MATCH])
+        Benchmark.save(self.path, results)
+        with open(self.path) as f:
+            baseline = json.load(f)
+        self.assertEqual(baseline["environment"], Benchmark.environment())
+        self.assertEqual(Benchmark.compare(results, baseline, 0.1), [])
+        # A baseline ten times faster makes this run a regression
+        baseline["results"][MATCH] *= 10
+        self.assertEqual(Benchmark.compare(results, baseline, 0.1),
+                         [(MATCH, baseline["results"][MATCH], results[MATCH])])
+        self.assertEqual(Benchmark.compare(results, baseline, 0.95), [])
+
+    def test_main_exits_non_zero_on_a_slowdown(self):
+        Benchmark.save(self.path, {MATCH: 1e12})
+        argv, stdout = sys.argv, sys.stdout
+        sys.argv = ["benchmark", "--baseline", self.path, "--match", MATCH, "--repeat", "1"]
+        sys.stdout = StringIO()
+        try:
+            try:
+                main()
+                self.fail("no exit")
+            except SystemExit, e:
+                self.assertEqual(e.code, 1)
+            self.assertTrue("REGRESSION %s" % MATCH in sys.stdout.getvalue())
+        finally:
+            sys.argv, sys.stdout = argv, stdout
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import random
+import unittest
+
+from pokereval.backends import PurePythonBackend
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.board_index import BoardIndex
+
+def brute_force_percentile(hole, board):
+    """
+    Share of the opponent holes hole beats with board, ties counting half
+    """
+    rank = BitmaskEvaluator.evaluate_codes(list(hole) + list(board))
+    live = [code for code in xrange(52) if code not in hole and code not in board]
+    beaten = 0.0
+    holes = 0
+    for i, c in enumerate(live):
+        for d in live[i + 1:]:
+            other = BitmaskEvaluator.evaluate_codes([c, d] + list(board))
+            if rank < other:
+                beaten += 1
+            elif rank == other:
+                beaten += 0.5
+            holes += 1
+    return beaten / holes
+
+def exact_two_way(hole, board):
+    """
+    Pot share of hole against every pair of disjoint opponent holes
+    """
+    index = BoardIndex(board)
+    rank = index.rank(hole)
+    live = [code for code in xrange(52) if code not in hole and code not in board]
+    holes = [(c, d) for i, c in enumerate(live) for d in live[i + 1:]]
+    share = 0.0
+    pairs = 0
+    for first in holes:
+        first_rank = index.rank(first)
+        for second in holes:
+            if first[0] in second or first[1] in second:
+                continue
+            best = min(first_rank, index.rank(second))
+            if rank < best:
+                share += 1
+            elif rank == best:
+                share += 1.0 / (1 + (first_rank == rank) + (index.rank(second) == rank))
+            pairs += 1
+    return share / pairs
+
+class BoardIndexTest(unittest.TestCase):
+    def test_percentile(self):
+        rng = random.Random(6)
+        for board_size in (3, 4, 5):
+            for i in xrange(3):
+                cards = rng.sample(xrange(52), 2 + board_size)
+                hole, board = cards[:2], cards[2:]
+                index = BoardIndex(board)
+                self.assertAlmostEqual(index.percentile(hole), brute_force_percentile(hole, board), 12)
+                # Every other hole on the same index
+                for j in xrange(3):
+                    other = rng.sample([code for code in xrange(52) if code not in board], 2)
+                    self.assertAlmostEqual(index.percentile(other), brute_force_percentile(other, board), 12)
+
+    def test_board_ties(self):
+        # Royal flush on the board, every hole ties
+        board = [32, 36, 40, 44, 48]
+        index = BoardIndex(board)
+        self.assertEqual(index.percentile([0, 1]), 0.5)
+        for opponents in xrange(1, 8):
+            self.assertAlmostEqual(index.multiway([0, 1], opponents), 1.0 / (opponents + 1), 12)
+
+    def test_multiway_heads_up(self):
+        rng = random.Random(7)
+        for i in xrange(5):
+            cards = rng.sample(xrange(52), 7)
+            index = BoardIndex(cards[2:])
+            self.assertAlmostEqual(index.multiway(cards[:2], 1), index.percentile(cards[:2]), 12)
+
+    def test_multiway_two_opponents(self):
+        # A straight on the board, so ties matter, then a random river
+        for hole, board in (([0, 5], [12, 17, 22, 27, 30]), ([43, 38], [21, 12, 24, 19, 36])):
+            self.assertAlmostEqual(BoardIndex(board).multiway(hole, 2), exact_two_way(hole, board), 5)
+
+    def test_multiway_error_bound(self):
+        # The board where multiway erred most of those tried, against the
+        # bounds in its docstring plus three standard errors of the
+        # Monte Carlo reference
+        hole, board = [1, 13], [22, 5, 3, 11, 16]
+        index = BoardIndex(board)
+        iterations = 40000
+        for opponents, bound in ((3, 0.002), (5, 0.007), (7, 0.016)):
+            reference = PurePythonBackend().equity(hole, board, opponents, iterations, seed=0)
+            self.assertLess(abs(index.multiway(hole, opponents) - reference), bound + 3 * 0.5 / iterations ** 0.5)
+
+    def test_hole_on_board(self):
+        index = BoardIndex([0, 5, 10])
+        self.assertRaises(ValueError, index.percentile, [0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokereval.checkpoint import Checkpoint
+
+def square_unit(job):
+    if job < 0:
+        raise ValueError("interrupted")
+    return job, job * job
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "table.bin.progress")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        checkpoint = Checkpoint(self.path)
+        default = {"done": {}}
+        self.assertTrue(checkpoint.load(default) is default)
+        default["done"]["1,2"] = 0.5
+        checkpoint.save()
+        self.assertEqual(Checkpoint(self.path).load({}), {"done": {"1,2": 0.5}})
+        checkpoint.remove()
+        self.assertFalse(os.path.exists(self.path))
+        checkpoint.remove()
+
+    def test_save_replaces_the_file_atomically(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.load({"done": [1]})
+        checkpoint.save()
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(self.path)])
+        # A save failing halfway leaves the previous state
+        checkpoint.state = {"done": [1, 2], "bad": object()}
+        self.assertRaises(TypeError, checkpoint.save)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"done": [1]})
+
+    def test_unreadable_file_starts_over(self):
+        for data in ("", '{"done": [1, ', "\xff\xfe"):
+            with open(self.path, "w") as f:
+                f.write(data)
+            self.assertEqual(Checkpoint(self.path).load({"done": []}), {"done": []})
+
+    def test_run_resumes_where_it_stopped(self):
+        checkpoint = Checkpoint(self.path, interval=0)
+        state = checkpoint.load({"done": {}})
+
+        def finish(result):
+            job, square = result
+            state["done"][str(job)] = square
+        # A failing unit stops the run, keeping the units finished before
+        self.assertRaises(ValueError, checkpoint.run, square_unit, [1, 2, -1, 3], finish, 1)
+        checkpoint = Checkpoint(self.path)
+        state = checkpoint.load({"done": {}})
+        self.assertEqual(state, {"done": {"1": 1, "2": 4}})
+        jobs = [job for job in xrange(1, 6) if str(job) not in state["done"]]
+        self.assertEqual(jobs, [3, 4, 5])
+        checkpoint.run(square_unit, jobs, finish, 1)
+        self.assertEqual(Checkpoint(self.path).load({}), {"done": dict((str(job), job * job) for job in xrange(1, 6))})
+
+    def test_run_without_a_state_saves_nothing(self):
+        results = []
+        Checkpoint(self.path).run(square_unit, [1, 2], results.append, 1)
+        self.assertEqual(sorted(results), [(1, 1), (2, 4)])
+        self.assertFalse(os.path.exists(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from pokereval.equity_store import EquityStore
+
+# (hole, board) of distinct flop situations
+SITUATIONS = [((48, 49), (0, 13, 26)), ((48, 45), (0, 13, 26)), ((8, 12), (1, 2, 3)),
+              ((20, 21), (44, 40, 36)), ((50, 46), (6, 7, 30))]
+
+class EquityStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "store.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_flush_get(self):
+        store = EquityStore(self.path)
+        hole, board = SITUATIONS[0]
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 2), None)
+        store.put(EquityStore.EQUITY, hole, board, 2, 0.5)
+        # Found before and after the flush, not under another kind or
+        # opponent count
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 2), 0.5)
+        store.flush()
+        self.assertEqual(store.pending, {})
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 2), 0.5)
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 3), None)
+        self.assertEqual(store.get(EquityStore.PERCENTILE, hole, board, 2), None)
+        self.assertEqual((store.hits, store.misses), (2, 3))
+        store.close()
+
+    def test_suit_relabeling_hits(self):
+        store = EquityStore(self.path)
+        store.put(EquityStore.EQUITY, (48, 49), (0, 13, 26), 1, 0.75)
+        store.flush()
+        # Spades and clubs swapped
+        self.assertEqual(store.get(EquityStore.EQUITY, (51, 49), (3, 13, 26), 1), 0.75)
+        store.close()
+
+    def test_values_outlive_the_store(self):
+        store = EquityStore(self.path)
+        hole, board = SITUATIONS[0]
+        store.put(EquityStore.PERCENTILE, hole, board, 0, 0.25)
+        store.close()
+        store = EquityStore(self.path)
+        self.assertEqual(store.get(EquityStore.PERCENTILE, hole, board), 0.25)
+        self.assertEqual(store.rows, 1)
+        store.close()
+
+    def test_another_version_is_emptied(self):
+        store = EquityStore(self.path)
+        hole, board = SITUATIONS[0]
+        store.put(EquityStore.EQUITY, hole, board, 1, 0.5)
+        store.close()
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA user_version = %d" % (EquityStore.VERSION + 1))
+        connection.close()
+        store = EquityStore(self.path)
+        self.assertEqual(store.rows, 0)
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 1), None)
+        store.close()
+
+    def test_least_recently_used_are_dropped(self):
+        store = EquityStore(self.path, size=3)
+        for i, (hole, board) in enumerate(SITUATIONS[:3]):
+            store.put(EquityStore.EQUITY, hole, board, 1, i / 10.0)
+            store.flush()
+        # Use the first, so the second is the oldest
+        hole, board = SITUATIONS[0]
+        store.get(EquityStore.EQUITY, hole, board, 1)
+        store.flush()
+        for hole, board in SITUATIONS[3:]:
+            store.put(EquityStore.EQUITY, hole, board, 1, 0.5)
+        store.flush()
+        self.assertEqual(store.rows, 3)
+        self.assertEqual(store.connection.execute("SELECT COUNT(*) FROM equities").fetchone()[0], 3)
+        found = [store.get(EquityStore.EQUITY, hole, board, 1) is not None for hole, board in SITUATIONS]
+        self.assertEqual(found, [True, False, False, True, True])
+        store.close()
+
+    def test_put_past_max_pending_drops_the_value(self):
+        store = EquityStore(self.path)
+        for i in xrange(EquityStore.MAX_PENDING + 10):
+            store.pending[(EquityStore.EQUITY, 3, i, 1)] = 0.5
+        hole, board = SITUATIONS[0]
+        store.put(EquityStore.EQUITY, hole, board, 1, 0.5)
+        self.assertEqual(store.rows, 0)
+        self.assertEqual(store.get(EquityStore.EQUITY, hole, board, 1), None)
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import unittest
+
+from pokereval.array_tables import ArrayTables
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.board_state import BoardState
+from pokereval.card import Card
+from pokereval.hand_evaluator import HandEvaluator, HandLengthException
+from pokereval.hole_index import HoleIndex
+from pokereval.state_table import StateTable
+
+# Hands and their ranks by the original HandEvaluator: one 5-card hand of
+# each of the 7462 ranks, and random 6 and 7-card hands, each row
+# [rank, code, ...]
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "baseline_ranks.json")) as f:
+    BASELINE = dict((int(size), rows) for size, rows in json.load(f).iteritems())
+
+EVALUATORS = {5: HandEvaluator.Five, 6: HandEvaluator.Six, 7: HandEvaluator.Seven}
+
+# Building the state table takes minutes, so its tests use a built one
+STATE_TABLE = StateTable.load(os.environ.get("POKEREVAL_STATE_TABLE", StateTable.DEFAULT_PATH))
+
+class BaselineTest(unittest.TestCase):
+    """
+    Every evaluator against the baseline ranks
+    """
+    def hands(self, size):
+        return [row[1:] for row in BASELINE[size]], [row[0] for row in BASELINE[size]]
+
+    def test_evaluate_rank(self):
+        for size, evaluator in EVALUATORS.iteritems():
+            hands, ranks = self.hands(size)
+            self.assertEqual([evaluator.evaluate_rank(map(Card.from_index, codes)) for codes in hands], ranks)
+
+    @unittest.skipUnless(ArrayTables.available(), "NumPy is not installed")
+    def test_evaluate_rank_batch(self):
+        for size, evaluator in EVALUATORS.iteritems():
+            hands, ranks = self.hands(size)
+            self.assertEqual(list(evaluator.evaluate_rank_batch(hands)), ranks)
+
+    def test_evaluate_codes_and_binary(self):
+        for size, evaluator in EVALUATORS.iteritems():
+            hands, ranks = self.hands(size)
+            self.assertEqual([evaluator.evaluate_codes(*codes) for codes in hands], ranks)
+            binary = evaluator.binary_by_code
+            self.assertEqual([evaluator.evaluate_binary(*[binary[code] for code in codes]) for codes in hands], ranks)
+
+    def test_wrong_length(self):
+        for size, evaluator in EVALUATORS.iteritems():
+            codes = self.hands(size)[0][0]
+            for wrong in (codes[:-1], codes + [code for code in xrange(52) if code not in codes][:1]):
+                # The fast paths take exactly size positional cards
+                self.assertRaises(TypeError, evaluator.evaluate_codes, *wrong)
+                self.assertRaises(TypeError, evaluator.evaluate_binary, *[evaluator.binary_by_code[code] for code in wrong])
+                self.assertRaises(HandLengthException, evaluator.evaluate_rank, map(Card.from_index, wrong))
+                if ArrayTables.available():
+                    self.assertRaises(HandLengthException, evaluator.evaluate_rank_batch, [wrong])
+
+    def test_bitmask(self):
+        for size in EVALUATORS:
+            hands, ranks = self.hands(size)
+            self.assertEqual([BitmaskEvaluator.evaluate_codes(codes) for codes in hands], ranks)
+            self.assertEqual([BitmaskEvaluator.evaluate_rank(map(Card.from_index, codes)) for codes in hands], ranks)
+
+    def test_board_state(self):
+        for size in EVALUATORS:
+            hands, ranks = self.hands(size)
+            self.assertEqual([BoardState(map(Card.from_index, codes[2:])).evaluate_rank(map(Card.from_index, codes[:2]))
+                              for codes in hands], ranks)
+            self.assertEqual([BoardState(map(Card.from_index, codes[2:])).evaluate_codes(*codes[:2])
+                              for codes in hands], ranks)
+
+    def test_evaluate_hand(self):
+        available = ArrayTables.__dict__["available"]
+        try:
+            for size, evaluator in EVALUATORS.iteritems():
+                hands, ranks = self.hands(size)
+                for codes, rank in zip(hands, ranks)[::250]:
+                    # Share of the opponent holes beaten, ties counting half
+                    share = 0.0
+                    holes = HoleIndex.live(HoleIndex.dead_mask(codes))
+                    for a, b in holes:
+                        other = evaluator.evaluate_rank(map(Card.from_index, [a, b] + codes[2:]))
+                        share += 1 if rank < other else 0.5 if rank == other else 0
+                    hole, board = map(Card.from_index, codes[:2]), map(Card.from_index, codes[2:])
+                    # With NumPy if installed, then through BoardState
+                    ArrayTables.available = available
+                    self.assertAlmostEqual(HandEvaluator.evaluate_hand(hole, board), share / len(holes))
+                    ArrayTables.available = staticmethod(lambda: False)
+                    self.assertAlmostEqual(HandEvaluator.evaluate_hand(hole, board), share / len(holes))
+        finally:
+            ArrayTables.available = available
+
+    @unittest.skipIf(STATE_TABLE is None, "No state table, build it with python -m pokereval.state_table")
+    def test_state_table(self):
+        hands, ranks = self.hands(7)
+        self.assertEqual([STATE_TABLE.evaluate_codes(codes) for codes in hands], ranks)
+        if ArrayTables.available():
+            self.assertEqual(list(STATE_TABLE.evaluate_rank_batch(hands)), ranks)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import random
+import unittest
+
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.exact_equity import ExactEquity
+
+def brute_force_equity(hole, board):
+    """
+    Heads-up pot share of hole over every river and opponent hole of a
+    4 or 5-card board
+    """
+    dead = set(hole) | set(board)
+    live = [code for code in xrange(52) if code not in dead]
+    rivers = [[]] if len(board) == 5 else [[code] for code in live]
+    share = 0.0
+    showdowns = 0
+    for river in rivers:
+        full_board = list(board) + river
+        rank = BitmaskEvaluator.evaluate_codes(list(hole) + full_board)
+        others = [code for code in live if code not in river]
+        for i, c in enumerate(others):
+            for d in others[i + 1:]:
+                other = BitmaskEvaluator.evaluate_codes([c, d] + full_board)
+                if rank < other:
+                    share += 1
+                elif rank == other:
+                    share += 0.5
+                showdowns += 1
+    return share / showdowns
+
+class ExactEquityTest(unittest.TestCase):
+    def setUp(self):
+        self.exact_equity = ExactEquity()
+
+    def test_river_and_turn(self):
+        rng = random.Random(8)
+        for board_size in (5, 4, 4):
+            cards = rng.sample(xrange(52), 2 + board_size)
+            hole, board = cards[:2], cards[2:]
+            self.assertAlmostEqual(self.exact_equity.equity(hole, board), brute_force_equity(hole, board), 12)
+            self.assertTrue(self.exact_equity.complete())
+
+    def test_flop_is_mean_of_turns(self):
+        # Every turn leaves the same number of rivers and opponent holes
+        hole, flop = [48, 49], [0, 13, 26]
+        turns = [code for code in xrange(52) if code not in hole + flop]
+        expected = sum(self.exact_equity.equity(hole, flop + [turn]) for turn in turns) / len(turns)
+        self.assertAlmostEqual(self.exact_equity.equity(hole, flop), expected, 12)
+        self.assertTrue(self.exact_equity.complete())
+
+    def test_budget(self):
+        # Out of time after the first runout, the result is partial
+        self.exact_equity.equity([48, 49], [0, 13, 26], budget=0)
+        self.assertEqual(self.exact_equity.runouts, 1)
+        self.assertFalse(self.exact_equity.complete())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from pokereval import flop_table
+from pokereval.array_tables import numpy
+from pokereval.flop_table import FlopTable, FlopTableException
+from pokereval.hand_indexer import HandIndexer
+
+SIZE = 1286792
+# Stand-in flops: each unit covers a quarter of the situations
+UNITS = 4
+# Every index over this is exact in float32 added to a small integer
+SCALE = 2097152.0
+# Added to the equities of the units run by the current build
+run = 1
+
+def fake_unit(job):
+    """
+    Equities of one quarter of the situations, failing on unit 2 of the
+    first run
+    """
+    index, flop, state_table_path = job
+    if run == 1 and index == 2:
+        raise ValueError("interrupted")
+    situations = range(index * SIZE // UNITS, (index + 1) * SIZE // UNITS)
+    return index, situations, [run + situation / SCALE for situation in situations]
+
+class FlopTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "flop_equity.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_load_round_trip(self):
+        FlopTable.write(self.path, dict((index, index / SCALE) for index in xrange(SIZE)))
+        table = FlopTable(self.path)
+        self.assertEqual(table.count, SIZE)
+        indexer = HandIndexer.street(3)
+        rng = random.Random(0)
+        for i in xrange(200):
+            cards = rng.sample(xrange(52), 5)
+            self.assertEqual(table.equity(cards[:2], cards[2:]), indexer.index(cards[:2], cards[2:]) / SCALE)
+
+    def test_checksum_rejects_a_corrupted_file(self):
+        FlopTable.write(self.path, dict((index, index / SCALE) for index in xrange(SIZE)))
+        with open(self.path, "r+b") as f:
+            f.seek(FlopTable.HEADER.size + 4 * 1000)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(chr(ord(byte) ^ 1))
+        self.assertRaises(FlopTableException, FlopTable, self.path)
+        FlopTable(self.path, verify=False)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 4)
+        self.assertRaises(FlopTableException, FlopTable, self.path, verify=False)
+
+    def test_resume_from_a_truncated_progress_file(self):
+        if numpy is None:
+            self.skipTest("needs NumPy")
+        global run
+        flops = FlopTable.__dict__["flops"]
+        unit = flop_table._flop_unit
+        FlopTable.flops = staticmethod(lambda: [(0, 1, 2)] * UNITS)
+        flop_table._flop_unit = fake_unit
+        try:
+            run = 1
+            self.assertRaises(ValueError, FlopTable.build, self.path, processes=1)
+            progress_path = self.path + ".progress"
+            equities = {}
+            done = set()
+            with open(progress_path, "rb") as f:
+                FlopTable.read_progress(f, equities, done)
+            self.assertEqual(done, set([0, 1]))
+            # Cut into unit 1, as a crash while appending it would
+            with open(progress_path, "r+b") as f:
+                f.truncate(os.path.getsize(progress_path) - 10)
+            run = 2
+            FlopTable.build(self.path, processes=1)
+        finally:
+            FlopTable.flops = flops
+            flop_table._flop_unit = unit
+        self.assertFalse(os.path.exists(progress_path))
+        table = FlopTable(self.path)
+        for index in xrange(0, SIZE, 997):
+            kept = 1 if index < SIZE // UNITS else 2
+            self.assertEqual(table.value(table.mm, FlopTable.HEADER.size + 4 * index)[0], kept + index / SCALE)
+
+if __name__ == '__main__':
+    unittest.main()
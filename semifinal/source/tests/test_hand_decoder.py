@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.card import Card
+from pokereval.hand_decoder import HandDecoder
+
+def cards(text):
+    return [Card.from_repr("(%s)" % name) for name in text.split()]
+
+# hole, board, category, kickers, hole and board cards used in order of
+# significance
+HANDS = [
+    ("9h 8h", "7h 6h 5h Kd 2c", HandDecoder.STRAIGHT_FLUSH, (9, 8, 7, 6, 5), "9h 8h", "7h 6h 5h"),
+    ("Ks Kh", "Kd Kc 7s 7h 2c", HandDecoder.FOUR_OF_A_KIND, (13, 13, 13, 13, 7), "Ks Kh", "Kd Kc 7s"),
+    ("Ks 7d", "Kh Kd 7s 7h 2c", HandDecoder.FULL_HOUSE, (13, 13, 13, 7, 7), "Ks", "Kh Kd 7s 7h"),
+    ("Ah 2h", "Kh 9h 4h 4d 4c", HandDecoder.FLUSH, (14, 13, 9, 4, 2), "Ah 2h", "Kh 9h 4h"),
+    ("Ah 2d", "3c 4s 5h Kd Kc", HandDecoder.STRAIGHT, (5, 4, 3, 2, 14), "2d Ah", "5h 4s 3c"),
+    ("Qs 3d", "Qh Qd 9s 5c 2h", HandDecoder.THREE_OF_A_KIND, (12, 12, 12, 9, 5), "Qs", "Qh Qd 9s 5c"),
+    ("As Kd", "Ah Kc 7s 7h 2c", HandDecoder.TWO_PAIR, (14, 14, 13, 13, 7), "As Kd", "Ah Kc 7s"),
+    ("Jd 4c", "Js 9h 8s 3d 2c", HandDecoder.ONE_PAIR, (11, 11, 9, 8, 4), "Jd 4c", "Js 9h 8s"),
+    ("Ad 3c", "Ks 9h 7s 5d 2c", HandDecoder.HIGH_CARD, (14, 13, 9, 7, 5), "Ad", "Ks 9h 7s 5d"),
+]
+
+class HandDecoderTest(unittest.TestCase):
+
+    def test_best_hand_of_each_category(self):
+        self.assertEqual(sorted(category for hole, board, category, kickers, hole_used, board_used in HANDS),
+                         range(9))
+        for hole, board, category, kickers, hole_used, board_used in HANDS:
+            hole, board = cards(hole), cards(board)
+            rank = BitmaskEvaluator.evaluate_rank(hole + board)
+            self.assertEqual(HandDecoder.category(rank), category)
+            self.assertEqual(HandDecoder.category_name(rank), HandDecoder.CATEGORY_NAMES[category])
+            self.assertEqual(HandDecoder.kickers(rank), kickers)
+            self.assertEqual(HandDecoder.best_hand(hole, board), (rank, cards(hole_used), cards(board_used)))
+            self.assertEqual(HandDecoder.best_hand(hole, board, rank), (rank, cards(hole_used), cards(board_used)))
+
+    def test_best_hand_of_5_and_6_cards(self):
+        hole, board = cards("Ah Kh"), cards("Qh Jh Th")
+        rank = BitmaskEvaluator.evaluate_rank(hole + board)
+        self.assertEqual(rank, 1)
+        self.assertEqual(HandDecoder.best_hand(hole, board), (1, hole, board))
+        hole, board = cards("2s 2h"), cards("9d 9c 5s 3h")
+        rank, hole_used, board_used = HandDecoder.best_hand(hole, board)
+        self.assertEqual(HandDecoder.category(rank), HandDecoder.TWO_PAIR)
+        self.assertEqual((hole_used, board_used), (hole, cards("9d 9c 5s")))
+
+    def test_best_five_make_the_rank(self):
+        rng = random.Random(0)
+        for i in xrange(2000):
+            codes = rng.sample(xrange(52), 7)
+            hole, board = map(Card.from_index, codes[:2]), map(Card.from_index, codes[2:])
+            rank, hole_used, board_used = HandDecoder.best_hand(hole, board)
+            used = hole_used + board_used
+            self.assertEqual(len(set(used)), 5)
+            self.assertTrue(set(hole_used) <= set(hole) and set(board_used) <= set(board))
+            self.assertEqual(BitmaskEvaluator.evaluate_rank(used), rank)
+
+    def test_every_rank_decodes(self):
+        previous = None
+        for rank in xrange(1, 7463):
+            category = HandDecoder.category(rank)
+            self.assertTrue(HandDecoder.CATEGORY_BOUNDS[category] <= rank)
+            if category < HandDecoder.HIGH_CARD:
+                self.assertTrue(rank < HandDecoder.CATEGORY_BOUNDS[category + 1])
+            kickers = HandDecoder.kickers(rank)
+            self.assertEqual(len(kickers), 5)
+            self.assertNotEqual(kickers, previous)
+            previous = kickers
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import random
+import unittest
+from itertools import combinations, permutations
+
+from pokereval.hand_indexer import HandIndexer
+from pokereval.isomorphism import Isomorphism
+
+def relabel(codes, suits):
+    return [(code & ~3) | suits[code & 3] for code in codes]
+
+class HandIndexerTest(unittest.TestCase):
+
+    def test_sizes(self):
+        for board_size, size in ((0, 169), (3, 1286792), (4, 13960050), (5, 123156254)):
+            self.assertEqual(HandIndexer.street(board_size).size, size)
+
+    def test_preflop_is_a_bijection(self):
+        indexer = HandIndexer.street(0)
+        indices = set(indexer.index(hole, ()) for hole in combinations(xrange(52), 2))
+        self.assertEqual(indices, set(xrange(169)))
+        for index in xrange(169):
+            hole, board = indexer.unindex(index)
+            self.assertEqual(indexer.index(hole, board), index)
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        for board_size in (3, 4, 5):
+            indexer = HandIndexer.street(board_size)
+            for index in [0, indexer.size - 1] + [rng.randrange(indexer.size) for i in xrange(2000)]:
+                hole, board = indexer.unindex(index)
+                self.assertEqual(len(set(hole + board)), 2 + board_size)
+                self.assertEqual(indexer.index(hole, board), index)
+            self.assertRaises(ValueError, indexer.unindex, indexer.size)
+
+    def test_same_index_for_every_relabeling(self):
+        rng = random.Random(1)
+        for board_size in (0, 3, 4, 5):
+            indexer = HandIndexer.street(board_size)
+            for i in xrange(200):
+                cards = rng.sample(xrange(52), 2 + board_size)
+                hole, board = cards[:2], cards[2:]
+                index = indexer.index(hole, board)
+                for suits in permutations(xrange(4)):
+                    self.assertEqual(indexer.index(relabel(hole, suits), relabel(board, suits)), index)
+                # Order within the hole and the board doesn't matter either
+                self.assertEqual(indexer.index(hole[::-1], board[::-1]), index)
+
+    def test_flop_classes_agree_with_isomorphism(self):
+        rng = random.Random(2)
+        indexer = HandIndexer.street(3)
+        classes = {}
+        for i in xrange(5000):
+            cards = rng.sample(xrange(52), 5)
+            hole, board = cards[:2], cards[2:]
+            index = indexer.index(hole, board)
+            canonical = Isomorphism.canonical(hole, board)
+            self.assertEqual(classes.setdefault(canonical, index), index)
+            self.assertEqual(Isomorphism.canonical(*indexer.unindex(index)), canonical)
+        # Different classes, different indices
+        self.assertEqual(len(set(classes.values())), len(classes))
+
+if __name__ == '__main__':
+    unittest.main()
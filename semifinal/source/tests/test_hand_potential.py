@@ -0,0 +1,71 @@
+import unittest
+from itertools import combinations
+
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.hand_potential import HandPotential
+
+AHEAD, TIED, BEHIND = range(3)
+
+def outcome(rank, other):
+    return AHEAD if rank < other else TIED if rank == other else BEHIND
+
+def brute_force_potential(hole, board):
+    """
+    hs, ppot, npot and ehs2 of hole by evaluating every opponent hole on
+    every runout, as in Billings et al.
+    """
+    dead = set(hole) | set(board)
+    live = [code for code in xrange(52) if code not in dead]
+    rank_now = BitmaskEvaluator.evaluate_codes(list(hole) + list(board))
+    now = dict(((c, d), outcome(rank_now, BitmaskEvaluator.evaluate_codes([c, d] + list(board))))
+               for c, d in combinations(live, 2))
+    # hp[now][river] over (opponent, runout)
+    hp = [[0] * 3 for i in xrange(3)]
+    squares = 0.0
+    runouts = list(combinations(live, 5 - len(board)))
+    for runout in runouts:
+        full_board = list(board) + list(runout)
+        rank = BitmaskEvaluator.evaluate_codes(list(hole) + full_board)
+        river = [0] * 3
+        for c, d in combinations([code for code in live if code not in runout], 2):
+            later = outcome(rank, BitmaskEvaluator.evaluate_codes([c, d] + full_board))
+            hp[now[(c, d)]][later] += 1
+            river[later] += 1
+        squares += ((river[AHEAD] + 0.5 * river[TIED]) / float(sum(river))) ** 2
+    totals = [float(sum(row)) for row in hp]
+    return {
+        "hs": (totals[AHEAD] + 0.5 * totals[TIED]) / sum(totals),
+        "ppot": (hp[BEHIND][AHEAD] + 0.5 * hp[BEHIND][TIED] + 0.5 * hp[TIED][AHEAD]) /
+                (totals[BEHIND] + 0.5 * totals[TIED]),
+        "npot": (hp[AHEAD][BEHIND] + 0.5 * hp[TIED][BEHIND] + 0.5 * hp[AHEAD][TIED]) /
+                (totals[AHEAD] + 0.5 * totals[TIED]),
+        "ehs2": squares / len(runouts)
+    }
+
+class HandPotentialTest(unittest.TestCase):
+
+    def setUp(self):
+        self.potential = HandPotential()
+
+    def check(self, hole, board):
+        potential = self.potential.potential(hole, board)
+        self.assertTrue(self.potential.complete())
+        expected = brute_force_potential(hole, board)
+        for name, value in expected.iteritems():
+            self.assertAlmostEqual(potential[name], value, 12, name)
+        self.assertAlmostEqual(potential["ehs"], expected["hs"] * (1 - expected["npot"]) +
+                               (1 - expected["hs"]) * expected["ppot"], 12)
+        return potential
+
+    def test_flop(self):
+        # 9h 8h on 7h 6d 2h: flush and straight draws
+        potential = self.check((29, 25), (21, 18, 1))
+        self.assertTrue(potential["ppot"] > 0.3)
+
+    def test_turn(self):
+        # The same draws after the Kc
+        potential = self.check((29, 25), (21, 18, 1, 44))
+        self.assertTrue(0 < potential["npot"] < potential["ppot"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import random
+import unittest
+
+from pokereval.backends import Backends
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.hand_stream import HandStream
+
+class Counted:
+    """
+    Iterator over hands that counts how many were taken
+    """
+    def __init__(self, hands):
+        self.hands = iter(hands)
+        self.taken = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        hand = next(self.hands)
+        self.taken += 1
+        return hand
+
+class HandStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        # Mixed sizes, so chunks batch each length apart
+        self.hands = [rng.sample(xrange(52), rng.choice((5, 6, 7))) for i in xrange(1000)]
+        self.ranks = [BitmaskEvaluator.evaluate_codes(codes) for codes in self.hands]
+        self.backends = [backend for backend in Backends.available() if backend.name in ("python", "numpy")]
+
+    def test_ranks_in_input_order(self):
+        for backend in self.backends:
+            stream = HandStream(self.hands, chunk_size=7, backend=backend)
+            ranks = list(stream)
+            self.assertEqual(ranks, self.ranks, backend.name)
+            self.assertTrue(all(type(rank) is int for rank in ranks), backend.name)
+            self.assertEqual((stream.count, stream.chunks), (1000, 143))
+        self.assertEqual(list(HandStream(self.hands)), self.ranks)
+
+    def test_chunk_boundaries(self):
+        for chunk_size, sizes in ((7, [7] * 142 + [6]), (250, [250] * 4), (1, [1] * 1000), (5000, [1000])):
+            chunks = list(HandStream(self.hands, chunk_size).iter_chunks())
+            self.assertEqual(map(len, chunks), sizes)
+            self.assertEqual(sum(chunks, []), self.ranks)
+        stream = HandStream([], 7)
+        self.assertEqual(list(stream.iter_chunks()), [])
+        self.assertEqual((stream.count, stream.chunks), (0, 0))
+        self.assertRaises(ValueError, HandStream, self.hands, 0)
+
+    def test_one_chunk_held_at_a_time(self):
+        hands = Counted(self.hands)
+        chunks = HandStream(hands, 100).iter_chunks()
+        self.assertEqual(hands.taken, 0)
+        self.assertEqual(next(chunks), self.ranks[:100])
+        self.assertEqual(hands.taken, 100)
+        next(chunks)
+        self.assertEqual(hands.taken, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from itertools import chain, combinations
+
+from pokereval.array_tables import numpy
+from pokereval.headsup_matrix import HeadsUpMatrix, _matchup_unit
+from pokereval.hole_index import HoleIndex
+from pokereval.preflop_table import PreflopTable
+from pokereval.range_equity import RangeEquity
+from pokereval.state_table import StateTable
+
+CLASSES = HeadsUpMatrix.CLASSES
+
+def synthetic_equities(seed):
+    """
+    A matrix of the shape build writes, from a random strength per class
+    """
+    rng = random.Random(seed)
+    strengths = [rng.uniform(-1, 1) for index in xrange(CLASSES)]
+    equities = [0.5] * (CLASSES * CLASSES)
+    for i, j in combinations(xrange(CLASSES), 2):
+        equity = 1 / (1 + math.exp(strengths[j] - strengths[i]))
+        equities[i * CLASSES + j] = equity
+        equities[j * CLASSES + i] = 1 - equity
+    return equities
+
+class HeadsUpMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "headsup.bin")
+        HeadsUpMatrix.write(path, synthetic_equities(0))
+        self.matrix = HeadsUpMatrix.load(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_counts_are_class_sizes_less_removed_holes(self):
+        self.assertEqual(sum(HeadsUpMatrix.class_sizes), 1326)
+        for i in xrange(CLASSES):
+            dead = HoleIndex.dead_mask(PreflopTable.class_hole(i))
+            removed = [0] * CLASSES
+            for (a, b), mask in zip(HoleIndex.HOLES, HoleIndex.MASKS):
+                if mask & dead:
+                    removed[PreflopTable.class_index(a, b)] += 1
+            self.assertEqual(HeadsUpMatrix.class_counts[i],
+                             [size - count for size, count in zip(HeadsUpMatrix.class_sizes, removed)])
+            self.assertEqual(sum(HeadsUpMatrix.class_counts[i]), 1225)
+
+    def test_matchups_weigh_every_live_hole(self):
+        for i in (0, 12, 13, 100, 168):
+            hero = PreflopTable.class_hole(i)
+            for j in (0, 12, 13, 64, 168):
+                matchups = HeadsUpMatrix.matchups(hero, j)
+                self.assertEqual(sum(weight for hole, weight in matchups), HeadsUpMatrix.class_counts[i][j])
+                for (c, d), weight in matchups:
+                    self.assertEqual(PreflopTable.class_index(c, d), j)
+                    self.assertFalse(set((c, d)) & set(hero))
+        # AA against KK: up to the relabelings fixing the aces, the 6
+        # holes share both suits with them, one or none
+        self.assertEqual(HeadsUpMatrix.matchups((48, 49), 154), [((44, 45), 1), ((44, 46), 4), ((46, 47), 1)])
+
+    def test_class_weights(self):
+        self.assertEqual(HeadsUpMatrix.class_weights([1.0] * 1326), [1.0] * CLASSES)
+        weights = RangeEquity.top(0.1)
+        class_weights = HeadsUpMatrix.class_weights(weights)
+        for index in xrange(CLASSES):
+            holes = [weight for (a, b), weight in zip(HoleIndex.HOLES, weights)
+                     if PreflopTable.class_index(a, b) == index]
+            self.assertAlmostEqual(class_weights[index], sum(holes) / len(holes))
+
+    def test_range_equity_is_the_mean_over_live_holes(self):
+        rng = random.Random(1)
+        weights = [rng.random() for index in xrange(CLASSES)]
+        for i in (0, 12, 77, 168):
+            hero = PreflopTable.class_hole(i)
+            dead = HoleIndex.dead_mask(hero)
+            share = 0.0
+            total = 0.0
+            for (a, b), mask in zip(HoleIndex.HOLES, HoleIndex.MASKS):
+                if not mask & dead:
+                    j = PreflopTable.class_index(a, b)
+                    share += weights[j] * self.matrix.equity(hero, j)
+                    total += weights[j]
+            self.assertAlmostEqual(self.matrix.range_equity(hero, weights), share / total)
+        self.assertRaises(ValueError, self.matrix.range_equity, (48, 49), [0.0] * CLASSES)
+
+    def test_headsup_scale(self):
+        holes = [PreflopTable.class_hole(index) for index in xrange(CLASSES)]
+        uniform = [1.0] * CLASSES
+        headsup = [self.matrix.range_equity(hole, uniform) for hole in holes]
+        for hole, equity in zip(holes, headsup):
+            self.assertAlmostEqual(self.matrix.headsup_scale(hole, uniform), equity)
+        # Against the best classes every equity drops, but the scale
+        # keeps their order and the spread of heads-up values
+        best = sorted(xrange(CLASSES), key=headsup.__getitem__)[-10:]
+        weights = [1.0 if index in best else 0.0 for index in xrange(CLASSES)]
+        ranked = sorted(holes, key=lambda hole: self.matrix.range_equity(hole, weights))
+        scale = [self.matrix.headsup_scale(hole, weights) for hole in ranked]
+        self.assertEqual(scale, sorted(scale))
+        self.assertTrue(set(scale) <= set(headsup))
+        self.assertEqual(scale[-1], max(headsup))
+        self.assertTrue(self.matrix.range_equity(ranked[-1], weights) < scale[-1])
+
+    def test_entry_against_enumeration(self):
+        if numpy is None or not os.path.exists(StateTable.DEFAULT_PATH):
+            self.skipTest("needs NumPy and a state table")
+        table = StateTable(StateTable.DEFAULT_PATH).table
+        # AA against KK, every KK hole on every board
+        i, j = 168, 154
+        hero = PreflopTable.class_hole(i)
+        share = 0.0
+        holes = 0
+        for (c, d), mask in zip(HoleIndex.HOLES, HoleIndex.MASKS):
+            if PreflopTable.class_index(c, d) != j or mask & HoleIndex.dead_mask(hero):
+                continue
+            deck = [code for code in xrange(52) if code not in hero + (c, d)]
+            count = 1712304
+            boards = numpy.fromiter(chain.from_iterable(combinations(deck, 5)),
+                                    dtype=numpy.intp, count=count * 5).reshape(count, 5)
+            states = numpy.zeros(count, dtype=numpy.intp)
+            for column in xrange(5):
+                states = table[states + boards[:, column]]
+            ranks = table[table[states + hero[0]] + hero[1]]
+            villain_ranks = table[table[states + c] + d]
+            share += ((ranks < villain_ranks).sum() + 0.5 * (ranks == villain_ranks).sum()) / float(count)
+            holes += 1
+        self.assertEqual(holes, 6)
+        self.assertAlmostEqual(_matchup_unit((i, j, StateTable.DEFAULT_PATH))[2], share / holes, places=9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import game
+from pokereval.equity_store import EquityStore
+from pokereval.lru_cache import LRUCache
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_is_dropped(self):
+        cache = LRUCache(3)
+        for key in "abc":
+            cache.put(key, key.upper())
+        # Reading a makes b the oldest, then overwriting c keeps it
+        self.assertEqual(cache.get("a"), "A")
+        cache.put("c", "C2")
+        cache.put("d", "D")
+        self.assertEqual(cache.entries.keys(), ["a", "c", "d"])
+        self.assertEqual(cache.get("b"), None)
+        cache.put("e", "E")
+        self.assertEqual(cache.entries.keys(), ["c", "d", "e"])
+
+    def test_capacity(self):
+        cache = LRUCache(5)
+        for key in xrange(20):
+            cache.put(key, key)
+            self.assertEqual(len(cache), min(key + 1, 5))
+        self.assertEqual(sorted(cache.entries), range(15, 20))
+        cache.put(19, 0)
+        self.assertEqual(len(cache), 5)
+
+    def test_hits_and_misses(self):
+        cache = LRUCache(2)
+        self.assertEqual(cache.hit_rate(), 0.0)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertAlmostEqual(cache.hit_rate(), 2 / 3.0)
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+class Player:
+    """
+    Just what Player.lookup uses
+    """
+    lookup = game.Player.lookup.im_func
+
+    def __init__(self, equity_store):
+        self.equity_store = equity_store
+
+class PlayerLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = EquityStore(os.path.join(self.directory, "store.sqlite"))
+        self.player = Player(self.store)
+        self.cache = LRUCache(10)
+        self.calls = 0
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def compute(self, value, exact):
+        def compute():
+            self.calls += 1
+            return value, exact
+        return compute
+
+    def test_estimates_are_not_kept(self):
+        hole, board = (48, 49), (0, 13, 26)
+        for i in xrange(2):
+            self.assertEqual(self.player.lookup(self.cache, EquityStore.EQUITY, hole, board, 3,
+                                                self.compute(0.4, False)), 0.4)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.store.get(EquityStore.EQUITY, hole, board, 3), None)
+
+    def test_exact_values_are_kept(self):
+        hole, board = (48, 49), (0, 13, 26)
+        for i in xrange(2):
+            self.assertEqual(self.player.lookup(self.cache, EquityStore.EQUITY, hole, board, 1,
+                                                self.compute(0.8, True)), 0.8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.store.get(EquityStore.EQUITY, hole, board, 1), 0.8)
+        # A suit relabeling is the same situation
+        self.assertEqual(self.player.lookup(self.cache, EquityStore.EQUITY, (51, 49), (3, 13, 26), 1,
+                                            self.compute(0.0, True)), 0.8)
+        self.assertEqual(self.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
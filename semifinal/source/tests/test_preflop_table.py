@@ -0,0 +1,48 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from pokereval.preflop_table import PreflopTable
+
+class PreflopTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = random.Random(0)
+        # Arbitrary equities, falling with the opponent count
+        equities = []
+        for index in xrange(PreflopTable.CLASSES):
+            equity = rng.uniform(0.3, 0.85)
+            for opponents in xrange(1, 4):
+                equities.append(equity ** opponents * rng.uniform(0.8, 1.2))
+        PreflopTable.write(os.path.join(self.directory, "preflop.bin"), equities, 3, 1000)
+        self.table = PreflopTable.load(os.path.join(self.directory, "preflop.bin"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def holes(self):
+        return [PreflopTable.class_hole(index) for index in xrange(PreflopTable.CLASSES)]
+
+    def test_heads_up_scale_is_the_equity(self):
+        for hole in self.holes():
+            self.assertAlmostEqual(self.table.headsup_scale(hole, 1), self.table.equity(hole, 1))
+
+    def test_scale_keeps_the_order_at_the_opponent_count(self):
+        for opponents in (2, 3):
+            ranked = sorted(self.holes(), key=lambda hole: self.table.equity(hole, opponents))
+            scale = [self.table.headsup_scale(hole, opponents) for hole in ranked]
+            self.assertEqual(scale, sorted(scale))
+            # Heads-up values only
+            headsup = set(self.table.equity(hole, 1) for hole in self.holes())
+            self.assertTrue(set(scale) <= headsup)
+
+    def test_opponents_are_capped_to_the_table(self):
+        for hole in self.holes():
+            self.assertEqual(self.table.headsup_scale(hole, 8), self.table.headsup_scale(hole, 3))
+            self.assertEqual(self.table.headsup_scale(hole, 0), self.table.headsup_scale(hole, 1))
+
+if __name__ == '__main__':
+    unittest.main()
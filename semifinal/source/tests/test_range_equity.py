@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from pokereval.array_tables import numpy
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.exact_equity import ExactEquity
+from pokereval.hole_index import HoleIndex
+from pokereval.range_equity import RangeEquity
+
+def brute_force_range_equity(hero, opponent, board):
+    """
+    Heads-up pot share of the hero range against the opponent range over
+    every river of a turn, each deal weighted by both hole weights
+    """
+    share = 0.0
+    total = 0.0
+    for river in xrange(52):
+        full_board = list(board) + [river]
+        if river in board:
+            continue
+        for (a, b), hero_weight in zip(HoleIndex.HOLES, hero):
+            if not hero_weight or set((a, b)) & set(full_board):
+                continue
+            rank = BitmaskEvaluator.evaluate_codes([a, b] + full_board)
+            for (c, d), weight in zip(HoleIndex.HOLES, opponent):
+                if not weight or set((c, d)) & set(full_board + [a, b]):
+                    continue
+                other = BitmaskEvaluator.evaluate_codes([c, d] + full_board)
+                outcome = 1.0 if rank < other else 0.5 if rank == other else 0.0
+                share += hero_weight * weight * outcome
+                total += hero_weight * weight
+    return share / total
+
+def weighted(holes, rng):
+    weights = [0.0] * len(HoleIndex.HOLES)
+    for a, b in holes:
+        weights[HoleIndex.index(a, b)] = rng.choice((0.5, 1.0, 2.0))
+    return weights
+
+class RangeEquityTest(unittest.TestCase):
+    def setUp(self):
+        self.range_equity = RangeEquity(ExactEquity())
+
+    def test_random_opponent(self):
+        # A known hole against a uniform range is ExactEquity
+        rng = random.Random(9)
+        for board_size in (3, 4, 5):
+            cards = rng.sample(xrange(52), 2 + board_size)
+            hole, board = cards[:2], cards[2:]
+            self.assertAlmostEqual(
+                self.range_equity.equity(RangeEquity.hole_range(hole), [RangeEquity.uniform()], board),
+                self.range_equity.exact_equity.equity(hole, board), 12)
+            self.assertTrue(self.range_equity.complete())
+
+    def test_weighted_ranges(self):
+        rng = random.Random(10)
+        board = [0, 13, 26, 39]
+        live = [code for code in xrange(52) if code not in board]
+        hero = weighted([tuple(sorted(rng.sample(live, 2))) for i in xrange(3)], rng)
+        # Overlapping the hero holes, so card removal matters
+        opponent = weighted([tuple(sorted(rng.sample(live[:12], 2))) for i in xrange(20)], rng)
+        self.assertAlmostEqual(self.range_equity.equity(hero, [opponent], board),
+                               brute_force_range_equity(hero, opponent, board), 12)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_python_fallback(self):
+        rng = random.Random(11)
+        board = rng.sample(xrange(52), 5)
+        ranks = self.range_equity.exact_equity.board_ranks(board)
+        hero = RangeEquity.top(0.1)
+        opponents = [RangeEquity.top(0.3), RangeEquity.uniform(), RangeEquity.top(0.05)]
+        for count in (1, 2, 3):
+            share, total = RangeEquity.board_equity(numpy.array(hero), map(numpy.array, opponents[:count]), ranks)
+            python_share, python_total = RangeEquity.board_equity_python(hero, opponents[:count], list(ranks))
+            self.assertAlmostEqual(share / total, python_share / python_total, 12)
+
+    def test_board_ties(self):
+        # Royal flush on the board: the pot is split every way
+        board = [32, 36, 40, 44, 48]
+        for count in (1, 2, 5):
+            self.assertAlmostEqual(
+                self.range_equity.equity(RangeEquity.top(0.2), [RangeEquity.uniform()] * count, board),
+                1.0 / (count + 1), 12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+from itertools import combinations
+
+from pokereval.bitmask_evaluator import BitmaskEvaluator
+from pokereval.checkpoint import Checkpoint
+from pokereval.hand_decoder import HandDecoder
+from pokereval.rank_histogram import RankHistogram, RankHistogramException, _count_unit
+
+def choose(n, k):
+    result = 1
+    for i in xrange(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+# 5-card hands of each category, best first
+CATEGORY_HANDS = [40, 624, 3744, 5108, 10200, 54912, 123552, 1098240, 1302540]
+
+class RankHistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "rank_histograms.bin")
+        self.hand_sizes = RankHistogram.HAND_SIZES
+
+    def tearDown(self):
+        RankHistogram.HAND_SIZES = self.hand_sizes
+        shutil.rmtree(self.directory)
+
+    def test_units_cover_every_hand_once(self):
+        for size in RankHistogram.HAND_SIZES:
+            self.assertEqual(sum(choose(51 - second, size - 2) for first, second in RankHistogram.units(size)),
+                             choose(52, size))
+
+    def test_unit_counts(self):
+        for size in RankHistogram.HAND_SIZES:
+            for first, second in ((40, 41), (3, 44), (54 - size - 2, 54 - size - 1)):
+                expected = [0] * RankHistogram.RANKS
+                for rest in combinations(xrange(second + 1, 52), size - 2):
+                    expected[BitmaskEvaluator.evaluate_codes((first, second) + rest) - 1] += 1
+                self.assertEqual(_count_unit((size, first, second, 50)), (size, first, second, expected))
+
+    def test_five_card_categories(self):
+        RankHistogram.HAND_SIZES = (5,)
+        histogram = RankHistogram.build(self.path, processes=1)[5]
+        bounds = HandDecoder.CATEGORY_BOUNDS + (RankHistogram.RANKS + 1,)
+        self.assertEqual([sum(histogram[bounds[i] - 1:bounds[i + 1] - 1]) for i in xrange(9)], CATEGORY_HANDS)
+        # Every rank is some hand
+        self.assertEqual(min(histogram), 4)
+        self.assertEqual(list(RankHistogram(self.path).histograms[5]), histogram)
+        self.assertFalse(os.path.exists(self.path + ".progress"))
+
+    def test_build_resumes_from_the_checkpoint(self):
+        RankHistogram.HAND_SIZES = (5,)
+        units = RankHistogram.units(5)
+        left = units[-3:]
+        # All but the last units done, with none of their hands counted
+        checkpoint = Checkpoint(self.path + ".progress")
+        checkpoint.load({"5": {"done": [list(unit) for unit in units[:-3]],
+                               "histogram": [0] * RankHistogram.RANKS}})
+        checkpoint.save()
+        histogram = RankHistogram.build(self.path, processes=1)[5]
+        expected = [0] * RankHistogram.RANKS
+        for first, second in left:
+            expected = [a + b for a, b in zip(expected, _count_unit((5, first, second, 50))[3])]
+        self.assertEqual(histogram, expected)
+        self.assertEqual(sum(histogram), sum(choose(51 - second, 3) for first, second in left))
+
+    def test_truncated_file(self):
+        RankHistogram.write(self.path, {5: [1] * RankHistogram.RANKS})
+        self.assertEqual(RankHistogram(self.path).percentiles(5)[-1], 0.0)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 4)
+        self.assertRaises(RankHistogramException, RankHistogram, self.path)
+
+    def test_to_percentiles(self):
+        self.assertEqual(RankHistogram.to_percentiles([1, 0, 3]), [0.75, 0.75, 0.0])
+
+if __name__ == '__main__':
+    unittest.main()
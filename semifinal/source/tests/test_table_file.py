@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pokereval.lookup_literals import LookupLiterals
+from pokereval.lookup_tables import LookupTables
+from pokereval.table_builder import TableBuilder
+from pokereval.table_file import TableFile, TableFileException
+
+def literal_tables():
+    return dict((class_name, dict((name, getattr(getattr(LookupLiterals, class_name), name))
+                                  for name in TableFile.NAMES[class_name]))
+                for class_name in TableFile.CLASSES)
+
+class TableFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "lookup_tables.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        # Back to the tables of the default path or the literals
+        LookupTables.load()
+
+    def test_round_trip(self):
+        tables = literal_tables()
+        self.assertEqual(TableBuilder.write(self.path, tables), [])
+        loaded = TableFile.load(self.path)
+        self.assertEqual(TableBuilder.verify(loaded), [])
+        for class_name in TableFile.CLASSES:
+            for name, value in tables[class_name].iteritems():
+                self.assertEqual(type(loaded[class_name][name]), type(value))
+
+    def test_build_matches_literals(self):
+        # Without a histogram only the percentile tables are missing
+        self.assertEqual(TableBuilder.verify(TableBuilder.build()),
+                         ["Five.rank_to_percentile_5", "Five.rank_to_percentile_6", "Five.rank_to_percentile_7"])
+
+    def test_mismatch_is_not_written(self):
+        tables = literal_tables()
+        odd_xors_to_rank = tables["Six"]["odd_xors_to_rank"] = dict(tables["Six"]["odd_xors_to_rank"])
+        odd_xors_to_rank[min(odd_xors_to_rank)] += 1
+        self.assertEqual(TableBuilder.write(self.path, tables), ["Six.odd_xors_to_rank"])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_truncated_or_incomplete_file(self):
+        TableFile.write(self.path, literal_tables())
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for size in (0, TableFile.HEADER.size + 10, len(data) - 1):
+            with open(self.path, "wb") as f:
+                f.write(data[:size])
+            self.assertRaises(TableFileException, TableFile.load, self.path)
+        tables = literal_tables()
+        del tables["Seven"]["odd_xors_to_rank"]
+        TableFile.write(self.path, tables)
+        self.assertRaises(TableFileException, TableFile.load, self.path)
+
+    def test_lookup_tables_load(self):
+        TableFile.write(self.path, literal_tables())
+        self.assertTrue(LookupTables.load(self.path))
+        self.assertFalse(LookupTables.Five is LookupLiterals.Five)
+        self.assertEqual(LookupTables.Seven.flush_rank_bits_to_rank, LookupLiterals.Seven.flush_rank_bits_to_rank)
+        # No file, or a bad one, leaves the literals
+        os.remove(self.path)
+        self.assertFalse(LookupTables.load(self.path))
+        self.assertTrue(LookupTables.Five is LookupLiterals.Five)
+        with open(self.path, "wb") as f:
+            f.write("PJLT")
+        self.assertFalse(LookupTables.load(self.path))
+
+if __name__ == '__main__':
+    unittest.main()